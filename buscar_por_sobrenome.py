@@ -1,27 +1,26 @@
 import sys
-from database import get_cursor
+from src.clientes import buscar_por_sobrenome_iter
 
 def buscar(sobrenome: str):
-    with get_cursor() as cur:
-        cur.execute(
-            """
-            SELECT id, nome, sobrenome, email, telefone, cidade, uf, criado_em
-            FROM clientes
-            WHERE sobrenome ILIKE %s
-            ORDER BY nome
-            """,
-            (sobrenome,),
+    """
+    Imprime os clientes com o sobrenome informado.
+
+    As linhas vêm de um cursor no servidor (buscar_por_sobrenome_iter),
+    então a primeira aparece na tela logo, mesmo que existam milhões de
+    resultados. Aceita os curingas do LIKE: "silv%" acha Silva, Silveira...
+    """
+    encontrados = 0
+    for r in buscar_por_sobrenome_iter(sobrenome):
+        if encontrados == 0:
+            print(f"Clientes encontrados para sobrenome ~ {sobrenome}:")
+        encontrados += 1
+        print(
+            f"- [{r.id}] {r.nome} {r.sobrenome} | email={r.email} | tel={r.telefone} | "
+            f"{r.cidade}-{r.uf} | criado_em={r.criado_em}"
         )
-        resultados = cur.fetchall()
 
-    if not resultados:
+    if not encontrados:
         print(f"Nenhum cliente encontrado com sobrenome parecido com: {sobrenome}")
-        return
-
-    print(f"Clientes encontrados para sobrenome ~ {sobrenome}:")
-    for r in resultados:
-        id_, nome, sob, email, telefone, cidade, uf, criado_em = r
-        print(f"- [{id_}] {nome} {sob} | email={email} | tel={telefone} | {cidade}-{uf} | criado_em={criado_em}")
 
 def main():
     if len(sys.argv) > 1:
@@ -1,42 +1,49 @@
-import os
-import psycopg2
-from contextlib import contextmanager
+"""
+Atalho para o módulo de conexão do pacote src.
 
-def get_connection():
-    """
-    Abre uma conexão com o PostgreSQL usando as variáveis de ambiente.
-    Isso evita deixar usuário/senha fixos no código.
-    """
-    return psycopg2.connect(
-        host=os.getenv("PGHOST", "localhost"),
-        port=os.getenv("PGPORT", "5433"),
-        dbname=os.getenv("PGDATABASE", "clientes"),
-        user=os.getenv("PGUSER", "app"),
-        password=os.getenv("PGPASSWORD", "app"),
-    )
+Os scripts da raiz (importar_clientes_csv.py, scripts/*) fazem
+`from database import get_cursor` (e src/cliente.py / src/produto.py usam
+`from database import Database`). Em vez de manter uma cópia separada
+que abre uma conexão nova a cada chamada, reaproveitamos o pool de
+conexões de src/database.py.
 
-@contextmanager
-def get_cursor():
-    """
-    Entrega um cursor já dentro de uma transação.
-    No final, faz commit automático.
-    Se der erro, dá rollback.
+Uso típico:
+    from database import get_cursor
 
-    Uso típico:
-        from database import get_cursor
-
-        with get_cursor() as cur:
-            cur.execute("SELECT 1")
-            print(cur.fetchone())
-    """
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        yield cur
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        cur.close()
-        conn.close()
+    with get_cursor() as cur:
+        cur.execute("SELECT 1")
+        print(cur.fetchone())
+"""
+from src.database import (  # noqa: F401
+    cache_resultados,
+    cache_stats,
+    Cancelamento,
+    ConnectionPool,
+    classificar_erro,
+    com_prazo,
+    CursorFechado,
+    CursorInstrumentado,
+    CursorRolavel,
+    Database,
+    em_cache,
+    executar_com_retry,
+    executar_preparada,
+    fechar_pool,
+    get_connection,
+    get_cursor,
+    get_pool,
+    idempotente,
+    invalidar_preparadas,
+    metricas,
+    metricas_json,
+    pool_stats,
+    prazo,
+    preparadas_stats,
+    registrar_consulta,
+    retry_stats,
+    roteamento_stats,
+    session,
+    stream_query,
+    TempoEsgotado,
+    ultima_operacao,
+)
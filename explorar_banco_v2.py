@@ -22,6 +22,32 @@ def conectar():
         print(f"❌ Erro ao conectar: {e}")
         return None
 
+def contar_estimado(cursor, nome_tabela):
+    """
+    Número aproximado de registros pelas estatísticas do PostgreSQL
+    (pg_class.reltuples), sem ler a tabela: instantâneo mesmo com milhões
+    de linhas. Tabela que ainda não passou por ANALYZE é contada de verdade.
+    """
+    cursor.execute(
+        """
+        SELECT CASE
+                   WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+                   ELSE round(
+                       c.reltuples / c.relpages
+                       * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+                   )::bigint
+               END
+        FROM pg_class c
+        WHERE c.oid = %s::regclass
+        """,
+        (nome_tabela,),
+    )
+    estimado = cursor.fetchone()[0]
+    if estimado is not None:
+        return estimado
+    cursor.execute(f"SELECT COUNT(*) FROM {nome_tabela}")
+    return cursor.fetchone()[0]
+
 def listar_tabelas():
     """Lista todas as tabelas do banco"""
     conn = conectar()
@@ -85,9 +111,8 @@ def descrever_tabela(nome_tabela):
         cursor.execute(query, (nome_tabela,))
         colunas = cursor.fetchall()
         
-        # Contar registros
-        cursor.execute(f"SELECT COUNT(*) FROM {nome_tabela}")
-        total = cursor.fetchone()[0]
+        # Contar registros (estimativa)
+        total = contar_estimado(cursor, nome_tabela)
         
         # Buscar chaves primárias
         query_pk = """
@@ -111,7 +136,7 @@ def descrever_tabela(nome_tabela):
         print("\n" + "=" * 80)
         print(f"📋 TABELA: {nome_tabela}")
         print("=" * 80)
-        print(f"📊 Total de registros: {total:,}".replace(',', '.'))
+        print(f"📊 Total de registros: ~{total:,}".replace(',', '.'))
         print(f"🔑 Chave primária: {', '.join(pks) if pks else 'Nenhuma'}")
         print(f"📇 Índices: {len(indices)}")
         
@@ -183,11 +208,10 @@ def estatisticas_banco():
         tabelas = cursor.fetchall()
         
         total_geral = 0
-        print("\n📊 Registros por tabela:\n")
+        print("\n📊 Registros por tabela (estimativa):\n")
         
         for (tabela,) in tabelas:
-            cursor.execute(f"SELECT COUNT(*) FROM {tabela}")
-            count = cursor.fetchone()[0]
+            count = contar_estimado(cursor, tabela)
             total_geral += count
             print(f"   {tabela:<20} {count:>10,} registros".replace(',', '.'))
         
@@ -2,11 +2,34 @@ import sys
 import csv
 from pathlib import Path
 
-from database import get_cursor
-from src.utils_nomes import quebrar_nome
-from src.localidades import CIDADE_UF
+from psycopg2.extras import execute_values
+
+from database import get_cursor, idempotente, classificar_erro
+from src.clientes import compactar_contadores
+from src.utils_nomes import normalizar_texto, quebrar_nome
+from src.localidades import CIDADE_UF_NORMALIZADA
 
 ARQUIVO_PADRAO = "clientes_exemplo.csv"
+TAMANHO_LOTE = 1000
+
+_SQL_INSERIR = """
+    INSERT INTO clientes (
+        nome, sobrenome, email, telefone, cidade, uf,
+        nome_norm, sobrenome_norm, cidade_norm
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (email) DO NOTHING
+"""
+
+# Mesmo INSERT, com várias linhas de uma vez (psycopg2 execute_values)
+_SQL_INSERIR_LOTE = """
+    INSERT INTO clientes (
+        nome, sobrenome, email, telefone, cidade, uf,
+        nome_norm, sobrenome_norm, cidade_norm
+    )
+    VALUES %s
+    ON CONFLICT (email) DO NOTHING
+"""
 
 def detectar_dialeto(caminho: Path) -> csv.Dialect:
     """
@@ -29,6 +52,59 @@ def normalizar_cabecalhos(fieldnames):
         mapeado[chave] = nome
     return mapeado
 
+@idempotente
+def _inserir_lote(lote):
+    """
+    Grava um lote inteiro numa transação só.
+    Se a conexão cair (ou der deadlock) no meio, nada do lote fica gravado
+    e o @idempotente tenta de novo; o ON CONFLICT (email) garante que
+    repetir não duplica clientes.
+    """
+    with get_cursor() as cur:
+        execute_values(
+            cur, _SQL_INSERIR_LOTE, [valores for _, valores in lote], page_size=len(lote)
+        )
+
+
+def _inserir_linha_a_linha(lote):
+    """
+    Plano B quando o lote falha por erro "de verdade" (ex.: valor inválido):
+    grava linha por linha com SAVEPOINT, para que só a linha com problema
+    seja pulada. Retorna (ok, pulados).
+    """
+    ok, pulados = 0, 0
+    with get_cursor() as cur:
+        for num_linha, valores in lote:
+            cur.execute("SAVEPOINT linha")
+            try:
+                cur.execute(_SQL_INSERIR, valores)
+                cur.execute("RELEASE SAVEPOINT linha")
+                ok += 1
+            except Exception as e:
+                if classificar_erro(e) is not None:
+                    raise
+                cur.execute("ROLLBACK TO SAVEPOINT linha")
+                pulados += 1
+                print(f"[LINHA {num_linha}] Erro ao inserir: {e}")
+    return ok, pulados
+
+
+def _gravar_lote(lote):
+    """
+    Grava o lote e retorna (ok, pulados).
+    """
+    if not lote:
+        return 0, 0
+    try:
+        _inserir_lote(lote)
+        return len(lote), 0
+    except Exception as e:
+        if classificar_erro(e) is not None:
+            # falha transitória mesmo depois das retentativas: desiste
+            raise
+        return _inserir_linha_a_linha(lote)
+
+
 def importar(arquivo: str):
     caminho = Path(arquivo)
     if not caminho.exists():
@@ -40,8 +116,9 @@ def importar(arquivo: str):
     dialeto = detectar_dialeto(caminho)
 
     ok, pulados = 0, 0
+    lote = []
 
-    with caminho.open(newline="", encoding="utf-8") as f, get_cursor() as cur:
+    with caminho.open(newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f, dialect=dialeto)
 
         if not reader.fieldnames:
@@ -84,31 +161,39 @@ def importar(arquivo: str):
             telefone = (linha.get(col_telefone) or "").strip() or None
             cidade = (linha.get(col_cidade) or "").strip() or None
 
-            # UF: tenta pegar do CSV; se não tiver, tenta derivar pela cidade (CIDADE_UF)
+            cidade_norm = normalizar_texto(cidade)
+
+            # UF: tenta pegar do CSV; se não tiver, tenta derivar pela cidade
+            # (sem diferenciar acentos: "Sao Paulo" -> SP)
             raw_uf = ""
             if col_uf:
                 raw_uf = (linha.get(col_uf) or "").strip().upper()[:2]
-            uf = raw_uf or (CIDADE_UF.get(cidade) if cidade else None)
+            uf = raw_uf or (CIDADE_UF_NORMALIZADA.get(cidade_norm) if cidade_norm else None)
 
             if not nome or not sobrenome:
                 print(f"[LINHA {reader.line_num}] Nome ou sobrenome vazio após processamento. Pulando. Valor original: '{nome_completo}'")
                 pulados += 1
                 continue
 
-            try:
-                cur.execute(
-                    """
-                    INSERT INTO clientes (nome, sobrenome, email, telefone, cidade, uf)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (email) DO NOTHING
-                    """,
-                    (nome, sobrenome, email, telefone, cidade, uf),
-                )
-                ok += 1
-            except Exception as e:
-                pulados += 1
-                print(f"[LINHA {reader.line_num}] Erro ao inserir: {e}")
-
+            lote.append((
+                reader.line_num,
+                (
+                    nome, sobrenome, email, telefone, cidade, uf,
+                    normalizar_texto(nome), normalizar_texto(sobrenome), cidade_norm,
+                ),
+            ))
+            if len(lote) >= TAMANHO_LOTE:
+                lote_ok, lote_pulados = _gravar_lote(lote)
+                ok += lote_ok
+                pulados += lote_pulados
+                lote = []
+
+        lote_ok, lote_pulados = _gravar_lote(lote)
+        ok += lote_ok
+        pulados += lote_pulados
+
+    # Junta as linhas de diferença que os lotes deixaram em clientes_contadores
+    compactar_contadores()
     print(f"Importação concluída. Sucesso: {ok} | Pulados: {pulados}")
 
 def main():
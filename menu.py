@@ -1,21 +1,64 @@
+import os
 import time
 
+import psycopg2.extras
+from psycopg2 import extensions
+
 from importar_clientes_csv import importar
 from src.clientes import (
-    buscar_por_sobrenome,
-    buscar_por_uf,
-    buscar_por_cidade,
-    buscar_vips,
-    buscar_por_status,
-    buscar_aniversariantes_mes,
-    buscar_aniversariantes_hoje,
-    estatisticas_clientes,
+    buscar_por_sobrenome_pagina,
+    buscar_por_uf_pagina,
+    buscar_por_cidade_pagina,
+    buscar_vips_pagina,
+    buscar_por_status_pagina,
+    buscar_aniversariantes_mes_pagina,
+    buscar_aniversariantes_hoje_pagina,
+    buscar_aniversariantes_proximos_dias_pagina,
+    abrir_listagem,
+    buscar_clientes,
     contar_clientes,
-    ranking_ufs,
-    ranking_cidades_por_uf,
+    painel_clientes,
+    pesquisar_cidade,
+    pesquisar_sobrenome,
+    pesquisar,
+    CANDIDATOS_PESQUISA,
 )
 from scripts.gerar_clientes_fake import gerar_clientes as gerar_clientes_fake
+from src.database import Cancelamento, TempoEsgotado, cache_stats
 from src.localidades import UFS, CIDADES
+from src.paginacao import ANTECIPADA, CONSULTA, JANELA, PaginasAntecipadas
+
+# Tempo máximo (segundos) de cada consulta feita pelo menu.
+TIMEOUT_CONSULTA = float(os.getenv("PG_TIMEOUT_MENU", "30"))
+
+# Páginas guardadas de cada lado da atual na paginação (0 = não busca a
+# próxima página em segundo plano).
+PAGINAS_JANELA = int(os.getenv("MENU_PAGINAS_JANELA", "2"))
+
+# "chave" (padrão): cada página é uma consulta paginada por (nome, id).
+# "cursor": a listagem abre um cursor rolável no servidor (SCROLL WITH HOLD)
+# e todas as páginas saem dele, da mesma foto do banco.
+PAGINACAO = os.getenv("MENU_PAGINACAO", "chave").strip().lower()
+
+ORIGEM_PAGINA = {
+    ANTECIPADA: "buscada em segundo plano",
+    JANELA: "já carregada",
+    CONSULTA: "consultada na hora",
+}
+
+# Estatísticas e rankings (opções 8, 12 e 13) desenham a partir do mesmo
+# painel_clientes(), que fica no cache de resultados (src/cache.py) até a
+# tabela clientes mudar: abrir as telas de novo não volta ao banco.
+def painel_atual():
+    return painel_clientes(timeout=TIMEOUT_CONSULTA)
+
+def imprimir_resumo_cache():
+    stats = cache_stats()
+    if stats["acertos"] or stats["faltas"]:
+        print(
+            f"Cache de resultados: {stats['acertos']} acertos, {stats['faltas']} faltas "
+            f"({stats['taxa_acerto']:.1f}% de acerto)."
+        )
 
 def imprimir_clientes(linhas):
     if not linhas:
@@ -46,71 +89,136 @@ def perguntar_por_pagina(mensagem: str, default: int = 20) -> int:
         print(f"Valor inválido. Usando {default}.")
         return default
 
-def listar_paginado(descricao: str, func_busca, *args):
+def listar_paginado(descricao: str, func_pagina, *args, filtros=None):
     """
-    Paginação para qualquer função de busca que aceite limit e offset.
+    Paginação para qualquer função buscar_*_pagina de src/clientes.py.
+
+    A paginação é por chave (nome, id), não por OFFSET: ir para a próxima
+    ou para a anterior custa o mesmo na página 1 ou na página 5.000.
+    Só o "ir direto para a página X" precisa pular linhas.
+
+    A próxima página é buscada em segundo plano enquanto a atual está na
+    tela (ver PaginasAntecipadas / MENU_PAGINAS_JANELA); o tempo exibido
+    diz se a página veio pronta ou foi consultada na hora.
+
+    Com MENU_PAGINACAO=cursor e `filtros` (os mesmos de buscar_clientes)
+    informados, a listagem inteira sai de um cursor rolável do servidor
+    (abrir_listagem): uma consulta só, uma foto só do banco.
 
     Comandos:
       - N ou n  -> próxima página
       - P ou p  -> página anterior
       - número  -> ir direto para a página X (ex: 3)
       - ENTER   -> sair da paginação
+
+    Retorna False se a busca não encontrou nada.
     """
     por_pagina = perguntar_por_pagina("Quantos registros por página? (ENTER = 20): ", default=20)
-    pagina = 0  # índice interno (0 = primeira página)
-
-    while True:
-        offset = pagina * por_pagina
+    pagina = 0        # índice interno (0 = primeira página)
+    cursor = None     # token da próxima/anterior (Pagina.proximo / Pagina.anterior)
+    pular = 0         # linhas a pular quando não há cursor (ir direto para a página X)
+    atual = None      # última página exibida
+    pagina_atual = 0
 
+    listagem = None
+    if PAGINACAO == "cursor" and filtros is not None:
         inicio = time.perf_counter()
-        linhas = func_busca(*args, limit=por_pagina, offset=offset)
-        fim = time.perf_counter()
-        duracao = (fim - inicio) * 1000  # ms
-
-        if not linhas:
-            if pagina == 0:
-                print("Nenhum resultado encontrado.")
-                break
-            else:
-                print("Não há registros nessa página. Voltando para a última página disponível.")
-                pagina -= 1
-                if pagina < 0:
-                    pagina = 0
-                continue
-
-        numero_pagina = pagina + 1
-        print(f"\n--- {descricao} | página {numero_pagina} ---")
-        imprimir_clientes(linhas)
-        print(f"\nConsulta retornou {len(linhas)} registros em {duracao:.1f} ms.")
-
-        comando = input(
-            f"\n[Você está na página {numero_pagina}] "
-            "Digite N=próxima, P=anterior, número da página ou ENTER para voltar ao menu: "
-        ).strip()
-
-        if not comando:
-            break
+        listagem = abrir_listagem(filtros, timeout=TIMEOUT_CONSULTA)
+        duracao = (time.perf_counter() - inicio) * 1000  # ms
+        func_pagina, args = listagem.pagina, ()
+        reaberturas = 0
+        print(
+            f"Listagem aberta num cursor do servidor em {duracao:.1f} ms: {listagem.total} "
+            f"registros (foto de {listagem.aberto_em:%H:%M:%S})."
+        )
 
-        if comando.isdigit():
-            alvo = int(comando)
-            if alvo <= 0:
-                print("Número de página deve ser >= 1.")
-            else:
-                pagina = alvo - 1
-            continue
-
-        primeira_letra = comando[0].lower()
-        if primeira_letra == "n":
-            pagina += 1
-            continue
-        elif primeira_letra == "p":
-            if pagina == 0:
-                print("Você já está na primeira página.")
+    def buscar(cursor, pular):
+        return func_pagina(
+            *args, por_pagina=por_pagina, cursor=cursor, pular=pular, timeout=TIMEOUT_CONSULTA
+        )
+
+    # Enquanto a página k está na tela, a k+1 já vai sendo buscada; sair da
+    # paginação cancela o que estiver em andamento.
+    janela = PaginasAntecipadas(buscar, raio=PAGINAS_JANELA, novo_cancelamento=Cancelamento)
+    try:
+        while True:
+            inicio = time.perf_counter()
+            resultado, origem = janela.obter(pagina, cursor, pular)
+            fim = time.perf_counter()
+            duracao = (fim - inicio) * 1000  # ms
+
+            if listagem is not None and listagem.reaberturas != reaberturas:
+                reaberturas = listagem.reaberturas
+                print(
+                    "A listagem ficou parada e o cursor foi fechado; reaberta com os dados "
+                    f"de {listagem.aberto_em:%H:%M:%S} ({listagem.total} registros)."
+                )
+
+            if not resultado.linhas:
+                if atual is None:
+                    print("Nenhum resultado encontrado.")
+                    return False
+                print("Não há registros nessa página. Voltando para a última página exibida.")
+                resultado, pagina = atual, pagina_atual
             else:
-                pagina -= 1
-            continue
-        else:
-            break
+                atual, pagina_atual = resultado, pagina
+                numero_pagina = pagina + 1
+                de_total = f" de {-(-listagem.total // por_pagina)}" if listagem is not None else ""
+                print(f"\n--- {descricao} | página {numero_pagina}{de_total} ---")
+                imprimir_clientes(resultado.linhas)
+                print(
+                    f"\nConsulta retornou {len(resultado.linhas)} registros em {duracao:.1f} ms "
+                    f"({ORIGEM_PAGINA[origem]})."
+                )
+                janela.antecipar(pagina + 1, resultado.proximo)
+
+            while True:
+                numero_pagina = pagina + 1
+                comando = input(
+                    f"\n[Você está na página {numero_pagina}] "
+                    "Digite N=próxima, P=anterior, número da página ou ENTER para voltar ao menu: "
+                ).strip()
+
+                if not comando:
+                    return True
+
+                if comando.isdigit():
+                    alvo = int(comando)
+                    if alvo <= 0:
+                        print("Número de página deve ser >= 1.")
+                        continue
+                    pagina, cursor, pular = alvo - 1, None, (alvo - 1) * por_pagina
+                    break
+
+                primeira_letra = comando[0].lower()
+                if primeira_letra == "n":
+                    if resultado.proximo is None:
+                        print("Você já está na última página.")
+                        continue
+                    pagina, cursor, pular = pagina + 1, resultado.proximo, 0
+                    break
+                elif primeira_letra == "p":
+                    if resultado.anterior is None:
+                        print("Você já está na primeira página.")
+                        continue
+                    pagina, cursor, pular = pagina - 1, resultado.anterior, 0
+                    break
+                else:
+                    return True
+    finally:
+        janela.fechar()
+        if listagem is not None:
+            listagem.fechar()
+
+def mostrar_parecidos(func_pesquisa, texto: str, limite: int = 10):
+    """
+    Quando a busca exata não acha nada, mostra os clientes com grafia
+    mais parecida (ex.: "Olivera" -> "Oliveira").
+    """
+    parecidos = func_pesquisa(texto, limit=limite, timeout=TIMEOUT_CONSULTA)
+    if parecidos:
+        print(f"\nResultados parecidos com '{texto}':")
+        imprimir_clientes(parecidos)
 
 def opcao_importar():
     caminho = input("Informe o caminho do arquivo CSV (ENTER para usar clientes_exemplo.csv): ").strip()
@@ -123,7 +231,11 @@ def opcao_buscar_sobrenome():
     if not sobrenome:
         print("Sobrenome não pode ser vazio.")
         return
-    listar_paginado(f"Clientes com sobrenome '{sobrenome}'", buscar_por_sobrenome, sobrenome)
+    if not listar_paginado(
+        f"Clientes com sobrenome '{sobrenome}'", buscar_por_sobrenome_pagina, sobrenome,
+        filtros={"sobrenome": sobrenome},
+    ):
+        mostrar_parecidos(pesquisar_sobrenome, sobrenome)
 
 def opcao_buscar_estado():
     print("\nUFs disponíveis:", ", ".join(UFS))
@@ -134,7 +246,7 @@ def opcao_buscar_estado():
     if uf not in UFS:
         print("UF não está na lista de UFs conhecidas.")
         return
-    listar_paginado(f"Clientes da UF {uf}", buscar_por_uf, uf)
+    listar_paginado(f"Clientes da UF {uf}", buscar_por_uf_pagina, uf, filtros={"uf": uf})
 
 def opcao_buscar_cidade():
     print("\nAlgumas cidades conhecidas (exemplos):")
@@ -145,23 +257,30 @@ def opcao_buscar_cidade():
     if not texto:
         print("Cidade não pode ser vazia.")
         return
-    listar_paginado(f"Clientes da cidade contendo '{texto}'", buscar_por_cidade, texto)
+    if not listar_paginado(
+        f"Clientes da cidade contendo '{texto}'", buscar_por_cidade_pagina, texto,
+        filtros={"cidade": texto},
+    ):
+        mostrar_parecidos(pesquisar_cidade, texto)
 
 def opcao_buscar_vips():
-    listar_paginado("Clientes VIP", buscar_vips)
+    listar_paginado("Clientes VIP", buscar_vips_pagina, filtros={"vip": True})
 
 def opcao_buscar_inativos():
-    listar_paginado("Clientes INATIVOS", buscar_por_status, "inativo")
+    listar_paginado(
+        "Clientes INATIVOS", buscar_por_status_pagina, "inativo",
+        filtros={"status_cliente": "inativo"},
+    )
 
 def opcao_buscar_ativos():
-    listar_paginado("Clientes ATIVOS", buscar_por_status, "ativo")
+    listar_paginado(
+        "Clientes ATIVOS", buscar_por_status_pagina, "ativo",
+        filtros={"status_cliente": "ativo"},
+    )
 
 def opcao_estatisticas():
-    stats = estatisticas_clientes()
-    total = stats.get("total", 0)
-    ativos = stats.get("ativos", 0)
-    inativos = stats.get("inativos", 0)
-    vips = stats.get("vips", 0)
+    painel = painel_atual()
+    total, ativos, inativos, vips = painel.total, painel.ativos, painel.inativos, painel.vips
 
     def pct(valor: int) -> float:
         return (valor * 100.0 / total) if total > 0 else 0.0
@@ -171,8 +290,16 @@ def opcao_estatisticas():
     print(f"Ativos:    {ativos:7d}  ({pct(ativos):6.2f} %)")
     print(f"Inativos:  {inativos:7d}  ({pct(inativos):6.2f} %)")
     print(f"VIPs:      {vips:7d}  ({pct(vips):6.2f} %)")
+    print(f"(números de {painel.gerado_em:%H:%M:%S})")
     print()
 
+def opcao_contagem_exata():
+    inicio = time.perf_counter()
+    total = contar_clientes("exato", timeout=TIMEOUT_CONSULTA)
+    duracao = (time.perf_counter() - inicio) * 1000
+    print(f"\nClientes cadastrados (contagem exata): {total}")
+    print(f"Contagem feita em {duracao:.1f} ms.")
+
 def opcao_aniversariantes_mes():
     mes_txt = input("Digite o mês (1-12): ").strip()
     if not mes_txt:
@@ -186,10 +313,65 @@ def opcao_aniversariantes_mes():
     if not 1 <= mes <= 12:
         print("Mês deve estar entre 1 e 12.")
         return
-    listar_paginado(f"Aniversariantes do mês {mes}", buscar_aniversariantes_mes, mes)
+    listar_paginado(
+        f"Aniversariantes do mês {mes}", buscar_aniversariantes_mes_pagina, mes,
+        filtros={"mes_aniversario": mes},
+    )
 
 def opcao_aniversariantes_hoje():
-    listar_paginado("Aniversariantes de hoje", buscar_aniversariantes_hoje)
+    listar_paginado("Aniversariantes de hoje", buscar_aniversariantes_hoje_pagina)
+
+def opcao_aniversariantes_proximos_dias():
+    dias = perguntar_por_pagina("Quantos dias a partir de hoje? (ENTER = 7): ", default=7)
+    listar_paginado(
+        f"Aniversariantes dos próximos {dias} dias",
+        buscar_aniversariantes_proximos_dias_pagina,
+        dias,
+        filtros={"aniversario_proximos_dias": dias},
+    )
+
+def opcao_busca_combinada():
+    print("Preencha os filtros desejados (ENTER = não filtrar).")
+    filtros = {}
+    uf = input("UF (ex: SP): ").strip().upper()
+    if uf:
+        filtros["uf"] = uf
+    cidade = input("Cidade (ou parte do nome): ").strip()
+    if cidade:
+        filtros["cidade"] = cidade
+    sobrenome = input("Sobrenome: ").strip()
+    if sobrenome:
+        filtros["sobrenome"] = sobrenome
+    status = input("Status (ativo/inativo): ").strip().lower()
+    if status:
+        filtros["status_cliente"] = status
+    vip = input("Só VIPs? (s/n): ").strip().lower()
+    if vip in ("s", "n"):
+        filtros["vip"] = vip == "s"
+    mes_txt = input("Mês de aniversário (1-12): ").strip()
+    if mes_txt:
+        if not mes_txt.isdigit() or not 1 <= int(mes_txt) <= 12:
+            print("Mês deve estar entre 1 e 12.")
+            return
+        filtros["mes_aniversario"] = int(mes_txt)
+
+    descricao = ", ".join(f"{campo}={valor}" for campo, valor in filtros.items()) or "todos"
+    listar_paginado(f"Busca combinada ({descricao})", buscar_clientes, filtros, filtros=filtros)
+
+def opcao_pesquisa_livre():
+    texto = input("Digite nome, sobrenome, email ou cidade (ou parte deles): ").strip()
+    if not texto:
+        print("Texto não pode ser vazio.")
+        return
+    limite = perguntar_por_pagina("Quantos resultados? (ENTER = 20): ", default=20)
+    inicio = time.perf_counter()
+    linhas = pesquisar(
+        texto, limit=limite, candidatos=max(CANDIDATOS_PESQUISA, limite), timeout=TIMEOUT_CONSULTA
+    )
+    duracao = (time.perf_counter() - inicio) * 1000
+    print(f"\n--- Pesquisa '{texto}' (mais relevantes primeiro) ---")
+    imprimir_clientes(linhas)
+    print(f"\nConsulta retornou {len(linhas)} registros em {duracao:.1f} ms.")
 
 def opcao_gerar_clientes_fake():
     txt = input("Quantos clientes FAKE deseja gerar? (ex: 10000) ").strip()
@@ -205,7 +387,8 @@ def opcao_gerar_clientes_fake():
 
 def opcao_ranking_ufs():
     limite = perguntar_por_pagina("Quantos estados no ranking? (ENTER = 10): ", default=10)
-    dados = ranking_ufs(limit=limite)
+    painel = painel_atual()
+    dados = painel.ranking_ufs(limite)
     if not dados:
         print("Nenhum dado para exibir.")
         return
@@ -214,6 +397,7 @@ def opcao_ranking_ufs():
     print("---------------------------")
     for i, (uf, qtd) in enumerate(dados, start=1):
         print(f"{i:3d} | {uf:2s} | {qtd:10d}")
+    print(f"(números de {painel.gerado_em:%H:%M:%S})")
 
 def opcao_ranking_cidades_por_uf():
     print("\nUFs disponíveis:", ", ".join(UFS))
@@ -222,7 +406,8 @@ def opcao_ranking_cidades_por_uf():
         print("UF inválida ou desconhecida.")
         return
     limite = perguntar_por_pagina("Quantas cidades no ranking? (ENTER = 10): ", default=10)
-    dados = ranking_cidades_por_uf(uf, limit=limite)
+    painel = painel_atual()
+    dados = painel.ranking_cidades(uf, limite)
     if not dados:
         print("Nenhuma cidade com clientes para essa UF.")
         return
@@ -231,10 +416,21 @@ def opcao_ranking_cidades_por_uf():
     print("-------------------------------------------")
     for i, (cidade, qtd) in enumerate(dados, start=1):
         print(f"{i:3d} | {cidade:21s} | {qtd:10d}")
+    print(f"(números de {painel.gerado_em:%H:%M:%S})")
 
 def main():
+    # Modo "verde" do psycopg2: a espera pelo servidor acontece em Python,
+    # então Ctrl-C no meio de uma consulta manda um cancelamento de verdade
+    # ao PostgreSQL (em vez de ficar preso até a consulta terminar).
+    extensions.set_wait_callback(psycopg2.extras.wait_select)
+
     while True:
-        total = contar_clientes()
+        # Estimativa (estatísticas do planejador): instantânea com qualquer
+        # tamanho de tabela. A contagem exata é a opção 17.
+        try:
+            total = f"~{contar_clientes('estimado', timeout=TIMEOUT_CONSULTA)}"
+        except extensions.QueryCanceledError:
+            total = "?"
         print("\n=== MENU SISTEMA CLIENTES ===")
         print(f"(Clientes cadastrados: {total})")
         print("1) Importar clientes de CSV")
@@ -250,40 +446,64 @@ def main():
         print("11) Gerar clientes FAKE de teste")
         print("12) Ver ranking de estados (clientes por UF)")
         print("13) Ver ranking de cidades de uma UF")
+        print("14) Listar aniversariantes dos próximos dias")
+        print("15) Busca combinada (vários filtros)")
+        print("16) Pesquisa livre (nome, sobrenome, email, cidade)")
+        print("17) Contar clientes (contagem exata)")
         print("0) Sair")
         escolha = input("Escolha uma opção: ").strip()
 
-        if escolha == "1":
-            opcao_importar()
-        elif escolha == "2":
-            opcao_buscar_sobrenome()
-        elif escolha == "3":
-            opcao_buscar_estado()
-        elif escolha == "4":
-            opcao_buscar_cidade()
-        elif escolha == "5":
-            opcao_buscar_vips()
-        elif escolha == "6":
-            opcao_buscar_inativos()
-        elif escolha == "7":
-            opcao_buscar_ativos()
-        elif escolha == "8":
-            opcao_estatisticas()
-        elif escolha == "9":
-            opcao_aniversariantes_mes()
-        elif escolha == "10":
-            opcao_aniversariantes_hoje()
-        elif escolha == "11":
-            opcao_gerar_clientes_fake()
-        elif escolha == "12":
-            opcao_ranking_ufs()
-        elif escolha == "13":
-            opcao_ranking_cidades_por_uf()
-        elif escolha == "0":
+        if escolha == "0":
+            imprimir_resumo_cache()
             print("Saindo do menu.")
             break
-        else:
-            print("Opção inválida, tente novamente.")
+
+        # Se a consulta demorar demais (PG_TIMEOUT_MENU) ou o usuário apertar
+        # Ctrl-C, avisa e volta para o menu em vez de encerrar o programa.
+        try:
+            if escolha == "1":
+                opcao_importar()
+            elif escolha == "2":
+                opcao_buscar_sobrenome()
+            elif escolha == "3":
+                opcao_buscar_estado()
+            elif escolha == "4":
+                opcao_buscar_cidade()
+            elif escolha == "5":
+                opcao_buscar_vips()
+            elif escolha == "6":
+                opcao_buscar_inativos()
+            elif escolha == "7":
+                opcao_buscar_ativos()
+            elif escolha == "8":
+                opcao_estatisticas()
+            elif escolha == "9":
+                opcao_aniversariantes_mes()
+            elif escolha == "10":
+                opcao_aniversariantes_hoje()
+            elif escolha == "11":
+                opcao_gerar_clientes_fake()
+            elif escolha == "12":
+                opcao_ranking_ufs()
+            elif escolha == "13":
+                opcao_ranking_cidades_por_uf()
+            elif escolha == "14":
+                opcao_aniversariantes_proximos_dias()
+            elif escolha == "15":
+                opcao_busca_combinada()
+            elif escolha == "16":
+                opcao_pesquisa_livre()
+            elif escolha == "17":
+                opcao_contagem_exata()
+            else:
+                print("Opção inválida, tente novamente.")
+        except TempoEsgotado:
+            print(f"\nA consulta passou de {TIMEOUT_CONSULTA:g}s e foi cancelada no servidor.")
+            print("Tente um filtro mais específico (ou aumente PG_TIMEOUT_MENU).")
+        except extensions.QueryCanceledError:
+            print("\nConsulta cancelada.")
+        except KeyboardInterrupt:
+            print("\nOperação interrompida.")
 
 if __name__ == "__main__":
     main()
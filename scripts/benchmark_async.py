@@ -0,0 +1,98 @@
+"""
+Benchmark da camada assíncrona (src/clientes_async.py).
+
+Dispara N "clientes" concorrentes, cada um fazendo várias buscas, e mede
+quantas consultas por segundo o sistema consegue atender. Para comparação,
+roda a mesma carga com a versão síncrona (src/clientes.py), uma consulta
+de cada vez.
+
+Uso:
+    python -m scripts.benchmark_async              # padrão: 1,2,4,8,16,32 concorrentes
+    python -m scripts.benchmark_async 1 4 16 64    # níveis escolhidos
+
+Dica: PGPOOL_MAX limita quantas consultas rodam de fato em paralelo.
+
+O cache de resultados (@em_cache) fica desligado durante o benchmark: a
+camada async não tem cache, e com ele o ranking_ufs síncrono viria da
+memória em vez do banco, inflando a vazão do lado síncrono.
+"""
+import os
+import sys
+import time
+import asyncio
+import random
+
+from src import clientes
+from src import clientes_async
+from src.localidades import UFS
+
+CONSULTAS_POR_CLIENTE = 50
+NIVEIS_PADRAO = [1, 2, 4, 8, 16, 32]
+
+
+def _proxima_consulta(rng: random.Random):
+    """
+    Sorteia uma consulta típica do menu (nome da função, argumentos).
+    """
+    tipo = rng.random()
+    if tipo < 0.5:
+        return "buscar_por_uf", (rng.choice(UFS),), {"limit": 20}
+    if tipo < 0.8:
+        return "buscar_por_status", ("inativo",), {"limit": 20, "offset": rng.randint(0, 50) * 20}
+    if tipo < 0.9:
+        return "ranking_ufs", (), {"limit": 10}
+    return "contar_clientes", (), {}
+
+
+async def _cliente_async(semente: int) -> int:
+    rng = random.Random(semente)
+    for _ in range(CONSULTAS_POR_CLIENTE):
+        nome, args, kwargs = _proxima_consulta(rng)
+        await getattr(clientes_async, nome)(*args, **kwargs)
+    return CONSULTAS_POR_CLIENTE
+
+
+async def _rodar_nivel(concorrentes: int) -> float:
+    inicio = time.perf_counter()
+    totais = await asyncio.gather(*(_cliente_async(i) for i in range(concorrentes)))
+    duracao = time.perf_counter() - inicio
+    return sum(totais) / duracao
+
+
+def _rodar_sincrono(concorrentes: int) -> float:
+    inicio = time.perf_counter()
+    total = 0
+    for semente in range(concorrentes):
+        rng = random.Random(semente)
+        for _ in range(CONSULTAS_POR_CLIENTE):
+            nome, args, kwargs = _proxima_consulta(rng)
+            getattr(clientes, nome)(*args, **kwargs)
+            total += 1
+    return total / (time.perf_counter() - inicio)
+
+
+async def main_async(niveis):
+    await clientes_async.get_pool()
+    # aquecimento: abre conexões e prepara as consultas
+    await _rodar_nivel(max(niveis))
+
+    print(f"{'Concorrentes':>12} | {'síncrono (q/s)':>15} | {'async (q/s)':>12} | {'ganho':>6}")
+    print("-" * 56)
+    for n in niveis:
+        qps_sync = _rodar_sincrono(n)
+        qps_async = await _rodar_nivel(n)
+        print(f"{n:12d} | {qps_sync:15.1f} | {qps_async:12.1f} | {qps_async / qps_sync:5.2f}x")
+
+    print(f"\nPool async: {clientes_async.pool_stats()}")
+    await clientes_async.fechar_pool()
+
+
+def main():
+    # as duas versões vão ao banco em toda consulta (ver docstring)
+    os.environ["CACHE_RESULTADOS"] = "0"
+    niveis = [int(x) for x in sys.argv[1:]] or NIVEIS_PADRAO
+    asyncio.run(main_async(niveis))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark de memória das linhas de clientes: tuplas do psycopg2 x ClienteRow.
+
+Busca as mesmas N linhas (SELECT de _SQL_SELECT_CLIENTES) das duas formas
+e mede com tracemalloc quantos bytes cada linha ocupa depois de carregada:
+
+- tupla:                   cursor padrão (datetime/date convertidos na hora)
+- ClienteRow:              CursorClientes (cidade, uf e status compartilhados,
+                           datas ainda como texto)
+- ClienteRow, datas lidas: o mesmo, depois de ler criado_em e data_nascimento
+                           de todas as linhas
+
+Uso:
+    python -m scripts.benchmark_memoria_linhas            # 200.000 linhas
+    python -m scripts.benchmark_memoria_linhas 1000000
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from src.clientes import _SQL_SELECT_CLIENTES, CursorClientes
+from src.database import get_cursor
+
+LINHAS_PADRAO = 200_000
+
+
+def _medir(descricao: str, carregar, n: int):
+    """
+    Roda `carregar()` com o tracemalloc ligado e imprime bytes por linha
+    (memória que continua ocupada pelas linhas devolvidas) e o tempo.
+    """
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    linhas = carregar()
+    duracao = time.perf_counter() - inicio
+    gc.collect()
+    atual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = len(linhas)
+    print(
+        f"{descricao:26s} | {total:9d} | {atual / max(1, total):10.0f} | "
+        f"{pico / 1024 / 1024:9.1f} | {duracao:7.2f}"
+    )
+    return linhas, atual
+
+
+def main(n: int = LINHAS_PADRAO):
+    sql = _SQL_SELECT_CLIENTES + " ORDER BY id LIMIT %s"
+
+    def tuplas():
+        with get_cursor(somente_leitura=True) as cur:
+            cur.execute(sql, (n,))
+            return cur.fetchall()
+
+    def linhas_compactas():
+        with get_cursor(somente_leitura=True, cursor_factory=CursorClientes) as cur:
+            cur.execute(sql, (n,))
+            return cur.fetchall()
+
+    print(f"\n=== Memória por linha de cliente ({n} linhas) ===")
+    print("Formato                    |    Linhas | Bytes/linha | Pico (MB) | Tempo (s)")
+    print("-" * 81)
+
+    resultado, antes = _medir("tupla", tuplas, n)
+    del resultado
+
+    resultado, depois = _medir("ClienteRow", linhas_compactas, n)
+
+    def ler_datas():
+        for linha in resultado:
+            linha.criado_em, linha.data_nascimento
+        return resultado
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    ler_datas()
+    duracao = time.perf_counter() - inicio
+    gc.collect()
+    extra = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    total = len(resultado)
+    print(
+        f"{'ClienteRow, datas lidas':26s} | {total:9d} | {(depois + extra) / max(1, total):10.0f} | "
+        f"{'':>9s} | {duracao:7.2f}"
+    )
+
+    if antes:
+        print(f"\nClienteRow ocupa {100.0 * depois / antes:.0f}% da memória das tuplas.")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else LINHAS_PADRAO)
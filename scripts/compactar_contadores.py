@@ -0,0 +1,18 @@
+"""
+Compacta a tabela clientes_contadores (migração 0009_clientes_contadores.sql).
+
+Cada INSERT/UPDATE/DELETE em clientes acrescenta linhas de diferença aos
+contadores; esta rotina junta as linhas de cada grupo numa só, para as
+estatísticas e rankings continuarem somando poucas linhas. Pode rodar com
+o sistema em uso. Sugestão: agendar no cron, ex. a cada 10 minutos:
+
+    */10 * * * * cd /caminho/do/projeto && python -m scripts.compactar_contadores
+"""
+from src.clientes import compactar_contadores
+
+def main():
+    antes = compactar_contadores()
+    print(f"clientes_contadores compactada ({antes} linhas antes).")
+
+if __name__ == "__main__":
+    main()
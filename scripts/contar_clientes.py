@@ -1,9 +1,10 @@
-from database import get_cursor
+from src.clientes import contar_clientes
 
-def main():
-    with get_cursor() as cur:
-        cur.execute("SELECT COUNT(*) FROM clientes")
-        total = cur.fetchone()[0]
+def main(modo: str = "exato"):
+    total = contar_clientes(modo)
+    if modo == "estimado":
+        print(f"Total estimado de clientes na tabela: ~{total}")
+    else:
         print(f"Total de clientes na tabela: {total}")
 
 if __name__ == "__main__":
@@ -14,7 +14,7 @@ CREATE TABLE IF NOT EXISTS produtos (
 );
 
 -- Criar índice para busca por categoria
-CREATE INDEX idx_produtos_categoria ON produtos(categoria);
+CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos(categoria);
 
 -- Inserir alguns produtos de teste
 INSERT INTO produtos (nome, descricao, preco, estoque, categoria) VALUES
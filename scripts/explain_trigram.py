@@ -0,0 +1,115 @@
+"""
+Mostra, com EXPLAIN ANALYZE, o ganho dos índices nas buscas por cidade e
+sobrenome: trigramas em cidade_norm e btree em sobrenome_norm
+(scripts/migracoes/0008_colunas_normalizadas.sql) e GiST de trigramas nas
+duas colunas (0011_indices_trigram_gist.sql).
+
+As buscas por pedaço de texto (buscar_por_cidade / buscar_por_sobrenome)
+rodam duas vezes:
+  - sem índice: SET LOCAL enable_bitmapscan/enable_indexscan = off
+    (força leitura sequencial);
+  - com índice: plano normal do PostgreSQL.
+
+As buscas por semelhança (pesquisar_cidade / pesquisar_sobrenome) só rodam
+com índice: elas leem o índice GiST de trigramas já na ordem de semelhança
+(migração 0011_indices_trigram_gist.sql) e param nos primeiros resultados.
+
+Uso:
+    python -m scripts.explain_trigram                     # buscas padrão
+    python -m scripts.explain_trigram Olivera "são paulo"  # sobrenome e cidade
+
+Para ver a diferença em escala, gere a massa antes (ex.: 1M ou 10M):
+    python -m scripts.gerar_clientes_fake 1000000
+"""
+import sys
+
+from database import get_cursor
+from src.clientes import (
+    _SQL_PESQUISA,
+    _WHERE_CIDADE,
+    _WHERE_SOBRENOME,
+    _montar_select,
+    _params_cidade,
+    _params_pesquisa,
+    _params_sobrenome,
+)
+
+LIMITE = 20
+
+
+def _buscas(sobrenome: str, cidade: str):
+    """
+    (descrição, sql, params, comparar_sem_indice) das consultas, iguais às
+    de src/clientes.py.
+    """
+    sql_cidade, params_cidade = _montar_select(_WHERE_CIDADE, _params_cidade(cidade), LIMITE, None)
+    sql_sobrenome, params_sobrenome = _montar_select(_WHERE_SOBRENOME, _params_sobrenome(sobrenome), LIMITE, None)
+    return [
+        (f"buscar_por_cidade('{cidade}')", sql_cidade, params_cidade, True),
+        (f"buscar_por_sobrenome('{sobrenome}')", sql_sobrenome, params_sobrenome, True),
+        (
+            f"pesquisar_cidade('{cidade}')",
+            _SQL_PESQUISA.format(coluna="cidade_norm"),
+            _params_pesquisa(cidade, LIMITE),
+            False,
+        ),
+        (
+            f"pesquisar_sobrenome('{sobrenome}')",
+            _SQL_PESQUISA.format(coluna="sobrenome_norm"),
+            _params_pesquisa(sobrenome, LIMITE),
+            False,
+        ),
+    ]
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def _explain(sql, params, usar_indice: bool):
+    """
+    Roda EXPLAIN ANALYZE e devolve (tempo_ms, resumo dos nós de leitura).
+    """
+    with get_cursor(somente_leitura=True) as cur:
+        if not usar_indice:
+            cur.execute("SET LOCAL enable_bitmapscan = off")
+            cur.execute("SET LOCAL enable_indexscan = off")
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        resultado = cur.fetchone()[0][0]
+
+    leituras = []
+    for no in _nos(resultado["Plan"]):
+        tipo = no["Node Type"]
+        if "Scan" in tipo:
+            indice = no.get("Index Name")
+            leituras.append(f"{tipo} ({indice})" if indice else tipo)
+    return resultado["Execution Time"], ", ".join(leituras)
+
+
+def main():
+    sobrenome = sys.argv[1] if len(sys.argv) > 1 else "Olivera"
+    cidade = sys.argv[2] if len(sys.argv) > 2 else "paulo"
+
+    with get_cursor(somente_leitura=True) as cur:
+        cur.execute("SELECT COUNT(*) FROM clientes")
+        total = cur.fetchone()[0]
+    print(f"Clientes na tabela: {total:,}".replace(",", "."))
+    print()
+
+    for descricao, sql, params, comparar in _buscas(sobrenome, cidade):
+        print(descricao)
+        com_ms, com_plano = _explain(sql, params, usar_indice=True)
+        if comparar:
+            sem_ms, sem_plano = _explain(sql, params, usar_indice=False)
+            ganho = sem_ms / com_ms if com_ms > 0 else float("inf")
+            print(f"  sem índice: {sem_ms:10.1f} ms  | {sem_plano}")
+        print(f"  com índice: {com_ms:10.1f} ms  | {com_plano}")
+        if comparar:
+            print(f"  ganho:      {ganho:10.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
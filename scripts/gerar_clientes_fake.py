@@ -3,8 +3,12 @@ import random
 import uuid
 from datetime import date, timedelta
 
-from database import get_cursor
+from psycopg2.extras import execute_values
+
+from database import get_cursor, idempotente
+from src.clientes import compactar_contadores
 from src.localidades import CIDADE_UF, CIDADES
+from src.utils_nomes import normalizar_texto
 
 # Alguns nomes e sobrenomes para combinar
 PRIMEIROS_NOMES = [
@@ -41,23 +45,31 @@ def gerar_telefone() -> str:
     numero = random.randint(900000000, 999999999)
     return f"{ddd}{numero}"
 
+@idempotente
 def salvar_batch(batch):
     """
     Recebe uma lista de tuplas com dados dos clientes e salva tudo de uma vez.
+    Pode ser repetido com segurança (e-mails são únicos + ON CONFLICT DO NOTHING).
     """
     if not batch:
         return
+    # Um INSERT com várias linhas (execute_values) em vez de um por cliente:
+    # menos idas ao banco e uma linha de diferença por grupo em
+    # clientes_contadores, em vez de uma por cliente.
     with get_cursor() as cur:
-        cur.executemany(
+        execute_values(
+            cur,
             """
             INSERT INTO clientes (
                 nome, sobrenome, email, telefone,
-                cidade, uf, status_cliente, vip, data_nascimento
+                cidade, uf, status_cliente, vip, data_nascimento,
+                nome_norm, sobrenome_norm, cidade_norm
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES %s
             ON CONFLICT (email) DO NOTHING
             """,
             batch,
+            page_size=len(batch),
         )
 
 def gerar_clientes(qtd: int):
@@ -105,6 +117,9 @@ def gerar_clientes(qtd: int):
                     status_cliente,
                     vip,
                     data_nasc,
+                    normalizar_texto(primeiro),
+                    normalizar_texto(sobrenome),
+                    normalizar_texto(cidade),
                 )
             )
             usados += 1
@@ -141,6 +156,9 @@ def gerar_clientes(qtd: int):
                 status_cliente,
                 vip,
                 data_nasc,
+                normalizar_texto(primeiro),
+                normalizar_texto(sobrenome),
+                normalizar_texto(cidade),
             )
         )
 
@@ -156,6 +174,9 @@ def gerar_clientes(qtd: int):
         gerados += len(batch)
         print(f"... {gerados} clientes preparados (último lote salvo).")
 
+    # Cada lote deixou linhas de diferença em clientes_contadores; junta agora
+    # para as estatísticas não precisarem somar milhares de linhas
+    compactar_contadores()
     print("Geração concluída.")
 
 def main():
@@ -1,3 +1,7 @@
+-- ============================================================================
+-- 0001: tabela de clientes e índices básicos
+-- ============================================================================
+
 CREATE TABLE IF NOT EXISTS clientes (
   id SERIAL PRIMARY KEY,
   nome TEXT NOT NULL,
@@ -24,6 +28,7 @@ ALTER TABLE clientes
 
 -- Índices para buscas rápidas
 CREATE INDEX IF NOT EXISTS idx_clientes_sobrenome ON clientes (sobrenome);
+CREATE INDEX IF NOT EXISTS idx_clientes_nome_id ON clientes (nome, id);  -- ordem das listagens (paginação por chave)
 CREATE INDEX IF NOT EXISTS idx_clientes_uf ON clientes (uf);
 CREATE INDEX IF NOT EXISTS idx_clientes_cidade ON clientes (cidade);
 CREATE INDEX IF NOT EXISTS idx_clientes_status ON clientes (status_cliente);
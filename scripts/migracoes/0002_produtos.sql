@@ -0,0 +1,16 @@
+-- ============================================================================
+-- 0002: tabela de produtos
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS produtos (
+    id SERIAL PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    descricao TEXT,
+    preco DECIMAL(10,2) NOT NULL,
+    estoque INTEGER DEFAULT 0,
+    categoria VARCHAR(50),
+    data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Busca por categoria
+CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos(categoria);
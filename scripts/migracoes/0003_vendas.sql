@@ -0,0 +1,28 @@
+-- ============================================================================
+-- 0003: tabela de vendas (relaciona clientes com produtos)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS vendas (
+    id SERIAL PRIMARY KEY,
+    cliente_id INTEGER NOT NULL REFERENCES clientes(id) ON DELETE CASCADE,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id) ON DELETE CASCADE,
+    quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+    valor_unitario DECIMAL(10, 2) NOT NULL CHECK (valor_unitario >= 0),
+    valor_total DECIMAL(10, 2) NOT NULL CHECK (valor_total >= 0),
+    data_venda TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    observacao TEXT,
+    CONSTRAINT vendas_valores_check CHECK (valor_total = quantidade * valor_unitario)
+);
+
+CREATE INDEX IF NOT EXISTS idx_vendas_cliente ON vendas(cliente_id);
+CREATE INDEX IF NOT EXISTS idx_vendas_produto ON vendas(produto_id);
+CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas(data_venda);
+
+COMMENT ON TABLE vendas IS 'Tabela de vendas - relaciona clientes com produtos';
+COMMENT ON COLUMN vendas.cliente_id IS 'ID do cliente que comprou';
+COMMENT ON COLUMN vendas.produto_id IS 'ID do produto vendido';
+COMMENT ON COLUMN vendas.quantidade IS 'Quantidade vendida';
+COMMENT ON COLUMN vendas.valor_unitario IS 'Valor unitário no momento da venda';
+COMMENT ON COLUMN vendas.valor_total IS 'Valor total da venda (quantidade * valor_unitario)';
+COMMENT ON COLUMN vendas.data_venda IS 'Data e hora da venda';
+COMMENT ON COLUMN vendas.observacao IS 'Observações sobre a venda';
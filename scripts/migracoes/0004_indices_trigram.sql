@@ -0,0 +1,22 @@
+-- ============================================================================
+-- 0004: índices de trigramas (pg_trgm) para buscas por pedaço de texto
+--
+-- Deixam usar índice em:
+--   cidade ILIKE '%paulo%'        (busca por parte do nome)
+--   sobrenome ILIKE 'silva'       (busca sem diferenciar maiúsculas)
+--   'Olivera' <% sobrenome        (busca aproximada: acha "Oliveira")
+--
+-- CONCURRENTLY não pode rodar dentro de transação: o runner de migrações
+-- (python -m src.cli migrate) executa este arquivo comando a comando.
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- CONCURRENTLY: não bloqueia inserções/atualizações enquanto o índice é criado
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_cidade_trgm
+    ON clientes USING gin (cidade gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_sobrenome_trgm
+    ON clientes USING gin (sobrenome gin_trgm_ops);
+
+ANALYZE clientes;
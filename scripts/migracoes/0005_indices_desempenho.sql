@@ -0,0 +1,34 @@
+-- ============================================================================
+-- 0005: índices compostos/parciais para os filtros de src/clientes.py e
+-- src/vendas.py
+--
+--   vip = TRUE ORDER BY nome, id            -> idx_clientes_vip_nome (parcial)
+--   uf = %s ... GROUP BY cidade             -> idx_clientes_uf_cidade
+--   status_cliente = %s ORDER BY nome, id   -> idx_clientes_status_nome
+--   vendas WHERE cliente_id = %s
+--          ORDER BY data_venda DESC         -> idx_vendas_cliente_data
+--
+-- Os índices de uma coluna só que viram prefixo dos novos (uf, status_cliente,
+-- vendas.cliente_id) e o índice em `vip` (booleano, quase nunca usado) saem.
+-- ============================================================================
+
+-- Só as linhas VIP (poucas) entram no índice, já na ordem das listagens
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_vip_nome
+    ON clientes (nome, id) WHERE vip;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_uf_cidade
+    ON clientes (uf, cidade);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_status_nome
+    ON clientes (status_cliente, nome, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vendas_cliente_data
+    ON vendas (cliente_id, data_venda);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_vip;
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_uf;
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_status;
+DROP INDEX CONCURRENTLY IF EXISTS idx_vendas_cliente;
+
+ANALYZE clientes;
+ANALYZE vendas;
@@ -0,0 +1,22 @@
+-- ============================================================================
+-- 0006: índice de aniversário (mês/dia) para buscar_aniversariantes_*
+--
+-- A chave é o número MMDD (ex.: 15 de março -> 315), calculado pela mesma
+-- expressão que src/clientes.py usa nas consultas (_EXPR_ANIVERSARIO):
+--   aniversariantes do mês 3    -> chave BETWEEN 301 AND 331
+--   aniversariantes de hoje     -> chave = MMDD de hoje
+--   próximos N dias             -> uma ou duas faixas (virada do ano)
+-- Índice de expressão em vez de coluna gerada: não reescreve a tabela
+-- (ADD COLUMN ... STORED trava `clientes` durante a cópia inteira).
+-- (nome, id) no fim entrega "hoje" já na ordem das listagens.
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_aniversario
+    ON clientes (
+        ((EXTRACT(MONTH FROM data_nascimento) * 100 + EXTRACT(DAY FROM data_nascimento))::int),
+        nome,
+        id
+    )
+    WHERE data_nascimento IS NOT NULL;
+
+ANALYZE clientes;
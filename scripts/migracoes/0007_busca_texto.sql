@@ -0,0 +1,51 @@
+-- ============================================================================
+-- 0007: busca textual (full-text) em nome, sobrenome, email e cidade
+--
+-- clientes_busca(nome, sobrenome, email, cidade) monta o tsvector da
+-- pesquisa, sem acentos e com pesos:
+--   A = nome e sobrenome, B = email, C = cidade
+-- e o índice GIN é sobre essa expressão (nada é guardado na tabela). Os
+-- prefixos ("carl oliv") são resolvidos pela própria tsquery ('carl':* &
+-- 'oliv':*), que o GIN responde varrendo as palavras do índice que começam
+-- com o prefixo.
+-- O email entra quebrado em pedaços ("ana.silva@x.com" -> "ana", "silva",
+-- "x", "com").
+--
+-- unaccent() não é IMMUTABLE (depende do dicionário configurado), então não
+-- pode ser usada em índice; f_unaccent() fixa o dicionário.
+-- As funções chamam umas às outras com o schema (public.): CREATE INDEX e
+-- ANALYZE rodam com search_path restrito e não as achariam pelo nome.
+--
+-- Sem coluna nova, a tabela não é reescrita: o índice é criado com
+-- CONCURRENTLY, sem travar as escritas em `clientes`.
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+CREATE OR REPLACE FUNCTION f_unaccent(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, texto)
+$$;
+
+-- "Ana.Silva@x.com" -> "Ana Silva x com" (sem acentos; pontuação separa palavras)
+CREATE OR REPLACE FUNCTION f_palavras(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT regexp_replace(public.f_unaccent(coalesce(texto, '')), '[^[:alnum:]]+', ' ', 'g')
+$$;
+
+CREATE OR REPLACE FUNCTION clientes_busca(nome text, sobrenome text, email text, cidade text)
+    RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT setweight(to_tsvector('simple', public.f_palavras(nome)), 'A') ||
+           setweight(to_tsvector('simple', public.f_palavras(sobrenome)), 'A') ||
+           setweight(to_tsvector('simple', public.f_palavras(email)), 'B') ||
+           setweight(to_tsvector('simple', public.f_palavras(cidade)), 'C')
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_busca_texto
+    ON clientes USING gin (clientes_busca(nome, sobrenome, email, cidade));
+
+ANALYZE clientes;
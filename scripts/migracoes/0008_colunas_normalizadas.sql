@@ -0,0 +1,90 @@
+-- ============================================================================
+-- 0008: colunas normalizadas (minúsculas, sem acento) para nome, sobrenome
+-- e cidade
+--
+-- ILIKE não ignora acentos ("Sao Paulo" não acha "São Paulo"), e um
+-- unaccent() dentro do WHERE não usa índice. As colunas *_norm guardam o
+-- texto já normalizado e têm índice próprio:
+--   sobrenome_norm = 'oliveira'      -> idx_clientes_sobrenome_norm (já na ordem nome, id)
+--   cidade_norm LIKE '%sao paulo%'   -> idx_clientes_cidade_norm_trgm
+--
+-- Quem grava clientes pelo Python (importar_clientes_csv, gerar_clientes_fake,
+-- src.clientes.criar_cliente) já manda as colunas preenchidas, com
+-- src.utils_nomes.normalizar_texto(). O gatilho só completa o que vier
+-- faltando (scripts antigos, SQL manual) e acompanha UPDATEs de nome,
+-- sobrenome e cidade.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION f_normalizar(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$
+    SELECT lower(f_unaccent(btrim(regexp_replace(texto, '\s+', ' ', 'g'))))
+$$;
+
+ALTER TABLE clientes
+    ADD COLUMN IF NOT EXISTS nome_norm TEXT,
+    ADD COLUMN IF NOT EXISTS sobrenome_norm TEXT,
+    ADD COLUMN IF NOT EXISTS cidade_norm TEXT;
+
+CREATE OR REPLACE FUNCTION clientes_normalizar() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        NEW.nome_norm := coalesce(NEW.nome_norm, f_normalizar(NEW.nome));
+        NEW.sobrenome_norm := coalesce(NEW.sobrenome_norm, f_normalizar(NEW.sobrenome));
+        NEW.cidade_norm := coalesce(NEW.cidade_norm, f_normalizar(NEW.cidade));
+        RETURN NEW;
+    END IF;
+
+    IF NEW.nome IS DISTINCT FROM OLD.nome AND NEW.nome_norm IS NOT DISTINCT FROM OLD.nome_norm THEN
+        NEW.nome_norm := f_normalizar(NEW.nome);
+    END IF;
+    IF NEW.sobrenome IS DISTINCT FROM OLD.sobrenome AND NEW.sobrenome_norm IS NOT DISTINCT FROM OLD.sobrenome_norm THEN
+        NEW.sobrenome_norm := f_normalizar(NEW.sobrenome);
+    END IF;
+    IF NEW.cidade IS DISTINCT FROM OLD.cidade AND NEW.cidade_norm IS NOT DISTINCT FROM OLD.cidade_norm THEN
+        NEW.cidade_norm := f_normalizar(NEW.cidade);
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_clientes_normalizar ON clientes;
+CREATE TRIGGER trg_clientes_normalizar
+    BEFORE INSERT OR UPDATE OF nome, sobrenome, cidade ON clientes
+    FOR EACH ROW EXECUTE FUNCTION clientes_normalizar();
+
+-- Preenche as linhas que já existiam, em lotes de 50 mil (cada lote é uma
+-- transação curta, sem travar a tabela inteira durante a carga).
+DO $$
+DECLARE
+    inicio BIGINT := 0;
+    maximo BIGINT;
+BEGIN
+    SELECT coalesce(max(id), 0) INTO maximo FROM clientes;
+    WHILE inicio < maximo LOOP
+        UPDATE clientes
+        SET nome_norm = f_normalizar(nome),
+            sobrenome_norm = f_normalizar(sobrenome),
+            cidade_norm = f_normalizar(cidade)
+        WHERE id > inicio AND id <= inicio + 50000
+          AND (nome_norm IS NULL OR sobrenome_norm IS NULL
+               OR (cidade_norm IS NULL AND cidade IS NOT NULL));
+        COMMIT;
+        inicio := inicio + 50000;
+    END LOOP;
+END
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_sobrenome_norm
+    ON clientes (sobrenome_norm, nome, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_cidade_norm_trgm
+    ON clientes USING gin (cidade_norm gin_trgm_ops);
+
+-- Substituídos pelos índices das colunas normalizadas
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_cidade_trgm;
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_sobrenome_trgm;
+
+VACUUM ANALYZE clientes;
@@ -0,0 +1,143 @@
+-- ============================================================================
+-- 0009: contadores de clientes por (uf, cidade, status_cliente, vip)
+--
+-- estatisticas_clientes(), ranking_ufs() e ranking_cidades_por_uf() somam
+-- esta tabela em vez de contar a tabela de clientes: o custo depende do
+-- número de grupos (algumas centenas), não do número de clientes.
+--
+-- Os gatilhos não atualizam uma linha por grupo (todas as inserções de
+-- SP/São Paulo disputariam a mesma linha); cada comando só ACRESCENTA
+-- linhas de diferença (+N / -N). Sem disputa entre transações, e o total
+-- continua exato: é a soma das diferenças. compactar_clientes_contadores()
+-- junta as diferenças de cada grupo numa linha só; rode periodicamente:
+--     python -m scripts.compactar_contadores
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS clientes_contadores (
+    uf CHAR(2),
+    cidade TEXT,
+    status_cliente VARCHAR(20) NOT NULL,
+    vip BOOLEAN NOT NULL,
+    qtde BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_clientes_contadores_uf
+    ON clientes_contadores (uf, cidade);
+
+-- Gatilhos por comando (não por linha): um INSERT de 5 mil clientes gera
+-- uma linha de diferença por grupo, não 5 mil.
+CREATE OR REPLACE FUNCTION clientes_contadores_inserir() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO clientes_contadores (uf, cidade, status_cliente, vip, qtde)
+    SELECT uf, cidade, status_cliente, vip, COUNT(*)
+    FROM novas
+    GROUP BY uf, cidade, status_cliente, vip;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION clientes_contadores_apagar() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO clientes_contadores (uf, cidade, status_cliente, vip, qtde)
+    SELECT uf, cidade, status_cliente, vip, -COUNT(*)
+    FROM antigas
+    GROUP BY uf, cidade, status_cliente, vip;
+    RETURN NULL;
+END
+$$;
+
+-- UPDATE: -1 no grupo antigo, +1 no novo. Linhas que não mudaram de grupo
+-- se anulam (HAVING) e não geram diferença.
+CREATE OR REPLACE FUNCTION clientes_contadores_atualizar() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO clientes_contadores (uf, cidade, status_cliente, vip, qtde)
+    SELECT uf, cidade, status_cliente, vip, SUM(qtde)
+    FROM (
+        SELECT uf, cidade, status_cliente, vip, -1 AS qtde FROM antigas
+        UNION ALL
+        SELECT uf, cidade, status_cliente, vip, 1 AS qtde FROM novas
+    ) diferencas
+    GROUP BY uf, cidade, status_cliente, vip
+    HAVING SUM(qtde) <> 0;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION clientes_contadores_truncar() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM clientes_contadores;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_clientes_contadores_inserir ON clientes;
+CREATE TRIGGER trg_clientes_contadores_inserir
+    AFTER INSERT ON clientes
+    REFERENCING NEW TABLE AS novas
+    FOR EACH STATEMENT EXECUTE FUNCTION clientes_contadores_inserir();
+
+DROP TRIGGER IF EXISTS trg_clientes_contadores_apagar ON clientes;
+CREATE TRIGGER trg_clientes_contadores_apagar
+    AFTER DELETE ON clientes
+    REFERENCING OLD TABLE AS antigas
+    FOR EACH STATEMENT EXECUTE FUNCTION clientes_contadores_apagar();
+
+DROP TRIGGER IF EXISTS trg_clientes_contadores_atualizar ON clientes;
+CREATE TRIGGER trg_clientes_contadores_atualizar
+    AFTER UPDATE ON clientes
+    REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+    FOR EACH STATEMENT EXECUTE FUNCTION clientes_contadores_atualizar();
+
+DROP TRIGGER IF EXISTS trg_clientes_contadores_truncar ON clientes;
+CREATE TRIGGER trg_clientes_contadores_truncar
+    AFTER TRUNCATE ON clientes
+    FOR EACH STATEMENT EXECUTE FUNCTION clientes_contadores_truncar();
+
+-- Junta as linhas de diferença de cada grupo numa linha só (grupos que
+-- somam zero somem). O DELETE só enxerga as diferenças já confirmadas;
+-- as que outras transações gravarem enquanto isso ficam para a próxima.
+-- Devolve quantas linhas a tabela tinha antes.
+CREATE OR REPLACE FUNCTION compactar_clientes_contadores() RETURNS BIGINT
+    LANGUAGE plpgsql
+AS $$
+DECLARE
+    linhas BIGINT;
+BEGIN
+    -- Uma compactação por vez
+    PERFORM pg_advisory_xact_lock(7310002);
+
+    WITH apagadas AS (
+        DELETE FROM clientes_contadores
+        RETURNING uf, cidade, status_cliente, vip, qtde
+    ),
+    compactadas AS (
+        INSERT INTO clientes_contadores (uf, cidade, status_cliente, vip, qtde)
+        SELECT uf, cidade, status_cliente, vip, SUM(qtde)
+        FROM apagadas
+        GROUP BY uf, cidade, status_cliente, vip
+        HAVING SUM(qtde) <> 0
+    )
+    SELECT COUNT(*) INTO linhas FROM apagadas;
+    RETURN linhas;
+END
+$$;
+
+-- Carga inicial. Esta migração roda numa transação só e o CREATE TRIGGER
+-- bloqueia escritas em clientes até o fim dela: nenhuma inserção fica de
+-- fora da contagem nem é contada duas vezes.
+DELETE FROM clientes_contadores;
+
+INSERT INTO clientes_contadores (uf, cidade, status_cliente, vip, qtde)
+SELECT uf, cidade, status_cliente, vip, COUNT(*)
+FROM clientes
+GROUP BY uf, cidade, status_cliente, vip;
+
+ANALYZE clientes_contadores;
@@ -0,0 +1,44 @@
+-- ============================================================================
+-- 0010: invalidação do cache de resultados (src/cache.py)
+--
+-- Todo comando que altera clientes, vendas ou produtos avisa no canal
+-- `cache_invalidar` qual tabela mudou; o ouvinte de src/database.py
+-- descarta os resultados guardados que dependem dela. O aviso só é
+-- entregue no COMMIT (rollback não invalida nada) e avisos iguais na mesma
+-- transação viram um só, então um INSERT de 5 mil linhas gera um aviso.
+--
+-- cache_resultados é o backend compartilhado opcional (CACHE_BACKEND=postgres).
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notificar_cache() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidar', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_clientes_notificar_cache ON clientes;
+CREATE TRIGGER trg_clientes_notificar_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON clientes
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cache();
+
+DROP TRIGGER IF EXISTS trg_vendas_notificar_cache ON vendas;
+CREATE TRIGGER trg_vendas_notificar_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON vendas
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cache();
+
+DROP TRIGGER IF EXISTS trg_produtos_notificar_cache ON produtos;
+CREATE TRIGGER trg_produtos_notificar_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON produtos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cache();
+
+-- UNLOGGED: sem WAL (mais rápido) e esvaziada se o servidor cair; para um
+-- cache tanto faz. Não é copiada para as réplicas.
+CREATE UNLOGGED TABLE IF NOT EXISTS cache_resultados (
+    chave TEXT PRIMARY KEY,
+    valor BYTEA NOT NULL,
+    tabelas TEXT[] NOT NULL,
+    expira_em TIMESTAMPTZ NOT NULL
+);
@@ -0,0 +1,19 @@
+-- ============================================================================
+-- 0011: índices GiST de trigramas nas colunas normalizadas
+--
+-- Deixam a busca por semelhança ler os clientes direto do índice, já na
+-- ordem de semelhança (busca "KNN"), parando nos `limit` primeiros:
+--   WHERE cidade_norm % 'sao paul' ORDER BY cidade_norm <-> 'sao paul' LIMIT 20
+--
+-- O GIN de 0008 (idx_clientes_cidade_norm_trgm) acha as linhas que casam,
+-- mas não sabe entregá-las em ordem de distância (<->): com milhares de
+-- clientes na mesma cidade, todas teriam de ser lidas e ordenadas.
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_cidade_norm_gist
+    ON clientes USING gist (cidade_norm gist_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_sobrenome_norm_gist
+    ON clientes USING gist (sobrenome_norm gist_trgm_ops);
+
+ANALYZE clientes;
@@ -0,0 +1,20 @@
+-- ============================================================================
+-- 0012: quem escreve invalida o backend compartilhado do cache
+--
+-- Em 0010 o gatilho só avisava (NOTIFY) e o ouvinte de CADA processo
+-- apagava as linhas de cache_resultados da tabela alterada: N processos,
+-- N DELETEs iguais por escrita. Agora o próprio gatilho apaga as linhas,
+-- dentro da transação de quem escreveu (um rollback desfaz o DELETE junto
+-- com a escrita), e os ouvintes só limpam a memória do seu processo.
+-- Vale também para escritas feitas direto no psql.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notificar_cache() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM cache_resultados WHERE tabelas @> ARRAY[TG_TABLE_NAME::text];
+    PERFORM pg_notify('cache_invalidar', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$;
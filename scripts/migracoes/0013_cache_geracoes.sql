@@ -0,0 +1,35 @@
+-- ============================================================================
+-- 0013: backend do cache invalidado por geração, fora da transação de quem
+--       escreve (substitui o DELETE de 0012)
+--
+-- O DELETE em cache_resultados dentro do gatilho fazia escritores esperarem
+-- uns pelos outros nos locks das mesmas linhas do cache (e travar em
+-- deadlock ao escrever em duas tabelas em ordens opostas), e quem gravava
+-- no cache esperava o COMMIT de quem escrevia. O gatilho volta a só avisar.
+--
+-- O ouvinte de src/database.py, ao receber o aviso, anota em
+-- cache_geracoes o instante da invalidação da tabela (em autocommit, fora
+-- de qualquer transação da aplicação). Cada resultado guarda o instante
+-- (do servidor) de antes da consulta que o calculou; a leitura ignora o
+-- resultado calculado antes da última invalidação de alguma das tabelas
+-- dele. Um aviso atrasado não deixa mais um resultado velho valendo no
+-- backend até o CACHE_TTL.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notificar_cache() RETURNS trigger
+    LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidar', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS cache_geracoes (
+    tabela TEXT PRIMARY KEY,
+    invalidada_em TIMESTAMPTZ NOT NULL
+);
+
+-- resultados antigos não têm o instante do cálculo: descarta (é só cache)
+TRUNCATE cache_resultados;
+ALTER TABLE cache_resultados ADD COLUMN IF NOT EXISTS calculado_em TIMESTAMPTZ NOT NULL;
@@ -0,0 +1,41 @@
+-- ============================================================================
+-- 0014: busca textual sem a coluna `busca` (bancos que aplicaram a
+--       primeira versão de 0007_busca_texto.sql)
+--
+-- A primeira versão de 0007 guardava numa coluna tsvector STORED cada
+-- palavra junto com todos os seus prefixos de 3 letras em diante: reescrevia
+-- `clientes` inteira sob ACCESS EXCLUSIVE e inchava a tabela. Agora a busca
+-- usa um índice GIN sobre clientes_busca(...) e prefixos na tsquery
+-- ('carl':*). Em bancos novos, 0007 já cria tudo e estes comandos não fazem
+-- nada.
+--
+-- DROP COLUMN não reescreve a tabela (só marca a coluna como removida; o
+-- espaço volta aos poucos, conforme as linhas são atualizadas).
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION f_palavras(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT regexp_replace(public.f_unaccent(coalesce(texto, '')), '[^[:alnum:]]+', ' ', 'g')
+$$;
+
+CREATE OR REPLACE FUNCTION clientes_busca(nome text, sobrenome text, email text, cidade text)
+    RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT setweight(to_tsvector('simple', public.f_palavras(nome)), 'A') ||
+           setweight(to_tsvector('simple', public.f_palavras(sobrenome)), 'A') ||
+           setweight(to_tsvector('simple', public.f_palavras(email)), 'B') ||
+           setweight(to_tsvector('simple', public.f_palavras(cidade)), 'C')
+$$;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_busca_texto
+    ON clientes USING gin (clientes_busca(nome, sobrenome, email, cidade));
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_clientes_busca;
+
+ALTER TABLE clientes DROP COLUMN IF EXISTS busca;
+
+DROP FUNCTION IF EXISTS f_prefixos(text);
+
+ANALYZE clientes;
@@ -1,17 +1,18 @@
 from database import get_cursor
-from src.localidades import CIDADE_UF
+from src.localidades import CIDADE_UF_NORMALIZADA
 
 def main():
-    print("Preenchendo UF com base na cidade (usando mapa CIDADE_UF)...")
+    # Compara pela cidade normalizada: "Sao Paulo" e "SÃO PAULO" também recebem SP
+    print("Preenchendo UF com base na cidade (usando mapa CIDADE_UF_NORMALIZADA)...")
     with get_cursor() as cur:
         total_atualizados = 0
-        for cidade, uf in CIDADE_UF.items():
+        for cidade, uf in CIDADE_UF_NORMALIZADA.items():
             print(f"- Atualizando cidade='{cidade}' para uf='{uf}'...")
             cur.execute(
                 """
                 UPDATE clientes
                    SET uf = %s
-                 WHERE cidade = %s
+                 WHERE cidade_norm = %s
                    AND (uf IS NULL OR uf = '')
                 """,
                 (uf, cidade),
@@ -0,0 +1,413 @@
+"""
+Cache de resultados de consultas caras (estatísticas, rankings, relatórios).
+
+- LRU em memória, com validade (TTL) por item.
+- Cada item sabe de quais tabelas depende: invalidar("vendas") descarta na
+  hora tudo o que leu a tabela vendas. Quem chama invalidar() é o ouvinte
+  de LISTEN/NOTIFY de src/database.py (gatilhos da migração
+  0010_cache_resultados.sql).
+- Backend compartilhado opcional (BackendPostgres): outros processos
+  aproveitam o resultado que um deles já calculou. No backend nada é
+  apagado na invalidação: a tabela ganha um novo instante de invalidação
+  e os resultados calculados antes dele deixam de valer (migração
+  0013_cache_geracoes.sql).
+- Acertos/faltas por função, para saber se o cache está valendo a pena.
+
+Os valores são guardados serializados (pickle): quem recebe um resultado
+do cache ganha uma cópia e pode alterá-la sem estragar o que ficou guardado.
+No backend compartilhado cada valor vai assinado (HMAC-SHA256 com um
+segredo que só a aplicação conhece): pickle.loads() executa código, então
+um valor que não foi gravado pela aplicação nunca é desserializado.
+
+Este módulo não depende do banco; o decorador em_cache() e o ouvinte ficam
+em src/database.py.
+"""
+import hashlib
+import hmac
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("sistema_clientes.cache")
+logger.addHandler(logging.NullHandler())
+
+# Devolvido por obter() quando a chave não está no cache (None pode ser um
+# resultado válido)
+FALTA = object()
+
+
+def chave_argumentos(args: tuple, kwargs: dict) -> str:
+    """
+    Texto que identifica os argumentos de uma chamada (a ordem dos
+    argumentos nomeados não importa).
+    """
+    return repr((args, sorted(kwargs.items())))
+
+
+class _Item:
+    __slots__ = ("dados", "tabelas", "criado_em", "expira_em")
+
+    def __init__(self, dados: bytes, tabelas: Tuple[str, ...], criado_em: float, expira_em: float):
+        self.dados = dados
+        self.tabelas = tabelas
+        self.criado_em = criado_em
+        self.expira_em = expira_em
+
+
+class AssinaturaInvalida(ValueError):
+    """Valor do backend sem a assinatura da aplicação (adulterado ou de outro segredo)."""
+
+
+def _assinatura(segredo: bytes, chave: str, dados: bytes) -> bytes:
+    # a chave entra na assinatura: um valor válido não serve em outra chave
+    return hmac.new(segredo, chave.encode("utf-8") + b"\0" + dados, hashlib.sha256).digest()
+
+
+def assinar(segredo: bytes, chave: str, dados: bytes) -> bytes:
+    """`dados` com a assinatura HMAC-SHA256 (32 bytes) na frente."""
+    return _assinatura(segredo, chave, dados) + dados
+
+
+def conferir(segredo: bytes, chave: str, valor: bytes) -> bytes:
+    """
+    Os dados de um valor gerado por assinar(); AssinaturaInvalida se a
+    assinatura não bater.
+    """
+    tamanho = hashlib.sha256().digest_size
+    assinatura, dados = valor[:tamanho], valor[tamanho:]
+    if len(assinatura) < tamanho or not hmac.compare_digest(assinatura, _assinatura(segredo, chave, dados)):
+        raise AssinaturaInvalida(f"assinatura inválida para {chave!r}")
+    return dados
+
+
+class BackendPostgres:
+    """
+    Backend compartilhado na tabela UNLOGGED cache_resultados (migrações
+    0010_cache_resultados.sql e 0013_cache_geracoes.sql). UNLOGGED: não
+    gera WAL e some se o servidor cair, o que para um cache tanto faz.
+
+    Invalidação por geração: invalidar(tabela) só anota em cache_geracoes
+    o instante (relógio do servidor); cada resultado guarda o instante de
+    antes da consulta que o calculou (agora()), e ler() ignora o que foi
+    calculado antes da última invalidação de alguma das suas tabelas.
+    Assim nenhuma escrita da aplicação toca nas linhas do cache, e um
+    resultado velho gravado por quem recebeu o aviso atrasado não vale.
+
+    Usa conexões próprias em autocommit (fora do pool, para não contar
+    como escrita da aplicação), uma por chamada simultânea, com
+    lock_timeout/statement_timeout de `timeout_ms`: o backend nunca segura
+    o cache (nem as outras threads) esperando o banco. `conectar` devolve
+    uma conexão psycopg2 nova, ex.: src.database.get_connection.
+
+    Os valores são gravados assinados com `segredo` e conferidos na
+    leitura: quem consegue escrever na tabela mas não conhece o segredo
+    não faz a aplicação desserializar nada (ler() levanta
+    AssinaturaInvalida, que o cache conta como erro do backend).
+    """
+
+    # conexões ociosas guardadas para as próximas chamadas
+    MAX_CONEXOES_LIVRES = 4
+
+    def __init__(self, conectar: Callable, segredo: bytes, timeout_ms: float = 100.0):
+        if not segredo:
+            raise ValueError("BackendPostgres precisa de um segredo para assinar os valores")
+        self._conectar = conectar
+        self._segredo = segredo
+        self._timeout_ms = max(1, int(timeout_ms))
+        self._livres = []
+        self._lock = threading.Lock()
+
+    def _nova_conexao(self):
+        conn = self._conectar()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = %s", (self._timeout_ms,))
+            cur.execute("SET statement_timeout = %s", (self._timeout_ms,))
+        return conn
+
+    def _executar(self, sql: str, params: tuple = ()):
+        # o lock só protege a lista de conexões livres; o banco é
+        # consultado sem ele
+        with self._lock:
+            conn = self._livres.pop() if self._livres else None
+        if conn is None or conn.closed:
+            conn = self._nova_conexao()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                linha = cur.fetchone() if cur.description else None
+        except Exception:
+            conn.close()
+            raise
+        with self._lock:
+            if len(self._livres) < self.MAX_CONEXOES_LIVRES:
+                self._livres.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+        return linha
+
+    def agora(self):
+        """Instante atual do servidor (marca de quando um cálculo começou)."""
+        return self._executar("SELECT clock_timestamp()")[0]
+
+    def ler(self, chave: str) -> Optional[bytes]:
+        linha = self._executar(
+            """
+            SELECT r.valor
+            FROM cache_resultados r
+            WHERE r.chave = %s
+              AND r.expira_em > clock_timestamp()
+              AND NOT EXISTS (
+                  SELECT 1 FROM cache_geracoes g
+                  WHERE g.tabela = ANY(r.tabelas) AND g.invalidada_em >= r.calculado_em
+              )
+            """,
+            (chave,),
+        )
+        return conferir(self._segredo, chave, bytes(linha[0])) if linha else None
+
+    def gravar(self, chave: str, dados: bytes, tabelas: Tuple[str, ...], ttl: float,
+               calculado_em=None):
+        """
+        `calculado_em`: agora() tirado antes da consulta que gerou `dados`
+        (None = agora). Um resultado mais antigo que o já gravado não o
+        substitui.
+        """
+        dados = assinar(self._segredo, chave, dados)
+        self._executar(
+            """
+            INSERT INTO cache_resultados (chave, valor, tabelas, expira_em, calculado_em)
+            VALUES (%s, %s, %s, clock_timestamp() + make_interval(secs => %s),
+                    COALESCE(%s, clock_timestamp()))
+            ON CONFLICT (chave) DO UPDATE
+                SET valor = EXCLUDED.valor,
+                    tabelas = EXCLUDED.tabelas,
+                    expira_em = EXCLUDED.expira_em,
+                    calculado_em = EXCLUDED.calculado_em
+                WHERE cache_resultados.calculado_em <= EXCLUDED.calculado_em
+            """,
+            (chave, dados, list(tabelas), ttl, calculado_em),
+        )
+
+    def invalidar(self, tabela: str):
+        self._executar(
+            """
+            INSERT INTO cache_geracoes (tabela, invalidada_em) VALUES (%s, clock_timestamp())
+            ON CONFLICT (tabela) DO UPDATE
+                SET invalidada_em = GREATEST(cache_geracoes.invalidada_em, EXCLUDED.invalidada_em)
+            """,
+            (tabela,),
+        )
+
+    def limpar(self):
+        self._executar("DELETE FROM cache_resultados")
+
+
+class CacheResultados:
+    """
+    Cache LRU + TTL de resultados de funções (thread-safe).
+
+    Uso típico:
+        cache = CacheResultados(max_itens=256, ttl=60)
+        chave = ("src.clientes.ranking_ufs", chave_argumentos((10,), {}))
+        valor = cache.obter(chave)
+        if valor is FALTA:
+            marca = cache.marca(("clientes",))
+            valor = ranking_ufs(10)
+            cache.guardar(chave, valor, ("clientes",), marca=marca)
+    """
+
+    def __init__(self, max_itens: int = 256, ttl: float = 60.0, backend=None,
+                 relogio: Callable[[], float] = time.monotonic):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.backend = backend
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[tuple, _Item]" = OrderedDict()
+        # geração de cada tabela (muda a cada invalidação) e do cache todo
+        # (muda a cada limpar()); ver marca()
+        self._geracoes: Dict[str, int] = {}
+        self._limpezas = 0
+        self._por_funcao: Dict[str, Dict[str, int]] = {}
+        self._contadores = {"invalidacoes": 0, "descartados_lru": 0, "erros_backend": 0}
+
+    # -- estatísticas -------------------------------------------------------
+    def _contar(self, funcao: str, campo: str):
+        dados = self._por_funcao.get(funcao)
+        if dados is None:
+            dados = self._por_funcao[funcao] = {"acertos": 0, "acertos_backend": 0, "faltas": 0}
+        dados[campo] += 1
+
+    def _erro_backend(self, operacao: str, erro: Exception):
+        with self._lock:
+            self._contadores["erros_backend"] += 1
+        logger.warning("cache: backend falhou em %s: %s", operacao, erro)
+
+    def stats(self) -> dict:
+        """
+        Acertos, faltas e taxa de acerto (%) por função e no total, além de
+        itens em memória, invalidações e descartes por falta de espaço.
+        """
+        with self._lock:
+            por_funcao = {}
+            acertos = faltas = 0
+            for funcao, dados in self._por_funcao.items():
+                chamadas = dados["acertos"] + dados["acertos_backend"] + dados["faltas"]
+                acertos += dados["acertos"] + dados["acertos_backend"]
+                faltas += dados["faltas"]
+                por_funcao[funcao] = dict(
+                    dados,
+                    taxa_acerto=round(100.0 * (chamadas - dados["faltas"]) / chamadas, 1),
+                )
+            total = acertos + faltas
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl": self.ttl,
+                "acertos": acertos,
+                "faltas": faltas,
+                "taxa_acerto": round(100.0 * acertos / total, 1) if total else 0.0,
+                **self._contadores,
+                "por_funcao": por_funcao,
+            }
+
+    # -- leitura e escrita ----------------------------------------------------
+    def obter(self, chave: tuple, tabelas: Tuple[str, ...] = (),
+              valido_desde: Optional[float] = None):
+        """
+        Valor guardado para `chave` (uma cópia), ou FALTA. O que vier do
+        backend passa a ficar também na memória (dependente de `tabelas`).
+
+        `valido_desde` (mesmo relógio do cache) ignora itens criados antes
+        desse instante; serve para quem acabou de escrever no banco não
+        receber um resultado anterior à própria escrita.
+        """
+        funcao = chave[0]
+        agora = self._relogio()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item.expira_em <= agora:
+                del self._itens[chave]
+                item = None
+            if item is not None and (valido_desde is None or item.criado_em >= valido_desde):
+                self._itens.move_to_end(chave)
+                self._contar(funcao, "acertos")
+                return pickle.loads(item.dados)
+
+        if self.backend is not None and valido_desde is None:
+            with self._lock:
+                marca = self._marca_atual(tabelas)
+            try:
+                dados = self.backend.ler(self._chave_backend(chave))
+            except Exception as e:
+                self._erro_backend("ler", e)
+                dados = None
+            if dados is not None:
+                with self._lock:
+                    self._contar(funcao, "acertos_backend")
+                    if marca == self._marca_atual(tabelas):
+                        self._inserir(chave, dados, tabelas, self.ttl)
+                return pickle.loads(dados)
+
+        with self._lock:
+            self._contar(funcao, "faltas")
+        return FALTA
+
+    def marca(self, tabelas: Iterable[str]) -> tuple:
+        """
+        Gerações atuais das tabelas (e, com backend, o instante do servidor).
+        Tire a marca ANTES de consultar o banco e passe para guardar(): se
+        alguma tabela for invalidada enquanto a consulta roda, o resultado
+        (talvez já velho) não é guardado na memória, e no backend deixa de
+        valer assim que a invalidação for anotada lá.
+        """
+        with self._lock:
+            local = self._marca_atual(tabelas)
+        instante = None
+        if self.backend is not None:
+            try:
+                instante = self.backend.agora()
+            except Exception as e:
+                self._erro_backend("agora", e)
+        return local, instante
+
+    def _marca_atual(self, tabelas: Iterable[str]) -> tuple:
+        return (self._limpezas,) + tuple(self._geracoes.get(t, 0) for t in tabelas)
+
+    def guardar(self, chave: tuple, valor, tabelas: Tuple[str, ...],
+                ttl: Optional[float] = None, marca: Optional[tuple] = None) -> bool:
+        """
+        Guarda `valor` (dependente de `tabelas`) por `ttl` segundos (padrão:
+        o do cache). Devolve False se não guardou por causa da `marca`.
+        Com `marca` sem o instante do backend (o backend falhou), guarda só
+        na memória.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        dados = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if marca is not None and marca[0] != self._marca_atual(tabelas):
+                return False
+            self._inserir(chave, dados, tabelas, ttl)
+
+        instante = None if marca is None else marca[1]
+        if self.backend is not None and (marca is None or instante is not None):
+            try:
+                self.backend.gravar(self._chave_backend(chave), dados, tuple(tabelas), ttl, instante)
+            except Exception as e:
+                self._erro_backend("gravar", e)
+        return True
+
+    def _inserir(self, chave: tuple, dados: bytes, tabelas: Tuple[str, ...], ttl: float):
+        # chamado com self._lock
+        agora = self._relogio()
+        self._itens[chave] = _Item(dados, tuple(tabelas), agora, agora + ttl)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self._contadores["descartados_lru"] += 1
+
+    # -- invalidação ----------------------------------------------------------
+    def invalidar(self, tabela: str, backend: bool = True) -> int:
+        """
+        Descarta os itens que dependem de `tabela`. Devolve quantos eram.
+        No backend, anota a invalidação da tabela (o que foi calculado antes
+        deixa de valer para todos os processos); backend=False só limpa a
+        memória deste processo.
+        """
+        with self._lock:
+            self._geracoes[tabela] = self._geracoes.get(tabela, 0) + 1
+            chaves = [c for c, item in self._itens.items() if tabela in item.tabelas]
+            for chave in chaves:
+                del self._itens[chave]
+            self._contadores["invalidacoes"] += 1
+
+        if backend and self.backend is not None:
+            try:
+                self.backend.invalidar(tabela)
+            except Exception as e:
+                self._erro_backend("invalidar", e)
+        return len(chaves)
+
+    def limpar(self, backend: bool = True):
+        """
+        Esvazia o cache (ex.: o ouvinte ficou desconectado e pode ter
+        perdido notificações). As estatísticas são mantidas.
+        """
+        with self._lock:
+            self._limpezas += 1
+            self._itens.clear()
+
+        if backend and self.backend is not None:
+            try:
+                self.backend.limpar()
+            except Exception as e:
+                self._erro_backend("limpar", e)
+
+    @staticmethod
+    def _chave_backend(chave: tuple) -> str:
+        return ":".join(chave)
@@ -1,7 +1,12 @@
 import argparse
+import sys
+import time
 from importar_clientes_csv import importar as importar_csv
 from buscar_por_sobrenome import buscar as buscar_sobrenome
 from scripts.contar_clientes import main as contar_clientes
+from src.clientes import CANDIDATOS_PESQUISA, pesquisar
+from src.exportacao import FORMATOS, TABELAS, exportar
+from src.migracoes import migrar, status_migracoes
 
 def cmd_import(args):
     """
@@ -13,19 +18,96 @@ def cmd_import(args):
 
 def cmd_search(args):
     """
-    Busca clientes pelo sobrenome.
+    Busca clientes pelo sobrenome ou, com --texto, pesquisa livre em
+    nome, sobrenome, email e cidade (mais relevantes primeiro; por padrão
+    só entre as CANDIDATOS_PESQUISA primeiras linhas achadas).
     """
+    if args.texto:
+        candidatos = args.candidatos
+        if args.ranking_completo:
+            candidatos = None
+        elif candidatos is None:
+            candidatos = max(CANDIDATOS_PESQUISA, args.limite)
+        linhas = pesquisar(args.texto, limit=args.limite, candidatos=candidatos)
+        if not linhas:
+            print(f"Nenhum cliente encontrado para: {args.texto}")
+            return
+        for r in linhas:
+            id_, nome, sob, email, telefone, cidade, uf = r[:7]
+            print(f"- [{id_}] {nome} {sob} | email={email} | tel={telefone} | {cidade}-{uf}")
+        return
     sobrenome = args.sobrenome
     if not sobrenome:
-        print("Você precisa informar um sobrenome (ex: --sobrenome Silva).")
+        print("Você precisa informar um sobrenome (ex: --sobrenome Silva) ou um texto (ex: --texto 'ana sil').")
         return
     buscar_sobrenome(sobrenome)
 
 def cmd_count(args):
     """
-    Mostra quantos clientes existem na tabela.
+    Mostra quantos clientes existem na tabela (com --estimado, pelas
+    estatísticas do PostgreSQL, sem ler a tabela).
+    """
+    contar_clientes("estimado" if args.estimado else "exato")
+
+def cmd_migrate(args):
     """
-    contar_clientes()
+    Aplica as migrações de schema pendentes (ou só mostra o status).
+    """
+    if args.status:
+        for migracao, aplicada_em in status_migracoes():
+            quando = aplicada_em.strftime("%d/%m/%Y %H:%M") if aplicada_em else "pendente"
+            print(f"{migracao.nome:<35} {quando}")
+        return
+    aplicadas = migrar(ate=args.ate)
+    if not aplicadas:
+        print("Nenhuma migração pendente.")
+
+def _formatar_numero(n) -> str:
+    return f"{n:,.0f}".replace(",", ".")
+
+def _mostrar_progresso(linhas, segundos):
+    taxa = linhas / segundos if segundos > 0 else 0
+    print(
+        f"\r  {_formatar_numero(linhas)} linhas | {_formatar_numero(taxa)} linhas/s",
+        end="", file=sys.stderr, flush=True,
+    )
+
+def cmd_export(args):
+    """
+    Exporta clientes ou vendas via COPY para CSV/NDJSON (opcionalmente
+    gzip), com os mesmos filtros das buscas. O progresso vai para a
+    saída de erro, então `--saida -` pode ser redirecionado.
+    """
+    filtros = {
+        "uf": args.uf,
+        "cidade": args.cidade,
+        "sobrenome": args.sobrenome,
+        "status_cliente": args.status,
+        "vip": args.vip,
+        "mes_aniversario": args.mes_aniversario,
+        "aniversario_proximos_dias": args.aniversario_proximos_dias,
+    }
+    destino = args.saida
+    if destino is None:
+        extensao = args.formato + (".gz" if args.gzip else "")
+        destino = f"{args.tabela}_{time.strftime('%Y%m%d')}.{extensao}"
+
+    inicio = time.perf_counter()
+    total = exportar(
+        args.tabela,
+        destino,
+        formato=args.formato,
+        comprimir=args.gzip,
+        filtros=filtros,
+        progresso=_mostrar_progresso,
+    )
+    duracao = time.perf_counter() - inicio
+    taxa = total / duracao if duracao > 0 else 0
+    print(
+        f"\n{_formatar_numero(total)} linhas de {args.tabela} exportadas em {duracao:.1f} s "
+        f"({_formatar_numero(taxa)} linhas/s) -> {destino}",
+        file=sys.stderr,
+    )
 
 def build_parser():
     parser = argparse.ArgumentParser(
@@ -44,18 +126,84 @@ def build_parser():
     p_import.set_defaults(func=cmd_import)
 
     # subcomando: search
-    p_search = sub.add_parser("search", help="Buscar clientes por sobrenome")
+    p_search = sub.add_parser("search", help="Buscar clientes por sobrenome ou texto livre")
     p_search.add_argument(
         "--sobrenome",
         help="Sobrenome a ser buscado (ex: --sobrenome Silva)",
-        required=True,
+        default=None,
+    )
+    p_search.add_argument(
+        "--texto",
+        help="Pesquisa livre em nome, sobrenome, email e cidade (ex: --texto 'ana sil')",
+        default=None,
+    )
+    p_search.add_argument(
+        "--limite",
+        type=int,
+        default=20,
+        help="Máximo de resultados da pesquisa livre (padrão: 20)",
+    )
+    p_search.add_argument(
+        "--candidatos",
+        type=int,
+        default=None,
+        help=f"Ordena pela relevância só as N primeiras linhas achadas (padrão: {CANDIDATOS_PESQUISA})",
+    )
+    p_search.add_argument(
+        "--ranking-completo",
+        action="store_true",
+        help="Ordena todas as linhas que casam (mais preciso; centenas de ms com termos comuns)",
     )
     p_search.set_defaults(func=cmd_search)
 
     # subcomando: count
     p_count = sub.add_parser("count", help="Contar clientes na tabela")
+    p_count.add_argument(
+        "--estimado",
+        action="store_true",
+        help="Contagem aproximada e instantânea (estatísticas do planejador)",
+    )
     p_count.set_defaults(func=cmd_count)
 
+    # subcomando: migrate
+    p_migrate = sub.add_parser("migrate", help="Aplicar migrações de schema (scripts/migracoes)")
+    p_migrate.add_argument(
+        "--status",
+        action="store_true",
+        help="Só lista as migrações aplicadas e pendentes",
+    )
+    p_migrate.add_argument(
+        "--ate",
+        type=int,
+        default=None,
+        help="Aplica só até esta versão (ex: --ate 3)",
+    )
+    p_migrate.set_defaults(func=cmd_migrate)
+
+    # subcomando: export
+    p_export = sub.add_parser("export", help="Exportar clientes ou vendas (COPY) para CSV/NDJSON")
+    p_export.add_argument("tabela", choices=TABELAS, help="Tabela a exportar")
+    p_export.add_argument(
+        "--saida",
+        default=None,
+        help="Arquivo de saída ('-' = saída padrão; padrão: <tabela>_AAAAMMDD.<formato>)",
+    )
+    p_export.add_argument("--formato", choices=FORMATOS, default="csv", help="Formato (padrão: csv)")
+    p_export.add_argument("--gzip", action="store_true", help="Comprimir com gzip")
+    filtros = p_export.add_argument_group("filtros de cliente (em vendas, valem para o cliente da venda)")
+    filtros.add_argument("--uf", default=None, help="Ex: --uf SP")
+    filtros.add_argument("--cidade", default=None, help="Pedaço do nome da cidade")
+    filtros.add_argument("--sobrenome", default=None)
+    filtros.add_argument("--status", default=None, help="ativo ou inativo")
+    vip = filtros.add_mutually_exclusive_group()
+    vip.add_argument("--vip", dest="vip", action="store_const", const=True, default=None, help="Só VIPs")
+    vip.add_argument("--nao-vip", dest="vip", action="store_const", const=False, help="Só não VIPs")
+    filtros.add_argument("--mes-aniversario", type=int, default=None, help="1-12")
+    filtros.add_argument(
+        "--aniversario-proximos-dias", type=int, default=None, help="Aniversário de hoje até N-1 dias adiante"
+    )
+    p_export.set_defaults(func=cmd_export)
+
     return parser
 
 def main(argv=None):
@@ -1,20 +1,239 @@
-from typing import Optional, List, Tuple, Dict
-from src.database import get_cursor
-
-Linha = Tuple[
-    int,              # id
-    str,              # nome
-    str,              # sobrenome
-    Optional[str],    # email
-    Optional[str],    # telefone
-    Optional[str],    # cidade
-    Optional[str],    # uf
-    str,              # status_cliente
-    bool,             # vip
-    object,           # criado_em (datetime)
-    Optional[object], # data_nascimento (date)
-]
+import functools
+import re
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Tuple, Dict, Iterator
+from psycopg2 import extensions
+from src.database import (
+    get_cursor, stream_query, executar_preparada, idempotente, com_prazo, em_cache,
+    CursorFechado, CursorInstrumentado, CursorRolavel,
+)
+from src.paginacao import (
+    Pagina, DEPOIS, ANTES, decodificar_cursor, montar_pagina,
+    montar_pagina_por_posicao, posicao_do_token,
+)
+from src.utils_nomes import normalizar_texto
 
+_atribuir = object.__setattr__
+
+
+def _ler_data(texto: str, tipo):
+    """
+    Texto de uma coluna date/timestamp do servidor -> `tipo` (date ou
+    datetime). 'infinity'/'-infinity' viram tipo.max/tipo.min, como o
+    psycopg2 faz; datas antes de Cristo não cabem no Python e viram tipo.min.
+    """
+    if texto == "infinity":
+        return tipo.max
+    if texto == "-infinity" or texto.endswith(" BC"):
+        return tipo.min
+    return tipo.fromisoformat(texto)
+
+class ClienteRow:
+    """
+    Uma linha de cliente, em formato compacto (as buscas devolvem estas
+    linhas em vez de tuplas).
+
+    Continua funcionando como a tupla de antes, na mesma ordem de campos:
+        id_, nome, sobrenome, email, telefone, cidade, uf, status, vip, criado_em, nasc = linha
+        linha[1], linha[0]
+        linha == (1, "Ana", ...)
+    e também por nome: linha.nome, linha.cidade, linha._asdict().
+    Como a tupla, não pode ser alterada (e por isso pode ir em set/dict).
+
+    Por que é menor que a tupla:
+    - __slots__ em vez de tupla + objetos soltos;
+    - cidade, uf e status repetidos em linhas da mesma consulta apontam
+      para o MESMO objeto de texto (CursorClientes);
+    - criado_em e data_nascimento chegam como texto do servidor e só viram
+      datetime/date quando alguém os lê (e aí ficam guardados convertidos).
+    """
+
+    __slots__ = (
+        "id", "nome", "sobrenome", "email", "telefone", "cidade", "uf",
+        "status_cliente", "vip", "_criado_em", "_data_nascimento",
+    )
+
+    CAMPOS = (
+        "id", "nome", "sobrenome", "email", "telefone", "cidade", "uf",
+        "status_cliente", "vip", "criado_em", "data_nascimento",
+    )
+
+    def __init__(self, id, nome, sobrenome, email, telefone, cidade, uf,
+                 status_cliente, vip, criado_em, data_nascimento):
+        atribuir = _atribuir
+        atribuir(self, "id", id)
+        atribuir(self, "nome", nome)
+        atribuir(self, "sobrenome", sobrenome)
+        atribuir(self, "email", email)
+        atribuir(self, "telefone", telefone)
+        atribuir(self, "cidade", cidade)
+        atribuir(self, "uf", uf)
+        atribuir(self, "status_cliente", status_cliente)
+        atribuir(self, "vip", vip)
+        atribuir(self, "_criado_em", criado_em)
+        atribuir(self, "_data_nascimento", data_nascimento)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError(f"ClienteRow não pode ser alterada (campo {nome!r})")
+
+    def __delattr__(self, nome):
+        raise AttributeError(f"ClienteRow não pode ser alterada (campo {nome!r})")
+
+    @property
+    def criado_em(self) -> Optional[datetime]:
+        valor = self._criado_em
+        if type(valor) is str:
+            valor = _ler_data(valor, datetime)
+            _atribuir(self, "_criado_em", valor)
+        return valor
+
+    @property
+    def data_nascimento(self) -> Optional[date]:
+        valor = self._data_nascimento
+        if type(valor) is str:
+            valor = _ler_data(valor, date)
+            _atribuir(self, "_data_nascimento", valor)
+        return valor
+
+    def __iter__(self):
+        return iter((
+            self.id, self.nome, self.sobrenome, self.email, self.telefone, self.cidade,
+            self.uf, self.status_cliente, self.vip, self.criado_em, self.data_nascimento,
+        ))
+
+    def __len__(self) -> int:
+        return len(self.CAMPOS)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return tuple(self)[indice]
+        return getattr(self, self.CAMPOS[indice])
+
+    def __eq__(self, outra) -> bool:
+        if isinstance(outra, (ClienteRow, tuple)):
+            return tuple(self) == tuple(outra)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        # pickle/copy: pelo construtor (os campos não aceitam atribuição)
+        return ClienteRow, (
+            self.id, self.nome, self.sobrenome, self.email, self.telefone, self.cidade,
+            self.uf, self.status_cliente, self.vip, self._criado_em, self._data_nascimento,
+        )
+
+    def __repr__(self) -> str:
+        campos = ", ".join(f"{campo}={valor!r}" for campo, valor in zip(self.CAMPOS, self))
+        return f"ClienteRow({campos})"
+
+    def _asdict(self) -> Dict[str, object]:
+        return dict(zip(self.CAMPOS, self))
+
+# Mantido para as anotações de tipo (e para quem importava de src.clientes)
+Linha = ClienteRow
+
+def _texto_do_servidor(valor, cur):
+    return valor
+
+# Datas e timestamps chegam como o texto do servidor (ClienteRow converte
+# quando alguém lê o campo)
+_DATA_COMO_TEXTO = extensions.new_type((1082,), "DATA_COMO_TEXTO", _texto_do_servidor)
+_TIMESTAMP_COMO_TEXTO = extensions.new_type((1114, 1184), "TIMESTAMP_COMO_TEXTO", _texto_do_servidor)
+
+# Textos distintos guardados para reaproveitar, por consulta. Só cidade, uf
+# e status entram (poucos valores, muito repetidos): nomes, sobrenomes e
+# datas variam demais e o dicionário só gastaria memória. Acima do limite
+# os novos valores não são mais guardados; a linha continua correta, só
+# deixa de economizar.
+_MAX_TEXTOS_REPETIDOS = 100_000
+
+class CursorClientes(CursorInstrumentado):
+    """
+    Cursor que devolve ClienteRow em vez de tuplas (fetchone, fetchmany,
+    fetchall e iteração, inclusive em cursor nomeado / stream_query).
+    Serve para qualquer SELECT com as colunas de _SQL_SELECT_CLIENTES, na
+    mesma ordem; resultados com outro número de colunas passam como tuplas.
+
+        with get_cursor(somente_leitura=True, cursor_factory=CursorClientes) as cur:
+            cur.execute(_SQL_SELECT_CLIENTES + " LIMIT 10")
+            linhas = cur.fetchall()
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        extensions.register_type(_DATA_COMO_TEXTO, self)
+        extensions.register_type(_TIMESTAMP_COMO_TEXTO, self)
+        self._textos: Dict[str, str] = {}
+
+    def _repetido(self, valor):
+        if valor is None:
+            return None
+        textos = self._textos
+        existente = textos.get(valor)
+        if existente is not None:
+            return existente
+        if len(textos) < _MAX_TEXTOS_REPETIDOS:
+            textos[valor] = valor
+        return valor
+
+    def _montar(self, linha) -> ClienteRow:
+        # outras consultas no mesmo cursor (ex.: o EXPLAIN de
+        # executar_preparada) passam como vieram
+        if linha is None or len(linha) != len(ClienteRow.CAMPOS):
+            return linha
+        (id_, nome, sobrenome, email, telefone, cidade, uf,
+         status_cliente, vip, criado_em, data_nascimento) = linha
+        repetido = self._repetido
+        return ClienteRow(
+            id_, nome, sobrenome, email, telefone, repetido(cidade),
+            repetido(uf), repetido(status_cliente), vip, criado_em, data_nascimento,
+        )
+
+    def fetchone(self):
+        return self._montar(super().fetchone())
+
+    def fetchmany(self, size=None):
+        linhas = super().fetchmany() if size is None else super().fetchmany(size)
+        return [self._montar(linha) for linha in linhas]
+
+    def fetchall(self):
+        if self.name is None:
+            # linha a linha: sem a lista inteira de tuplas ao mesmo tempo
+            return list(self)
+        return [self._montar(linha) for linha in super().fetchall()]
+
+    def __iter__(self):
+        proxima = extensions.cursor.__next__
+        while True:
+            try:
+                linha = proxima(self)
+            except StopIteration:
+                return
+            yield self._montar(linha)
+
+_SQL_INSERIR_CLIENTE = """
+    INSERT INTO clientes (
+        nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip,
+        nome_norm, sobrenome_norm, cidade_norm
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+def _valores_cliente(nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip) -> tuple:
+    """
+    Parâmetros de _SQL_INSERIR_CLIENTE, já com as colunas normalizadas.
+    """
+    return (
+        nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip,
+        normalizar_texto(nome), normalizar_texto(sobrenome), normalizar_texto(cidade),
+    )
+
+@com_prazo
 def criar_cliente(
     nome: str,
     sobrenome: str,
@@ -27,30 +246,57 @@ def criar_cliente(
 ) -> int:
     with get_cursor() as cur:
         cur.execute(
-            """
-            INSERT INTO clientes (nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-            """,
-            (nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip),
+            _SQL_INSERIR_CLIENTE,
+            _valores_cliente(nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip),
         )
         new_id = cur.fetchone()[0]
         return new_id
 
-def _select_base(
+_SQL_SELECT_CLIENTES = """
+    SELECT id, nome, sobrenome, email, telefone, cidade, uf,
+           status_cliente, vip, criado_em, data_nascimento
+    FROM clientes
+"""
+
+# Sobrenome e cidade são comparados pelas colunas normalizadas (sem acento,
+# minúsculas; migração 0008_colunas_normalizadas.sql): "Sao Paulo" acha
+# "São Paulo" e a consulta continua usando índice.
+# O sobrenome aceita os curingas do LIKE ("silv%", "s_uza"), como o antigo
+# `sobrenome ILIKE %s`; sem curinga a comparação é por igualdade, que lê o
+# btree (sobrenome_norm, nome, id) já na ordem da listagem.
+_WHERE_SOBRENOME = "sobrenome_norm = %s"
+_WHERE_SOBRENOME_PADRAO = "sobrenome_norm LIKE %s"
+_WHERE_CIDADE = "cidade_norm LIKE %s"
+
+def _tem_curinga(texto: str) -> bool:
+    return "%" in texto or "_" in texto
+
+def _where_sobrenome(sobrenome: str) -> str:
+    return _WHERE_SOBRENOME_PADRAO if _tem_curinga(sobrenome) else _WHERE_SOBRENOME
+
+def _params_sobrenome(sobrenome: str) -> tuple:
+    return (normalizar_texto(sobrenome),)
+
+def _escapar_like(texto: str) -> str:
+    """
+    Escapa os curingas do LIKE (%, _ e a própria barra) para o texto
+    digitado valer literalmente: "50%" não vira "qualquer coisa depois de 50".
+    """
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _params_cidade(cidade: str) -> tuple:
+    return (f"%{_escapar_like(normalizar_texto(cidade))}%",)
+
+def _montar_select(
     where: str = "",
     params: tuple = (),
     limit: Optional[int] = None,
     offset: Optional[int] = None,
-) -> List[Linha]:
-    sql = """
-        SELECT id, nome, sobrenome, email, telefone, cidade, uf,
-               status_cliente, vip, criado_em, data_nascimento
-        FROM clientes
-    """
+) -> Tuple[str, tuple]:
+    sql = _SQL_SELECT_CLIENTES
     if where:
         sql += " WHERE " + where
-    sql += " ORDER BY nome"
+    sql += " ORDER BY nome, id"
 
     param_list = list(params)
 
@@ -62,17 +308,132 @@ def _select_base(
         sql += " OFFSET %s"
         param_list.append(offset)
 
-    with get_cursor() as cur:
-        cur.execute(sql, tuple(param_list))
+    return sql, tuple(param_list)
+
+@idempotente
+def _select_base(
+    where: str = "",
+    params: tuple = (),
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    sql, param_list = _montar_select(where, params, limit, offset)
+    with get_cursor(somente_leitura=True, cursor_factory=CursorClientes) as cur:
+        executar_preparada(cur, sql, param_list)
         return cur.fetchall()
 
+def _montar_select_pagina(
+    where: str,
+    params: tuple,
+    por_pagina: int,
+    direcao: str,
+    chave: Optional[Tuple[str, int]] = None,
+    pular: int = 0,
+) -> Tuple[str, tuple]:
+    """
+    SELECT de uma página por chave (nome, id): continua depois (ou antes)
+    da chave, sem OFFSET. Busca uma linha a mais para saber se há outra página.
+    `pular` só é usado sem chave (ir direto para a página X).
+    """
+    condicoes = [f"({where})"] if where else []
+    param_list = list(params)
+    if chave is not None:
+        condicoes.append("(nome, id) > (%s, %s)" if direcao == DEPOIS else "(nome, id) < (%s, %s)")
+        param_list.extend(chave)
+
+    sql = _SQL_SELECT_CLIENTES
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    sql += " ORDER BY nome, id" if direcao == DEPOIS else " ORDER BY nome DESC, id DESC"
+    sql += " LIMIT %s"
+    param_list.append(por_pagina + 1)
+    if pular:
+        sql += " OFFSET %s"
+        param_list.append(pular)
+    return sql, tuple(param_list)
+
+@idempotente
+def _pagina_base(
+    where: str = "",
+    params: tuple = (),
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    """
+    Uma página da listagem, paginando pela chave (nome, id).
+
+    - cursor=None: primeira página (ou a página que começa depois de `pular`
+      linhas, para ir direto a uma página qualquer).
+    - cursor=pagina.proximo / pagina.anterior: página seguinte / anterior,
+      em tempo constante, não importa quão longe se esteja do início.
+    """
+    direcao, chave = DEPOIS, None
+    if cursor is not None:
+        direcao, chave = decodificar_cursor(cursor)
+        pular = 0
+    sql, param_list = _montar_select_pagina(where, params, por_pagina, direcao, chave, pular)
+    return _executar_pagina(sql, param_list, por_pagina, direcao, cursor is not None or pular > 0)
+
+def _executar_pagina(
+    sql: str,
+    param_list: tuple,
+    por_pagina: int,
+    direcao: str,
+    veio_de_cursor: bool,
+) -> Pagina:
+    with get_cursor(somente_leitura=True, cursor_factory=CursorClientes) as cur:
+        executar_preparada(cur, sql, param_list)
+        linhas = cur.fetchall()
+    return montar_pagina(
+        linhas,
+        por_pagina,
+        direcao,
+        veio_de_cursor=veio_de_cursor,
+        chave=lambda linha: (linha[1], linha[0]),
+    )
+
+def _iter_base(
+    where: str = "",
+    params: tuple = (),
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    """
+    Igual a _select_base, mas entrega as linhas aos poucos (cursor no servidor).
+    Memória constante, não importa o tamanho do resultado.
+    """
+    sql, param_list = _montar_select(where, params, limit, offset)
+    return stream_query(sql, param_list, itersize=itersize, cursor_factory=CursorClientes)
+
+@com_prazo
 def buscar_por_sobrenome(
     sobrenome: str,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
 ) -> List[Linha]:
-    return _select_base("sobrenome ILIKE %s", (sobrenome,), limit, offset)
+    return _select_base(_where_sobrenome(sobrenome), _params_sobrenome(sobrenome), limit, offset)
 
+@com_prazo
+def buscar_por_sobrenome_iter(
+    sobrenome: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base(_where_sobrenome(sobrenome), _params_sobrenome(sobrenome), limit, offset, itersize)
+
+@com_prazo
+def buscar_por_sobrenome_pagina(
+    sobrenome: str,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base(_where_sobrenome(sobrenome), _params_sobrenome(sobrenome), por_pagina, cursor, pular)
+
+@com_prazo
 def buscar_por_uf(
     uf: str,
     limit: Optional[int] = None,
@@ -80,14 +441,51 @@ def buscar_por_uf(
 ) -> List[Linha]:
     return _select_base("uf = %s", (uf.upper(),), limit, offset)
 
+@com_prazo
+def buscar_por_uf_iter(
+    uf: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base("uf = %s", (uf.upper(),), limit, offset, itersize)
+
+@com_prazo
+def buscar_por_uf_pagina(
+    uf: str,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base("uf = %s", (uf.upper(),), por_pagina, cursor, pular)
+
+@com_prazo
 def buscar_por_cidade(
     cidade: str,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
 ) -> List[Linha]:
-    like = f"%{cidade}%"
-    return _select_base("cidade ILIKE %s", (like,), limit, offset)
+    return _select_base(_WHERE_CIDADE, _params_cidade(cidade), limit, offset)
 
+@com_prazo
+def buscar_por_cidade_iter(
+    cidade: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base(_WHERE_CIDADE, _params_cidade(cidade), limit, offset, itersize)
+
+@com_prazo
+def buscar_por_cidade_pagina(
+    cidade: str,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base(_WHERE_CIDADE, _params_cidade(cidade), por_pagina, cursor, pular)
+
+@com_prazo
 def buscar_por_status(
     status_cliente: str,
     limit: Optional[int] = None,
@@ -95,95 +493,741 @@ def buscar_por_status(
 ) -> List[Linha]:
     return _select_base("status_cliente = %s", (status_cliente,), limit, offset)
 
+@com_prazo
+def buscar_por_status_iter(
+    status_cliente: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base("status_cliente = %s", (status_cliente,), limit, offset, itersize)
+
+@com_prazo
+def buscar_por_status_pagina(
+    status_cliente: str,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base("status_cliente = %s", (status_cliente,), por_pagina, cursor, pular)
+
+@com_prazo
 def buscar_vips(
     limit: Optional[int] = None,
     offset: Optional[int] = None,
 ) -> List[Linha]:
     return _select_base("vip = TRUE", (), limit, offset)
 
+@com_prazo
+def buscar_vips_iter(
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base("vip = TRUE", (), limit, offset, itersize)
+
+@com_prazo
+def buscar_vips_pagina(
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base("vip = TRUE", (), por_pagina, cursor, pular)
+
+# Chave MMDD do aniversário (15/03 -> 315). Precisa ser idêntica à expressão
+# do índice idx_clientes_aniversario (scripts/migracoes/0006_indice_aniversario.sql),
+# senão o PostgreSQL não usa o índice e volta a ler a tabela inteira.
+_EXPR_ANIVERSARIO = (
+    "((EXTRACT(MONTH FROM data_nascimento) * 100 + EXTRACT(DAY FROM data_nascimento))::int)"
+)
+
+_WHERE_ANIVERSARIANTES_MES = (
+    f"data_nascimento IS NOT NULL AND {_EXPR_ANIVERSARIO} BETWEEN %s AND %s"
+)
+
+_WHERE_ANIVERSARIANTES_HOJE = (
+    f"data_nascimento IS NOT NULL AND {_EXPR_ANIVERSARIO} = "
+    "(EXTRACT(MONTH FROM CURRENT_DATE) * 100 + EXTRACT(DAY FROM CURRENT_DATE))::int"
+)
+
+# Duas faixas de chave: a janela dos próximos N dias pode atravessar o
+# fim do ano (ex.: 20/12 a 10/01 -> 1220..1231 e 101..110).
+_WHERE_ANIVERSARIANTES_JANELA = (
+    f"data_nascimento IS NOT NULL AND ({_EXPR_ANIVERSARIO} BETWEEN %s AND %s "
+    f"OR {_EXPR_ANIVERSARIO} BETWEEN %s AND %s)"
+)
+
+def _faixa_mes(mes: int) -> Tuple[int, int]:
+    """
+    Faixa de chaves MMDD de um mês (ex.: 3 -> (301, 331)).
+    """
+    return mes * 100 + 1, mes * 100 + 31
+
+def _faixas_janela(inicio: date, dias: int) -> Tuple[int, int, int, int]:
+    """
+    Faixas de chaves MMDD dos aniversários entre `inicio` e os `dias - 1`
+    dias seguintes. Quando a janela vira o ano, são duas faixas; senão a
+    segunda é vazia (1, 0). 29/02 entra sempre que a janela passa por
+    28/02 e 01/03, mesmo em ano não bissexto.
+    """
+    if dias < 1:
+        raise ValueError("dias deve ser pelo menos 1")
+    if dias >= 366:
+        return 101, 1231, 1, 0
+    fim = inicio + timedelta(days=dias - 1)
+    chave_inicio = inicio.month * 100 + inicio.day
+    chave_fim = fim.month * 100 + fim.day
+    if fim.year == inicio.year:
+        return chave_inicio, chave_fim, 1, 0
+    return chave_inicio, 1231, 101, chave_fim
+
+@com_prazo
 def buscar_aniversariantes_mes(
     mes: int,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
 ) -> List[Linha]:
-    return _select_base(
-        "data_nascimento IS NOT NULL AND EXTRACT(MONTH FROM data_nascimento) = %s",
-        (mes,),
-        limit,
-        offset,
-    )
+    return _select_base(_WHERE_ANIVERSARIANTES_MES, _faixa_mes(mes), limit, offset)
+
+@com_prazo
+def buscar_aniversariantes_mes_iter(
+    mes: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base(_WHERE_ANIVERSARIANTES_MES, _faixa_mes(mes), limit, offset, itersize)
 
+@com_prazo
+def buscar_aniversariantes_mes_pagina(
+    mes: int,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base(_WHERE_ANIVERSARIANTES_MES, _faixa_mes(mes), por_pagina, cursor, pular)
+
+@com_prazo
 def buscar_aniversariantes_hoje(
     limit: Optional[int] = None,
     offset: Optional[int] = None,
 ) -> List[Linha]:
-    where = (
-        "data_nascimento IS NOT NULL "
-        "AND EXTRACT(MONTH FROM data_nascimento) = EXTRACT(MONTH FROM CURRENT_DATE) "
-        "AND EXTRACT(DAY   FROM data_nascimento) = EXTRACT(DAY   FROM CURRENT_DATE)"
+    return _select_base(_WHERE_ANIVERSARIANTES_HOJE, (), limit, offset)
+
+@com_prazo
+def buscar_aniversariantes_hoje_iter(
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base(_WHERE_ANIVERSARIANTES_HOJE, (), limit, offset, itersize)
+
+@com_prazo
+def buscar_aniversariantes_hoje_pagina(
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base(_WHERE_ANIVERSARIANTES_HOJE, (), por_pagina, cursor, pular)
+
+@com_prazo
+def buscar_aniversariantes_proximos_dias(
+    dias: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    """
+    Aniversariantes de hoje até daqui a `dias - 1` dias (dias=7: a semana
+    que começa hoje), atravessando a virada do ano se preciso.
+    """
+    return _select_base(_WHERE_ANIVERSARIANTES_JANELA, _faixas_janela(date.today(), dias), limit, offset)
+
+@com_prazo
+def buscar_aniversariantes_proximos_dias_iter(
+    dias: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    itersize: Optional[int] = None,
+) -> Iterator[Linha]:
+    return _iter_base(
+        _WHERE_ANIVERSARIANTES_JANELA, _faixas_janela(date.today(), dias), limit, offset, itersize
     )
-    return _select_base(where, (), limit, offset)
 
-def contar_clientes() -> int:
-    with get_cursor() as cur:
-        cur.execute("SELECT COUNT(*) FROM clientes")
-        total = cur.fetchone()[0]
-        return total
+@com_prazo
+def buscar_aniversariantes_proximos_dias_pagina(
+    dias: int,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    return _pagina_base(
+        _WHERE_ANIVERSARIANTES_JANELA, _faixas_janela(date.today(), dias), por_pagina, cursor, pular
+    )
 
-def estatisticas_clientes() -> Dict[str, int]:
-    stats: Dict[str, int] = {}
-    with get_cursor() as cur:
-        cur.execute("SELECT COUNT(*) FROM clientes")
-        stats["total"] = cur.fetchone()[0]
+@dataclass(frozen=True)
+class FiltrosClientes:
+    """
+    Filtros de buscar_clientes(); None = não filtra por aquele campo.
 
-        cur.execute("SELECT COUNT(*) FROM clientes WHERE status_cliente = 'ativo'")
-        stats["ativos"] = cur.fetchone()[0]
+    - uf, status_cliente:  igualdade
+    - cidade:              pedaço do nome, sem diferenciar maiúsculas/acentos
+    - sobrenome:           igual, sem diferenciar maiúsculas/acentos
+                           (aceita os curingas % e _ do LIKE)
+    - vip:                 True = só VIPs, False = só não VIPs
+    - mes_aniversario:     1-12
+    - aniversario_proximos_dias: aniversário de hoje até N-1 dias adiante
+    """
 
-        cur.execute("SELECT COUNT(*) FROM clientes WHERE status_cliente = 'inativo'")
-        stats["inativos"] = cur.fetchone()[0]
+    uf: Optional[str] = None
+    cidade: Optional[str] = None
+    sobrenome: Optional[str] = None
+    status_cliente: Optional[str] = None
+    vip: Optional[bool] = None
+    mes_aniversario: Optional[int] = None
+    aniversario_proximos_dias: Optional[int] = None
 
-        cur.execute("SELECT COUNT(*) FROM clientes WHERE vip = TRUE")
-        stats["vips"] = cur.fetchone()[0]
+# Condição e parâmetros de cada filtro, na ordem em que entram no WHERE.
+# `vip` vira duas condições fixas (sem parâmetro) para o PostgreSQL poder
+# usar o índice parcial idx_clientes_vip_nome (WHERE vip).
+_FILTROS = {
+    "uf": ("uf = %s", lambda v: (v.upper(),)),
+    "status_cliente": ("status_cliente = %s", lambda v: (v,)),
+    "vip": ("vip", lambda v: ()),
+    "nao_vip": ("NOT vip", lambda v: ()),
+    "sobrenome": (_WHERE_SOBRENOME, _params_sobrenome),
+    "sobrenome_padrao": (_WHERE_SOBRENOME_PADRAO, _params_sobrenome),
+    "cidade": (_WHERE_CIDADE, _params_cidade),
+    "mes_aniversario": (_WHERE_ANIVERSARIANTES_MES, _faixa_mes),
+    "aniversario_proximos_dias": (
+        _WHERE_ANIVERSARIANTES_JANELA,
+        lambda v: _faixas_janela(date.today(), v),
+    ),
+}
 
-    return stats
+def _como_filtros(filtros) -> FiltrosClientes:
+    """
+    Aceita None (sem filtros), dict ou FiltrosClientes.
+    """
+    if filtros is None:
+        return FiltrosClientes()
+    if isinstance(filtros, dict):
+        return FiltrosClientes(**filtros)
+    return filtros
 
-def ranking_ufs(limit: Optional[int] = None) -> List[Tuple[str, int]]:
+def _forma_filtros(filtros: FiltrosClientes) -> Tuple[Tuple[str, ...], tuple]:
     """
-    Retorna lista (uf, quantidade) ordenada da maior para a menor quantidade de clientes.
+    "Forma" dos filtros (quais condições entram, em ordem fixa) e os
+    parâmetros correspondentes. Filtros com a mesma forma usam o mesmo SQL.
+    """
+    valores = asdict(filtros)
+    if filtros.vip is False:
+        valores["vip"], valores["nao_vip"] = None, True
+    if filtros.sobrenome is not None and _tem_curinga(filtros.sobrenome):
+        valores["sobrenome"], valores["sobrenome_padrao"] = None, filtros.sobrenome
+    if filtros.mes_aniversario is not None and not 1 <= filtros.mes_aniversario <= 12:
+        raise ValueError("mes_aniversario deve estar entre 1 e 12")
+
+    forma, params = [], []
+    for campo, (_, montar_params) in _FILTROS.items():
+        valor = valores.get(campo)
+        if valor is None:
+            continue
+        forma.append(campo)
+        params.extend(montar_params(valor))
+    return tuple(forma), tuple(params)
+
+@functools.lru_cache(maxsize=256)
+def _compilar_busca(forma: Tuple[str, ...], direcao: str, com_chave: bool, com_pular: bool) -> str:
+    """
+    SQL da página para uma forma de filtros. Montado uma vez por forma e
+    direção; os parâmetros mudam a cada chamada, o texto do SQL não (e
+    executar_preparada reaproveita o mesmo PREPARE).
+    """
+    where = " AND ".join(f"({_FILTROS[campo][0]})" for campo in forma)
+    sql, _ = _montar_select_pagina(
+        where, (), 0, direcao, ("", 0) if com_chave else None, 1 if com_pular else 0
+    )
+    return sql
+
+@com_prazo
+@idempotente
+def buscar_clientes(
+    filtros=None,
+    por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    pular: int = 0,
+) -> Pagina:
+    """
+    Busca com qualquer combinação de filtros numa consulta só, paginada
+    pela chave (nome, id).
+
+    `filtros` pode ser um FiltrosClientes ou um dict com os mesmos campos:
+        buscar_clientes({"uf": "SP", "status_cliente": "ativo", "vip": True,
+                         "mes_aniversario": 3})
+    """
+    forma, params = _forma_filtros(_como_filtros(filtros))
+
+    direcao, chave = DEPOIS, None
+    if cursor is not None:
+        direcao, chave = decodificar_cursor(cursor)
+        pular = 0
+    sql = _compilar_busca(forma, direcao, chave is not None, pular > 0)
+
+    # mesma ordem de parâmetros de _montar_select_pagina
+    param_list = list(params)
+    if chave is not None:
+        param_list.extend(chave)
+    param_list.append(por_pagina + 1)
+    if pular:
+        param_list.append(pular)
+    return _executar_pagina(sql, tuple(param_list), por_pagina, direcao, cursor is not None or pular > 0)
+
+@functools.lru_cache(maxsize=64)
+def _compilar_listagem(forma: Tuple[str, ...]) -> str:
+    sql = _SQL_SELECT_CLIENTES
+    if forma:
+        sql += " WHERE " + " AND ".join(f"({_FILTROS[campo][0]})" for campo in forma)
+    return sql + " ORDER BY nome, id"
+
+class ListagemRolavel:
+    """
+    Listagem de clientes (ordem nome, id) aberta num cursor rolável do
+    servidor (src.database.CursorRolavel), com a mesma paginação de
+    buscar_*_pagina(): pagina(por_pagina, cursor, pular) devolve uma Pagina
+    cujos tokens levam à página seguinte/anterior.
+
+    - A consulta roda uma vez, na abertura; todas as páginas vêm dessa mesma
+      foto (importações feitas enquanto isso não deslocam linhas entre
+      páginas) e ir direto para a página X custa o mesmo que ir para a próxima.
+    - Feche com fechar() (ou use com `with`) ao sair da listagem.
+    - Se o cursor fechar por inatividade, a próxima página abre outro
+      (uma foto nova); `reaberturas` conta quantas vezes isso aconteceu.
+    """
+
+    def __init__(self, filtros=None, ocioso: Optional[float] = None):
+        forma, self._params = _forma_filtros(_como_filtros(filtros))
+        self._sql = _compilar_listagem(forma)
+        self._ocioso = ocioso
+        self._lock = threading.Lock()
+        self.reaberturas = 0
+        self._cursor = CursorRolavel(
+            self._sql, self._params, ocioso=ocioso, cursor_factory=CursorClientes
+        )
+
+    @property
+    def total(self) -> int:
+        return self._cursor.total
+
+    @property
+    def aberto_em(self) -> datetime:
+        return self._cursor.aberto_em
+
+    @com_prazo
+    def pagina(self, por_pagina: int = 20, cursor: Optional[str] = None, pular: int = 0) -> Pagina:
+        inicio = posicao_do_token(cursor, pular)
+        with self._lock:
+            try:
+                linhas = self._cursor.ler(inicio, por_pagina)
+            except CursorFechado as e:
+                if not e.expirado:
+                    raise
+                self._cursor = CursorRolavel(
+                    self._sql, self._params, ocioso=self._ocioso, cursor_factory=CursorClientes
+                )
+                self.reaberturas += 1
+                linhas = self._cursor.ler(inicio, por_pagina)
+            total = self._cursor.total
+        return montar_pagina_por_posicao(linhas, inicio, por_pagina, total)
+
+    def fechar(self):
+        self._cursor.fechar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
+
+@com_prazo
+def abrir_listagem(filtros=None, ocioso: Optional[float] = None) -> ListagemRolavel:
+    """
+    Abre uma ListagemRolavel com os mesmos filtros de buscar_clientes()
+    (dict ou FiltrosClientes). O prazo vale para a abertura, que é quando a
+    consulta roda de verdade.
+
+        with abrir_listagem({"uf": "SP"}, timeout=30) as listagem:
+            pagina = listagem.pagina(por_pagina=20)
+            quinta = listagem.pagina(por_pagina=20, pular=80)
+    """
+    return ListagemRolavel(filtros, ocioso)
+
+# Busca por similaridade (pg_trgm), nas colunas normalizadas (sem acento,
+# minúsculas), com o texto normalizado do mesmo jeito:
+# - valor % texto acha grafias parecidas e boa parte dos pedaços
+#   ("Olivera" -> "Oliveira", "sao paul" -> "São Paulo");
+# - ORDER BY valor <-> texto entrega do mais parecido para o menos.
+# Os dois operadores usam o índice GiST de trigramas da coluna (migração
+# 0011_indices_trigram_gist.sql), que devolve as linhas já nessa ordem: a
+# leitura para nos `limit` primeiros, mesmo com milhares de clientes na
+# mesma cidade. (A semelhança por palavra, <% e <<->, acharia pedaços
+# menores, mas no GiST ela chega a ler o índice quase inteiro.)
+_SQL_PESQUISA = """
+    SELECT id, nome, sobrenome, email, telefone, cidade, uf,
+           status_cliente, vip, criado_em, data_nascimento
+    FROM clientes
+    WHERE {coluna} %% %s
+    ORDER BY {coluna} <-> %s
+    LIMIT %s
+"""
+
+def _params_pesquisa(texto: str, limit: int) -> tuple:
+    texto = normalizar_texto(texto)
+    return (texto, texto, limit)
+
+@idempotente
+def _pesquisar_base(coluna: str, texto: str, limit: int) -> List[Linha]:
+    sql = _SQL_PESQUISA.format(coluna=coluna)
+    with get_cursor(somente_leitura=True, cursor_factory=CursorClientes) as cur:
+        executar_preparada(cur, sql, _params_pesquisa(texto, limit))
+        return cur.fetchall()
+
+@com_prazo
+def pesquisar_cidade(texto: str, limit: int = 20) -> List[Linha]:
+    """
+    Os `limit` clientes cuja cidade mais se parece com `texto` (pedaço do
+    nome ou grafia aproximada), do mais parecido para o menos parecido.
+    """
+    return _pesquisar_base("cidade_norm", texto, limit)
+
+@com_prazo
+def pesquisar_sobrenome(texto: str, limit: int = 20) -> List[Linha]:
+    """
+    Os `limit` clientes cujo sobrenome mais se parece com `texto`
+    (ex.: "Olivera" acha "Oliveira"), do mais parecido para o menos parecido.
+    """
+    return _pesquisar_base("sobrenome_norm", texto, limit)
+
+# Busca textual (full-text) com o tsvector clientes_busca(...) (sem
+# acentos, com nome, sobrenome, email e cidade; migração 0007_busca_texto.sql).
+# O índice GIN é sobre essa mesma expressão, então o WHERE tem de repeti-la
+# igual. Cada palavra vira prefixo: "carl oliv" -> 'carl':* & 'oliv':*.
+# Sem `candidatos`, todas as linhas que casam são ordenadas pela relevância
+# (o índice GIN só acha as linhas; ts_rank é calculado em cada uma). Termos
+# muito comuns ("silva") casam com milhões de linhas e isso leva centenas
+# de ms; com `candidatos=N` a relevância é calculada só sobre as N
+# primeiras linhas que o índice encontrar (que não são necessariamente as
+# mais relevantes). O menu e a CLI usam CANDIDATOS_PESQUISA.
+_SQL_PESQUISA_TEXTO = """
+    SELECT c.id, c.nome, c.sobrenome, c.email, c.telefone, c.cidade, c.uf,
+           c.status_cliente, c.vip, c.criado_em, c.data_nascimento
+    FROM clientes c,
+         to_tsquery('simple', f_unaccent(%s)) AS q(consulta)
+    WHERE clientes_busca(c.nome, c.sobrenome, c.email, c.cidade) @@ q.consulta
+    ORDER BY ts_rank(clientes_busca(c.nome, c.sobrenome, c.email, c.cidade), q.consulta) DESC,
+             c.nome, c.id
+    LIMIT %s
+"""
+
+_SQL_PESQUISA_TEXTO_CANDIDATOS = """
+    SELECT id, nome, sobrenome, email, telefone, cidade, uf,
+           status_cliente, vip, criado_em, data_nascimento
+    FROM (
+        SELECT c.id, c.nome, c.sobrenome, c.email, c.telefone, c.cidade, c.uf,
+               c.status_cliente, c.vip, c.criado_em, c.data_nascimento,
+               ts_rank(clientes_busca(c.nome, c.sobrenome, c.email, c.cidade), q.consulta) AS relevancia
+        FROM clientes c,
+             to_tsquery('simple', f_unaccent(%s)) AS q(consulta)
+        WHERE clientes_busca(c.nome, c.sobrenome, c.email, c.cidade) @@ q.consulta
+        LIMIT %s
+    ) candidatos
+    ORDER BY relevancia DESC, nome, id
+    LIMIT %s
+"""
+
+# Candidatos do menu e da CLI: mantém a pesquisa em dezenas de ms mesmo
+# com termos que casam com milhões de clientes
+CANDIDATOS_PESQUISA = 500
+
+def _consulta_texto(texto: str) -> str:
+    """
+    Converte o texto digitado numa tsquery de prefixos:
+    "Carl Oliv" -> "carl:* & oliv:*". Só letras e números entram (o resto
+    separa palavras), então o resultado é sempre uma tsquery válida.
+    """
+    palavras = re.findall(r"[^\W_]+", texto.lower())
+    return " & ".join(f"{palavra}:*" for palavra in palavras)
+
+def _montar_pesquisa(consulta: str, limit: int, candidatos: Optional[int]) -> Tuple[str, tuple]:
+    """
+    SQL e parâmetros de pesquisar(): ranking de todas as linhas que casam
+    ou, com `candidatos`, só das `candidatos` primeiras.
+    """
+    if candidatos is None:
+        return _SQL_PESQUISA_TEXTO, (consulta, limit)
+    if candidatos < limit:
+        raise ValueError(f"candidatos ({candidatos}) não pode ser menor que limit ({limit})")
+    return _SQL_PESQUISA_TEXTO_CANDIDATOS, (consulta, candidatos, limit)
+
+@com_prazo
+@idempotente
+def pesquisar(texto: str, limit: int = 20, candidatos: Optional[int] = None) -> List[Linha]:
+    """
+    Pesquisa livre em nome, sobrenome, email e cidade (sem diferenciar
+    acentos nem maiúsculas), do mais relevante para o menos relevante.
+    Nome/sobrenome pesam mais que email, que pesa mais que cidade.
+
+    candidatos=N (opcional) limita o ranking às N primeiras linhas achadas
+    pelo índice: bem mais rápido para termos muito comuns, mas os
+    resultados podem não ser os mais relevantes de todos. O menu e a CLI
+    usam CANDIDATOS_PESQUISA; sem `candidatos`, todas as linhas que casam
+    são ordenadas.
+    """
+    consulta = _consulta_texto(texto)
+    if not consulta:
+        return []
+    sql, params = _montar_pesquisa(consulta, limit, candidatos)
+    with get_cursor(somente_leitura=True, cursor_factory=CursorClientes) as cur:
+        executar_preparada(cur, sql, params)
+        return cur.fetchall()
+
+# Contagem estimada: o número de linhas que o planejador já conhece, sem ler
+# a tabela. Sem filtros vem de pg_class.reltuples, proporcional ao tamanho
+# atual da tabela (a mesma conta que o planejador faz); com filtros, da
+# estimativa de linhas do EXPLAIN. NULL = tabela ainda sem ANALYZE.
+_SQL_ESTIMATIVA_TOTAL = """
+    SELECT CASE
+               WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+               ELSE round(
+                   c.reltuples / c.relpages
+                   * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+               )::bigint
+           END
+    FROM pg_class c
+    WHERE c.oid = 'clientes'::regclass
+"""
+
+MODOS_CONTAGEM = ("estimado", "exato")
+
+@functools.lru_cache(maxsize=256)
+def _compilar_contagem(forma: Tuple[str, ...], modo: str) -> str:
+    """
+    SQL de contar_clientes() para uma forma de filtros: COUNT(*) no modo
+    exato, EXPLAIN da mesma seleção no estimado.
+    """
+    sql = "SELECT COUNT(*) FROM clientes" if modo == "exato" else "SELECT 1 FROM clientes"
+    if forma:
+        sql += " WHERE " + " AND ".join(f"({_FILTROS[campo][0]})" for campo in forma)
+    return sql if modo == "exato" else "EXPLAIN (FORMAT JSON) " + sql
+
+def _linhas_estimadas(plano) -> int:
+    """
+    Linhas estimadas no nó de cima de um EXPLAIN (FORMAT JSON).
+    """
+    return int(plano[0]["Plan"]["Plan Rows"])
+
+def _montar_contagem(modo: str, filtros) -> Tuple[Tuple[str, ...], tuple]:
+    if modo not in MODOS_CONTAGEM:
+        raise ValueError(f"modo deve ser um de {MODOS_CONTAGEM}, não {modo!r}")
+    return _forma_filtros(_como_filtros(filtros))
+
+@com_prazo
+@idempotente
+def contar_clientes(modo: str = "exato", filtros=None) -> int:
     """
+    Quantos clientes existem (com os mesmos filtros de buscar_clientes, se
+    informados).
+
+    - modo="exato":    COUNT(*); lê a tabela (ou o índice) inteira.
+    - modo="estimado": estatísticas do planejador, em menos de 1 ms com
+      qualquer tamanho de tabela. Erra alguns % (depende do último ANALYZE).
+    """
+    forma, params = _montar_contagem(modo, filtros)
+    with get_cursor(somente_leitura=True) as cur:
+        if modo == "exato":
+            executar_preparada(cur, _compilar_contagem(forma, modo), params)
+            return cur.fetchone()[0]
+        if not forma:
+            executar_preparada(cur, _SQL_ESTIMATIVA_TOTAL)
+            total = cur.fetchone()[0]
+            if total is not None:
+                return total
+        # EXPLAIN não pode ser preparado (PREPARE só aceita SELECT/DML)
+        cur.execute(_compilar_contagem(forma, modo), params)
+        return _linhas_estimadas(cur.fetchone()[0])
+
+# Estatísticas e rankings somam a tabela clientes_contadores (linhas por
+# uf/cidade/status/vip mantidas por gatilhos; migração
+# 0009_clientes_contadores.sql) em vez de contar a tabela de clientes.
+_CHAVES_ESTATISTICAS = ("total", "ativos", "inativos", "vips")
+
+_SQL_ESTATISTICAS = """
+    SELECT COALESCE(SUM(qtde), 0)::bigint,
+           COALESCE(SUM(qtde) FILTER (WHERE status_cliente = 'ativo'), 0)::bigint,
+           COALESCE(SUM(qtde) FILTER (WHERE status_cliente = 'inativo'), 0)::bigint,
+           COALESCE(SUM(qtde) FILTER (WHERE vip), 0)::bigint
+    FROM clientes_contadores
+"""
+
+@em_cache("clientes")
+@com_prazo
+@idempotente
+def estatisticas_clientes() -> Dict[str, int]:
+    with get_cursor(somente_leitura=True) as cur:
+        executar_preparada(cur, _SQL_ESTATISTICAS)
+        return dict(zip(_CHAVES_ESTATISTICAS, cur.fetchone()))
+
+def _montar_ranking_ufs(limit: Optional[int] = None) -> Tuple[str, tuple]:
     sql = """
-        SELECT uf, COUNT(*) AS qtde
-        FROM clientes
+        SELECT uf, SUM(qtde)::bigint AS qtde
+        FROM clientes_contadores
         WHERE uf IS NOT NULL
         GROUP BY uf
-        ORDER BY qtde DESC
+        HAVING SUM(qtde) > 0
+        ORDER BY qtde DESC, uf ASC
     """
     params: tuple = ()
     if limit is not None:
         sql += " LIMIT %s"
         params = (limit,)
+    return sql, params
 
-    with get_cursor() as cur:
-        cur.execute(sql, params)
-        return [(uf, qtde) for (uf, qtde) in cur.fetchall()]
-
-def ranking_cidades_por_uf(uf: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+@em_cache("clientes")
+@com_prazo
+@idempotente
+def ranking_ufs(limit: Optional[int] = None) -> List[Tuple[str, int]]:
     """
-    Retorna lista (cidade, quantidade) para uma UF específica.
+    Retorna lista (uf, quantidade) ordenada da maior para a menor quantidade de clientes.
     """
+    sql, params = _montar_ranking_ufs(limit)
+    with get_cursor(somente_leitura=True) as cur:
+        executar_preparada(cur, sql, params)
+        return [(uf, qtde) for (uf, qtde) in cur.fetchall()]
+
+def _montar_ranking_cidades(uf: str, limit: Optional[int] = None) -> Tuple[str, tuple]:
     sql = """
-        SELECT cidade, COUNT(*) AS qtde
-        FROM clientes
+        SELECT cidade, SUM(qtde)::bigint AS qtde
+        FROM clientes_contadores
         WHERE uf = %s
           AND cidade IS NOT NULL
         GROUP BY cidade
+        HAVING SUM(qtde) > 0
         ORDER BY qtde DESC, cidade ASC
     """
     params: tuple = (uf.upper(),)
     if limit is not None:
         sql += " LIMIT %s"
         params = params + (limit,)
+    return sql, params
 
-    with get_cursor() as cur:
-        cur.execute(sql, params)
+@em_cache("clientes")
+@com_prazo
+@idempotente
+def ranking_cidades_por_uf(uf: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Retorna lista (cidade, quantidade) para uma UF específica.
+    """
+    sql, params = _montar_ranking_cidades(uf, limit)
+    with get_cursor(somente_leitura=True) as cur:
+        executar_preparada(cur, sql, params)
         return [(cidade, qtde) for (cidade, qtde) in cur.fetchall()]
+
+@com_prazo
+@idempotente
+def compactar_contadores() -> int:
+    """
+    Junta as linhas de diferença de clientes_contadores numa linha por
+    grupo. Pode rodar com o sistema em uso (não bloqueia quem grava).
+    Retorna quantas linhas havia antes da compactação.
+    """
+    with get_cursor() as cur:
+        cur.execute("SELECT compactar_clientes_contadores()")
+        return cur.fetchone()[0]
+
+# Painel (estatísticas + contagem por UF e por cidade) numa leitura só de
+# clientes_contadores: GROUPING SETS calcula o total geral, os totais por
+# UF e por (UF, cidade) na mesma passada, e FILTER separa ativos,
+# inativos e VIPs sem consultas extras. GROUPING(uf, cidade) diz o nível
+# de cada linha: 3 = total geral, 1 = UF, 0 = cidade.
+_SQL_PAINEL = """
+    SELECT GROUPING(uf, cidade) AS nivel, uf, cidade,
+           COALESCE(SUM(qtde), 0)::bigint,
+           COALESCE(SUM(qtde) FILTER (WHERE status_cliente = 'ativo'), 0)::bigint,
+           COALESCE(SUM(qtde) FILTER (WHERE status_cliente = 'inativo'), 0)::bigint,
+           COALESCE(SUM(qtde) FILTER (WHERE vip), 0)::bigint
+    FROM clientes_contadores
+    GROUP BY GROUPING SETS ((), (uf), (uf, cidade))
+"""
+
+_NIVEL_TOTAL, _NIVEL_UF, _NIVEL_CIDADE = 3, 1, 0
+
+@dataclass(frozen=True)
+class PainelClientes:
+    """
+    Retrato dos números de clientes num instante (`gerado_em`).
+
+    - por_uf:     ((uf, qtde), ...) da maior para a menor quantidade
+    - por_cidade: {uf: ((cidade, qtde), ...)}, na mesma ordem
+    """
+
+    total: int
+    ativos: int
+    inativos: int
+    vips: int
+    por_uf: Tuple[Tuple[str, int], ...]
+    por_cidade: Dict[str, Tuple[Tuple[str, int], ...]]
+    gerado_em: datetime
+
+    def estatisticas(self) -> Dict[str, int]:
+        """
+        Mesmo formato de estatisticas_clientes().
+        """
+        return dict(zip(_CHAVES_ESTATISTICAS, (self.total, self.ativos, self.inativos, self.vips)))
+
+    def ranking_ufs(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        return list(self.por_uf[:limit])
+
+    def ranking_cidades(self, uf: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        return list(self.por_cidade.get(uf.upper(), ())[:limit])
+
+def _montar_painel(linhas, gerado_em: datetime) -> PainelClientes:
+    """
+    Monta o PainelClientes a partir das linhas de _SQL_PAINEL.
+    Grupos sem UF/cidade ou zerados ficam fora dos rankings (como em
+    ranking_ufs e ranking_cidades_por_uf).
+    """
+    totais = (0, 0, 0, 0)
+    por_uf, por_cidade = [], {}
+    for nivel, uf, cidade, qtde, ativos, inativos, vips in linhas:
+        if nivel == _NIVEL_TOTAL:
+            totais = (qtde, ativos, inativos, vips)
+        elif uf is None or qtde <= 0:
+            continue
+        elif nivel == _NIVEL_UF:
+            por_uf.append((uf, qtde))
+        elif cidade is not None:
+            por_cidade.setdefault(uf, []).append((cidade, qtde))
+
+    def ordenar(pares):
+        return tuple(sorted(pares, key=lambda par: (-par[1], par[0])))
+
+    return PainelClientes(
+        *totais,
+        por_uf=ordenar(por_uf),
+        por_cidade={uf: ordenar(cidades) for uf, cidades in por_cidade.items()},
+        gerado_em=gerado_em,
+    )
+
+@em_cache("clientes")
+@com_prazo
+@idempotente
+def painel_clientes() -> PainelClientes:
+    """
+    Total, ativos, inativos, VIPs e as contagens por UF e por cidade numa
+    consulta só. As telas de estatísticas e rankings do menu desenham a
+    partir do mesmo painel, sem voltar ao banco.
+    """
+    with get_cursor(somente_leitura=True) as cur:
+        executar_preparada(cur, _SQL_PAINEL)
+        return _montar_painel(cur.fetchall(), datetime.now())
+
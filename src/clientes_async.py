@@ -0,0 +1,288 @@
+"""
+Versão assíncrona (asyncio) das funções de src/clientes.py.
+
+Pensada para a futura API web (FastAPI): várias consultas podem rodar ao
+mesmo tempo, cada uma em uma conexão do pool assíncrono, sem travar o
+event loop.
+
+Uso típico:
+    import asyncio
+    from src import clientes_async
+
+    async def exemplo():
+        sp, rj = await asyncio.gather(
+            clientes_async.buscar_por_uf("SP", limit=10),
+            clientes_async.buscar_por_uf("RJ", limit=10),
+        )
+        await clientes_async.fechar_pool()
+
+    asyncio.run(exemplo())
+
+- As consultas (SQL) são as mesmas de src/clientes.py.
+- As buscas devolvem clientes.ClienteRow, como a versão síncrona (aqui
+  as datas já chegam convertidas pelo psycopg 3).
+- Usa psycopg 3 (`psycopg` + `psycopg_pool`), que tem driver assíncrono nativo.
+
+O que a versão síncrona faz e esta AINDA NÃO faz (tudo lá depende de
+psycopg2 e do estado por thread de src/database.py):
+- prazo por chamada (@com_prazo / `timeout=`): para limitar o tempo, use
+  asyncio.wait_for(); o psycopg 3 cancela a consulta no servidor quando a
+  tarefa é cancelada;
+- retentativa de falhas transitórias (@idempotente);
+- leituras nas réplicas (PGREPLICA_HOSTS): tudo vai para o primário;
+- cache de resultados (@em_cache) e métricas por consulta.
+"""
+import asyncio
+import os
+from datetime import date, datetime
+from typing import Optional, List, Tuple, Dict
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import RowMaker
+from psycopg_pool import AsyncConnectionPool
+
+from src.database import _env_int, _env_float
+from src.clientes import (
+    ClienteRow,
+    Linha,
+    _SQL_INSERIR_CLIENTE,
+    _CHAVES_ESTATISTICAS,
+    _SQL_ESTATISTICAS,
+    _SQL_ESTIMATIVA_TOTAL,
+    _SQL_PAINEL,
+    PainelClientes,
+    _where_sobrenome,
+    _WHERE_CIDADE,
+    _WHERE_ANIVERSARIANTES_MES,
+    _WHERE_ANIVERSARIANTES_HOJE,
+    _WHERE_ANIVERSARIANTES_JANELA,
+    _faixa_mes,
+    _params_sobrenome,
+    _params_cidade,
+    _valores_cliente,
+    _faixas_janela,
+    _compilar_contagem,
+    _linhas_estimadas,
+    _montar_contagem,
+    _montar_painel,
+    _montar_select,
+    _montar_ranking_ufs,
+    _montar_ranking_cidades,
+)
+
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock = asyncio.Lock()
+
+
+def _conninfo() -> str:
+    return make_conninfo(
+        host=os.getenv("PGHOST", "localhost"),
+        port=os.getenv("PGPORT", "5433"),
+        dbname=os.getenv("PGDATABASE", "clientes"),
+        user=os.getenv("PGUSER", "app"),
+        password=os.getenv("PGPASSWORD", "app"),
+    )
+
+
+async def get_pool() -> AsyncConnectionPool:
+    """
+    Devolve o pool assíncrono, abrindo-o na primeira chamada.
+    Usa as mesmas variáveis PGPOOL_MIN / PGPOOL_MAX / PGPOOL_TIMEOUT /
+    PGPOOL_IDLE_TIMEOUT do pool síncrono.
+    """
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                pool = AsyncConnectionPool(
+                    _conninfo(),
+                    min_size=_env_int("PGPOOL_MIN", 1),
+                    max_size=_env_int("PGPOOL_MAX", 10),
+                    timeout=_env_float("PGPOOL_TIMEOUT", 30.0),
+                    max_idle=_env_float("PGPOOL_IDLE_TIMEOUT", 300.0),
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+async def fechar_pool():
+    """
+    Fecha o pool assíncrono (chamar no shutdown da aplicação).
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def pool_stats() -> dict:
+    """
+    Estatísticas do pool assíncrono (ver psycopg_pool.AsyncConnectionPool.get_stats).
+    """
+    if _pool is None:
+        return {}
+    return _pool.get_stats()
+
+
+def _linha_cliente(cursor) -> RowMaker[ClienteRow]:
+    """row_factory do psycopg 3 para as colunas de _SQL_SELECT_CLIENTES."""
+    return lambda valores: ClienteRow(*valores)
+
+
+async def _buscar_todos(sql: str, params: tuple = (), preparar: bool = True,
+                        row_factory=None) -> list:
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=row_factory) as cur:
+            await cur.execute(sql, params, prepare=preparar)
+            return await cur.fetchall()
+
+
+async def _buscar_um(sql: str, params: tuple = (), preparar: bool = True) -> Optional[tuple]:
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params, prepare=preparar)
+            return await cur.fetchone()
+
+
+async def _select_base(
+    where: str = "",
+    params: tuple = (),
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    sql, param_list = _montar_select(where, params, limit, offset)
+    return await _buscar_todos(sql, param_list, row_factory=_linha_cliente)
+
+
+async def criar_cliente(
+    nome: str,
+    sobrenome: str,
+    email: Optional[str] = None,
+    telefone: Optional[str] = None,
+    cidade: Optional[str] = None,
+    uf: Optional[str] = None,
+    status_cliente: str = "ativo",
+    vip: bool = False,
+) -> int:
+    linha = await _buscar_um(
+        _SQL_INSERIR_CLIENTE,
+        _valores_cliente(nome, sobrenome, email, telefone, cidade, uf, status_cliente, vip),
+    )
+    return linha[0]
+
+
+async def buscar_por_sobrenome(
+    sobrenome: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base(_where_sobrenome(sobrenome), _params_sobrenome(sobrenome), limit, offset)
+
+
+async def buscar_por_uf(
+    uf: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base("uf = %s", (uf.upper(),), limit, offset)
+
+
+async def buscar_por_cidade(
+    cidade: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base(_WHERE_CIDADE, _params_cidade(cidade), limit, offset)
+
+
+async def buscar_por_status(
+    status_cliente: str,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base("status_cliente = %s", (status_cliente,), limit, offset)
+
+
+async def buscar_vips(
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base("vip = TRUE", (), limit, offset)
+
+
+async def buscar_aniversariantes_mes(
+    mes: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base(_WHERE_ANIVERSARIANTES_MES, _faixa_mes(mes), limit, offset)
+
+
+async def buscar_aniversariantes_hoje(
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base(_WHERE_ANIVERSARIANTES_HOJE, (), limit, offset)
+
+
+async def buscar_aniversariantes_proximos_dias(
+    dias: int,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+) -> List[Linha]:
+    return await _select_base(
+        _WHERE_ANIVERSARIANTES_JANELA, _faixas_janela(date.today(), dias), limit, offset
+    )
+
+
+async def contar_clientes(modo: str = "exato", filtros=None) -> int:
+    """
+    Mesmo resultado de clientes.contar_clientes() (modo "exato" ou
+    "estimado", filtros opcionais).
+    """
+    forma, params = _montar_contagem(modo, filtros)
+    if modo == "estimado" and not forma:
+        linha = await _buscar_um(_SQL_ESTIMATIVA_TOTAL)
+        if linha[0] is not None:
+            return linha[0]
+    if modo == "exato":
+        linha = await _buscar_um(_compilar_contagem(forma, modo), params)
+        return linha[0]
+    # EXPLAIN não pode ser preparado (PREPARE só aceita SELECT/DML)
+    linha = await _buscar_um(_compilar_contagem(forma, modo), params, preparar=False)
+    return _linhas_estimadas(linha[0])
+
+
+async def estatisticas_clientes() -> Dict[str, int]:
+    """
+    Mesmo resultado de clientes.estatisticas_clientes() (uma consulta só,
+    sobre clientes_contadores).
+    """
+    return dict(zip(_CHAVES_ESTATISTICAS, await _buscar_um(_SQL_ESTATISTICAS)))
+
+
+async def painel_clientes() -> PainelClientes:
+    """
+    Mesmo resultado de clientes.painel_clientes().
+    """
+    return _montar_painel(await _buscar_todos(_SQL_PAINEL), datetime.now())
+
+
+async def ranking_ufs(limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Retorna lista (uf, quantidade) ordenada da maior para a menor quantidade de clientes.
+    """
+    sql, params = _montar_ranking_ufs(limit)
+    return [(uf, qtde) for (uf, qtde) in await _buscar_todos(sql, params)]
+
+
+async def ranking_cidades_por_uf(uf: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Retorna lista (cidade, quantidade) para uma UF específica.
+    """
+    sql, params = _montar_ranking_cidades(uf, limit)
+    return [(cidade, qtde) for (cidade, qtde) in await _buscar_todos(sql, params)]
@@ -1,25 +1,938 @@
 import os
-import psycopg2
+import threading
+import time
+import atexit
+import uuid
+import random
+import re
+import json
+import select
+import hashlib
+import weakref
+import itertools
+import functools
+import math
+import sys
+import logging
+from collections import deque
 from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions
+from psycopg2 import errorcodes
+
+try:
+    from src.cache import FALTA, BackendPostgres, CacheResultados, chave_argumentos
+    from src.metricas import Metricas
+except ImportError:  # rodando de dentro de src/ (ex.: python main.py)
+    from cache import FALTA, BackendPostgres, CacheResultados, chave_argumentos
+    from metricas import Metricas
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    """
+    Lê um inteiro de variável de ambiente, caindo no padrão se vier vazio/inválido.
+    """
+    try:
+        return int(os.getenv(nome, "") or padrao)
+    except ValueError:
+        return padrao
+
+
+def _env_float(nome: str, padrao: float) -> float:
+    """
+    Lê um float de variável de ambiente, caindo no padrão se vier vazio/inválido.
+    """
+    try:
+        return float(os.getenv(nome, "") or padrao)
+    except ValueError:
+        return padrao
+
 
-def get_connection():
+def get_connection(host: str = None, port: str = None, connect_timeout: int = None):
     """
     Abre uma conexão com o PostgreSQL usando as variáveis de ambiente.
 
     Vantagens:
     - Não deixamos usuário/senha fixos no código.
     - Para trocar de banco (dev, homolog, prod), basta mudar o .env.
+
+    `host`/`port` permitem apontar para outra instância com as mesmas
+    credenciais (ex.: uma réplica de leitura). `connect_timeout` (s) limita
+    a espera por um servidor que não responde.
+
+    Obs.: esta função abre uma conexão NOVA (fora do pool). Para uso normal
+    prefira get_cursor(), que reaproveita conexões do pool.
     """
+    opcoes = {}
+    if connect_timeout is not None:
+        opcoes["connect_timeout"] = connect_timeout
     return psycopg2.connect(
-        host=os.getenv("PGHOST", "localhost"),
-        port=os.getenv("PGPORT", "5433"),  # padrão 5433, mas pode vir do .env
+        host=host or os.getenv("PGHOST", "localhost"),
+        port=port or os.getenv("PGPORT", "5433"),  # padrão 5433, mas pode vir do .env
         dbname=os.getenv("PGDATABASE", "clientes"),
         user=os.getenv("PGUSER", "app"),
         password=os.getenv("PGPASSWORD", "app"),
+        **opcoes,
     )
 
+
+class ConnectionPool:
+    """
+    Pool de conexões thread-safe.
+
+    - Mantém entre `minconn` e `maxconn` conexões abertas.
+    - Quando todas estão em uso, a thread espera até `timeout` segundos
+      por uma conexão livre (e isso entra nas estatísticas de espera).
+    - Antes de entregar uma conexão, confere se ela ainda está viva
+      (health check). Conexões paradas há mais de `ping_apos` segundos
+      recebem um `SELECT 1` antes de serem reaproveitadas.
+    - Conexões ociosas há mais de `idle_timeout` segundos são fechadas
+      (sem nunca baixar de `minconn`).
+    """
+
+    def __init__(
+        self,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 30.0,
+        idle_timeout: float = 300.0,
+        ping_apos: float = 30.0,
+        fabrica=get_connection,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Configuração de pool inválida: 0 <= min <= max e max >= 1.")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_apos = ping_apos
+        self._fabrica = fabrica
+
+        self._cond = threading.Condition()
+        self._livres = deque()  # (conexao, instante_em_que_ficou_livre)
+        self._em_uso = set()
+        self._total = 0
+        self._fechado = False
+
+        self._stats = {
+            "criadas": 0,
+            "checkouts": 0,
+            "esperas": 0,
+            "tempo_espera_ms": 0.0,
+            "descartadas": 0,
+            "reaproveitadas": 0,
+            "ociosas_fechadas": 0,
+        }
+
+        for _ in range(minconn):
+            conn = self._criar()
+            self._livres.append((conn, time.monotonic()))
+            self._total += 1
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _criar(self):
+        conn = self._fabrica()
+        self._stats["criadas"] += 1
+        return conn
+
+    def _fechar_silenciosamente(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _conexao_saudavel(self, conn, ociosa_desde: float) -> bool:
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - ociosa_desde < self.ping_apos:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reciclar_ociosas(self) -> list:
+        """
+        Tira do pool as conexões livres que passaram do idle_timeout e
+        devolve a lista delas; quem chamou fecha FORA do lock.
+        Deve ser chamado com o lock (self._cond) adquirido.
+        """
+        if self.idle_timeout <= 0:
+            return []
+        agora = time.monotonic()
+        vencidas = []
+        # as mais antigas ficam à esquerda (entrega é LIFO pela direita)
+        while self._livres and self._total > self.minconn:
+            conn, desde = self._livres[0]
+            if agora - desde < self.idle_timeout:
+                break
+            self._livres.popleft()
+            self._total -= 1
+            self._stats["ociosas_fechadas"] += 1
+            vencidas.append(conn)
+        return vencidas
+
+    def _fechar_todas(self, conexoes):
+        for conn in conexoes:
+            self._fechar_silenciosamente(conn)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def getconn(self, timeout: float = None):
+        """
+        Retira uma conexão do pool (esperando, se preciso).
+        `timeout` encurta a espera máxima (nunca passa de self.timeout).
+
+        Nada que vá à rede (health check, abrir ou fechar conexão) roda com
+        o lock: um servidor lento não trava os checkouts das outras threads.
+        """
+        limite = self.timeout if timeout is None else min(self.timeout, timeout)
+        inicio_espera = None
+        while True:
+            conn = desde = None
+            with self._cond:
+                while True:
+                    if self._fechado:
+                        raise pg_pool.PoolError("Pool de conexões está fechado.")
+
+                    vencidas = self._reciclar_ociosas()
+
+                    if self._livres:
+                        conn, desde = self._livres.pop()
+                        break
+
+                    if self._total < self.maxconn:
+                        # reserva a vaga e abre a conexão fora do lock
+                        self._total += 1
+                        break
+
+                    if inicio_espera is None:
+                        inicio_espera = time.perf_counter()
+                        self._stats["esperas"] += 1
+                    restante = limite - (time.perf_counter() - inicio_espera)
+                    if restante <= 0:
+                        self._stats["tempo_espera_ms"] += (time.perf_counter() - inicio_espera) * 1000
+                        raise pg_pool.PoolError(
+                            f"Nenhuma conexão livre no pool após {limite:.1f}s "
+                            f"(max={self.maxconn})."
+                        )
+                    self._cond.wait(restante)
+
+            self._fechar_todas(vencidas)
+
+            if conn is None:
+                break
+
+            # health check fora do lock (pode ser um SELECT 1 na rede)
+            if self._conexao_saudavel(conn, desde):
+                break
+            self._fechar_silenciosamente(conn)
+            with self._cond:
+                self._total -= 1
+                self._stats["descartadas"] += 1
+                self._cond.notify()
+
+        with self._cond:
+            if inicio_espera is not None:
+                self._stats["tempo_espera_ms"] += (time.perf_counter() - inicio_espera) * 1000
+            self._stats["checkouts"] += 1
+            if conn is not None:
+                self._stats["reaproveitadas"] += 1
+
+        if conn is None:
+            try:
+                conn = self._criar()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._em_uso.add(id(conn))
+        # checkout feito no meio de uma operação lógica desta thread (ver Database)
+        op = getattr(_local, "operacao", None)
+        if op is not None:
+            op.conexoes += 1
+        return conn
+
+    def putconn(self, conn, descartar: bool = False):
+        """
+        Devolve a conexão ao pool.
+
+        Se a conexão estiver quebrada (ou descartar=True), ela é fechada
+        (fora do lock) e a vaga fica livre para uma conexão nova.
+        """
+        if not descartar and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+
+        fechar = []
+        with self._cond:
+            self._em_uso.discard(id(conn))
+            if descartar or conn.closed or self._fechado:
+                self._total -= 1
+                self._stats["descartadas"] += 1
+                fechar.append(conn)
+            else:
+                self._livres.append((conn, time.monotonic()))
+                fechar.extend(self._reciclar_ociosas())
+            self._cond.notify()
+        self._fechar_todas(fechar)
+
+    def descartar_ociosas(self) -> int:
+        """
+        Fecha todas as conexões livres (ex.: depois que o servidor caiu,
+        provavelmente estão todas mortas). Retorna quantas foram fechadas.
+        """
+        with self._cond:
+            fechar = [conn for conn, _ in self._livres]
+            self._livres.clear()
+            self._total -= len(fechar)
+            self._stats["descartadas"] += len(fechar)
+            self._cond.notify_all()
+        self._fechar_todas(fechar)
+        return len(fechar)
+
+    def closeall(self):
+        """
+        Fecha todas as conexões livres e impede novos checkouts.
+        Conexões em uso são fechadas quando forem devolvidas.
+        """
+        with self._cond:
+            self._fechado = True
+            fechar = [conn for conn, _ in self._livres]
+            self._livres.clear()
+            self._total -= len(fechar)
+            self._cond.notify_all()
+        self._fechar_todas(fechar)
+
+    def stats(self) -> dict:
+        """
+        Retorna um retrato das estatísticas do pool.
+        """
+        with self._cond:
+            dados = dict(self._stats)
+            dados.update(
+                {
+                    "min": self.minconn,
+                    "max": self.maxconn,
+                    "abertas": self._total,
+                    "em_uso": len(self._em_uso),
+                    "livres": len(self._livres),
+                }
+            )
+        dados["tempo_espera_ms"] = round(dados["tempo_espera_ms"], 3)
+        return dados
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# estado por thread (operação do Database, última escrita etc.)
+_local = threading.local()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Devolve o pool global, criando-o na primeira chamada.
+
+    Configuração (variáveis de ambiente):
+      - PGPOOL_MIN          conexões mantidas abertas (padrão 1)
+      - PGPOOL_MAX          máximo de conexões simultâneas (padrão 10)
+      - PGPOOL_TIMEOUT      segundos esperando conexão livre (padrão 30)
+      - PGPOOL_IDLE_TIMEOUT segundos até fechar conexão ociosa (padrão 300)
+      - PGPOOL_PING_APOS    segundos ociosa antes de testar com SELECT 1 (padrão 30)
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=_env_int("PGPOOL_MIN", 1),
+                    maxconn=_env_int("PGPOOL_MAX", 10),
+                    timeout=_env_float("PGPOOL_TIMEOUT", 30.0),
+                    idle_timeout=_env_float("PGPOOL_IDLE_TIMEOUT", 300.0),
+                    ping_apos=_env_float("PGPOOL_PING_APOS", 30.0),
+                )
+    return _pool
+
+
+def pool_stats() -> dict:
+    """
+    Estatísticas do pool global (em uso, esperas, tempo de espera etc.).
+    Se o pool ainda não foi criado, retorna um dicionário vazio.
+    Com réplicas configuradas, inclui também os pools de cada réplica.
+    """
+    if _pool is None:
+        return {}
+    dados = _pool.stats()
+    replicas = {r.nome: r.pool.stats() for r in _replicas() if r.pool is not None}
+    if replicas:
+        dados["replicas"] = replicas
+    return dados
+
+
+@atexit.register
+def fechar_pool():
+    """
+    Fecha o pool global (chamado automaticamente ao sair do processo).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+        for replica in _replicas():
+            if replica.pool is not None:
+                replica.pool.closeall()
+                replica.pool = None
+
+
+# ----------------------------------------------------------------------
+# Réplicas de leitura
+# ----------------------------------------------------------------------
+# Atraso da réplica em segundos. Se ela já reproduziu todo o WAL recebido,
+# o atraso é 0 (mesmo que o primário esteja parado há muito tempo).
+_SQL_ATRASO_REPLICA = """
+    SELECT CASE
+             WHEN NOT pg_is_in_recovery() THEN 0
+             WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+             ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+"""
+
+
+class _Replica:
+    """
+    Uma réplica de leitura: pool próprio + último atraso medido.
+    """
+
+    def __init__(self, host: str, port: str):
+        self.host = host
+        self.port = port
+        self.nome = f"{host}:{port}"
+        self.pool = None
+        self.atraso_s = None
+        self.verificada_em = None
+        self._lock = threading.Lock()
+        self._lock_atraso = threading.Lock()  # uma medição de atraso por vez
+
+    def get_pool(self) -> ConnectionPool:
+        with self._lock:
+            if self.pool is None:
+                self.pool = ConnectionPool(
+                    minconn=0,
+                    maxconn=_env_int("PGPOOL_MAX", 10),
+                    timeout=_env_float("PGPOOL_TIMEOUT", 30.0),
+                    idle_timeout=_env_float("PGPOOL_IDLE_TIMEOUT", 300.0),
+                    ping_apos=_env_float("PGPOOL_PING_APOS", 30.0),
+                    fabrica=functools.partial(
+                        get_connection,
+                        self.host,
+                        self.port,
+                        connect_timeout=max(1, math.ceil(_env_float("PGREPLICA_TIMEOUT_CHECK", 2.0))),
+                    ),
+                )
+            return self.pool
+
+    def atraso(self) -> Optional[float]:
+        """
+        Atraso de replicação (s), medido no máximo a cada PGREPLICA_INTERVALO_CHECK
+        segundos. Se a réplica não responde em PGREPLICA_TIMEOUT_CHECK
+        segundos, o atraso é infinito.
+
+        Só uma thread mede por vez; as outras recebem a última medição, ou
+        None se ainda não houver nenhuma (quem chama trata como réplica
+        indisponível).
+        """
+        intervalo = _env_float("PGREPLICA_INTERVALO_CHECK", 2.0)
+        if self.verificada_em is not None and time.monotonic() - self.verificada_em < intervalo:
+            return self.atraso_s
+        if not self._lock_atraso.acquire(blocking=False):
+            return self.atraso_s
+        try:
+            # outra thread pode ter medido enquanto esta chegava aqui
+            if self.verificada_em is not None and time.monotonic() - self.verificada_em < intervalo:
+                return self.atraso_s
+            atraso = self._medir_atraso(_env_float("PGREPLICA_TIMEOUT_CHECK", 2.0))
+            self.atraso_s = atraso
+            self.verificada_em = time.monotonic()
+            return atraso
+        finally:
+            self._lock_atraso.release()
+
+    def _medir_atraso(self, timeout: float) -> float:
+        try:
+            pool = self.get_pool()
+            conn = pool.getconn(timeout=timeout)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(_SQL_ATRASO_REPLICA)
+                    atraso = float(cur.fetchone()[0] or 0)
+                conn.rollback()
+            finally:
+                pool.putconn(conn, descartar=bool(conn.closed))
+        except (psycopg2.Error, pg_pool.PoolError):
+            return float("inf")
+        return atraso
+
+
+_lista_replicas = None
+_rodizio_replicas = itertools.count()
+_roteamento_stats = {
+    "leituras_replica": 0,
+    "leituras_primario": 0,
+    "fallback_atraso": 0,
+    "fixadas_apos_escrita": 0,
+}
+_roteamento_lock = threading.Lock()
+
+
+def _contar_roteamento(*chaves):
+    with _roteamento_lock:
+        for chave in chaves:
+            _roteamento_stats[chave] += 1
+
+
+def _replicas() -> list:
+    """
+    Réplicas configuradas em PGREPLICA_HOSTS ("host1:porta1,host2:porta2").
+    Sem porta, usa a mesma PGPORT do primário.
+    """
+    global _lista_replicas
+    if _lista_replicas is None:
+        replicas = []
+        for item in os.getenv("PGREPLICA_HOSTS", "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            host, _, port = item.partition(":")
+            replicas.append(_Replica(host, port or os.getenv("PGPORT", "5433")))
+        _lista_replicas = replicas
+    return _lista_replicas
+
+
+def _escolher_pool(somente_leitura: bool) -> ConnectionPool:
+    """
+    Decide para onde vai o comando:
+    - escrita (ou leitura logo após uma escrita da mesma thread) -> primário;
+    - leitura -> uma réplica com atraso <= PGREPLICA_MAX_LAG (rodízio);
+    - nenhuma réplica boa (ou ainda sem atraso medido) -> primário.
+    """
+    replicas = _replicas()
+    if not somente_leitura or not replicas:
+        return get_pool()
+
+    # read-your-writes: logo depois de escrever, a thread lê do primário
+    ultima_escrita = getattr(_local, "ultima_escrita", None)
+    janela = _env_float("PGREPLICA_FIXAR_APOS_ESCRITA", 5.0)
+    if ultima_escrita is not None and time.monotonic() - ultima_escrita < janela:
+        _contar_roteamento("fixadas_apos_escrita", "leituras_primario")
+        return get_pool()
+
+    max_atraso = _env_float("PGREPLICA_MAX_LAG", 5.0)
+    inicio = next(_rodizio_replicas)
+    for i in range(len(replicas)):
+        replica = replicas[(inicio + i) % len(replicas)]
+        atraso = replica.atraso()
+        if atraso is not None and atraso <= max_atraso:
+            _contar_roteamento("leituras_replica")
+            return replica.get_pool()
+
+    _contar_roteamento("fallback_atraso", "leituras_primario")
+    return get_pool()
+
+
+def roteamento_stats() -> dict:
+    """
+    Quantas leituras foram para réplicas ou para o primário, e por quê.
+    Inclui o último atraso medido de cada réplica.
+    """
+    with _roteamento_lock:
+        dados = dict(_roteamento_stats)
+    dados["replicas"] = {r.nome: r.atraso_s for r in _replicas()}
+    return dados
+
+
+# ----------------------------------------------------------------------
+# Métricas por consulta (latência, linhas, espera por conexão)
+# ----------------------------------------------------------------------
+def _configurar_log_lentas() -> logging.Logger:
+    """
+    Logger das consultas lentas. Só escreve algo se PG_SLOW_QUERY_LOG
+    apontar para um arquivo (para não poluir a tela do menu).
+    """
+    logger = logging.getLogger("sistema_clientes.slow_query")
+    if not logger.handlers:
+        caminho = os.getenv("PG_SLOW_QUERY_LOG")
+        if caminho:
+            handler = logging.FileHandler(caminho, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.WARNING)
+        else:
+            logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+    return logger
+
+
+metricas = Metricas(
+    limite_lenta_ms=_env_float("PG_SLOW_QUERY_MS", 200.0),
+    logger=_configurar_log_lentas(),
+)
+
+# módulos "de infraestrutura" que não contam como função chamadora
+_MODULOS_INTERNOS = {__name__, "database", "contextlib", "src.metricas"}
+
+
+def _funcao_chamadora() -> str:
+    """
+    Nome da primeira função pública fora da camada de banco na pilha de
+    chamadas (ex.: 'src.clientes.buscar_por_cidade', pulando o
+    _select_base). Se só houver funções privadas, usa a primeira delas.
+    """
+    primeira = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "?")
+        if modulo not in _MODULOS_INTERNOS and not modulo.startswith("psycopg2"):
+            nome = f"{modulo}.{frame.f_code.co_name}"
+            if not frame.f_code.co_name.startswith("_"):
+                return nome
+            primeira = primeira or nome
+        frame = frame.f_back
+    return primeira or "?"
+
+
+class CursorInstrumentado(extensions.cursor):
+    """
+    Cursor que mede cada execute()/executemany() e registra em `metricas`:
+    SQL normalizado, duração, linhas e tempo esperando conexão do pool.
+    """
+
+    espera_conexao_ms = 0.0
+    rotulo = None  # SQL "lógico" a registrar no lugar do próximo comando
+
+    def _registrar(self, sql, inicio: float):
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        rotulo, self.rotulo = self.rotulo, None
+        # a espera pela conexão é contada uma vez só, no primeiro comando
+        espera, self.espera_conexao_ms = self.espera_conexao_ms, 0.0
+        op = getattr(_local, "operacao", None)
+        if op is not None and op.conn is self.connection:
+            op.consultas += 1
+        metricas.registrar(
+            rotulo or sql,
+            duracao_ms,
+            linhas=self.rowcount,
+            espera_ms=espera,
+            funcao=_funcao_chamadora(),
+        )
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._registrar(query, inicio)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._registrar(query, inicio)
+
+
+def metricas_json(caminho: str = None) -> str:
+    """
+    Exporta as métricas de consultas como JSON (por SQL e por função,
+    com percentis p50/p90/p99, mais a lista de consultas lentas).
+    """
+    return metricas.dump_json(caminho)
+
+
+@atexit.register
+def _salvar_metricas_ao_sair():
+    caminho = os.getenv("PG_METRICAS_JSON")
+    if caminho:
+        try:
+            metricas.dump_json(caminho)
+        except OSError:
+            pass
+
+
+# ----------------------------------------------------------------------
+# Prazo (timeout) por chamada e cancelamento
+# ----------------------------------------------------------------------
+# Folga dada ao statement_timeout do servidor antes de o cliente mandar o
+# cancelamento por conta própria (ex.: rede travada, espera no COMMIT).
+_FOLGA_CANCELAMENTO = 0.5
+
+
+class TempoEsgotado(extensions.QueryCanceledError):
+    """
+    O prazo (timeout) da chamada acabou. É um QueryCanceledError, então quem
+    já trata cancelamentos do psycopg2 continua funcionando.
+    """
+
+
 @contextmanager
-def get_cursor():
+def prazo(timeout: float = None):
+    """
+    Define um orçamento de tempo (em segundos) para tudo o que a thread fizer
+    no banco dentro do bloco: espera por conexão, consultas e retentativas.
+
+    Uso típico:
+        from src.database import prazo
+
+        with prazo(2.0):
+            linhas = buscar_por_cidade("a")
+
+    - Cada get_cursor()/stream_query() do bloco aplica o tempo que sobrou como
+      `statement_timeout` da transação e, se o servidor não responder a tempo,
+      o cliente envia um cancelamento de verdade (conn.cancel()).
+    - Blocos aninhados nunca aumentam o prazo: vale o menor.
+    - timeout=None não limita nada (mantém o prazo de fora, se houver).
+    - Estourou o prazo: TempoEsgotado.
+    """
+    anterior = getattr(_local, "prazo", None)
+    if timeout is not None:
+        limite = time.monotonic() + timeout
+        _local.prazo = limite if anterior is None else min(anterior, limite)
+    try:
+        yield
+    finally:
+        _local.prazo = anterior
+
+
+def com_prazo(funcao):
+    """
+    Decorador: a função passa a aceitar o argumento nomeado `timeout`
+    (segundos), que vira um prazo() em volta da chamada inteira.
+
+        @com_prazo
+        def buscar_por_uf(uf, limit=None, offset=None):
+            ...
+
+        buscar_por_uf("SP", limit=20, timeout=1.5)
+    """
+    @functools.wraps(funcao)
+    def envoltorio(*args, timeout: float = None, **kwargs):
+        with prazo(timeout):
+            return funcao(*args, **kwargs)
+
+    return envoltorio
+
+
+def _tempo_restante():
+    """
+    Segundos que sobram do prazo da thread (None = sem prazo).
+    Se já acabou, levanta TempoEsgotado.
+    """
+    limite = getattr(_local, "prazo", None)
+    if limite is None:
+        return None
+    restante = limite - time.monotonic()
+    if restante <= 0:
+        raise TempoEsgotado("Prazo da operação esgotado.")
+    return restante
+
+
+class _Cancelador:
+    """
+    Relógio do lado do cliente: se a conexão ainda estiver ocupada quando o
+    prazo acabar (mais uma folga), manda um pedido de cancelamento ao servidor.
+    Também é por ele que um Cancelamento interrompe a consulta de outra thread.
+    """
+
+    def __init__(self, conn, segundos: float = None, pedido: "Cancelamento" = None):
+        self.conn = conn
+        self.disparou = False
+        self._pedido = pedido
+        self._lock = threading.Lock()
+        self._ativo = True
+        self._timer = None
+        if segundos is not None:
+            self._timer = threading.Timer(segundos + _FOLGA_CANCELAMENTO, self._cancelar)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancelar(self, por_prazo: bool = True):
+        with self._lock:
+            if not self._ativo:
+                return
+            if por_prazo:
+                self.disparou = True
+            try:
+                self.conn.cancel()
+            except psycopg2.Error:
+                pass
+
+    def parar(self):
+        # depois disso a conexão pode voltar ao pool sem risco de levar um
+        # cancelamento atrasado para outra consulta
+        if self._timer is not None:
+            self._timer.cancel()
+        with self._lock:
+            self._ativo = False
+        if self._pedido is not None:
+            self._pedido._remover(self)
+
+
+class Cancelamento:
+    """
+    Permite a uma thread cancelar o que OUTRA thread está fazendo no banco
+    (ex.: a busca em segundo plano de uma página que não vai mais ser vista).
+
+    Uso típico:
+        pedido = Cancelamento()
+
+        # na thread que trabalha
+        with pedido:
+            pagina = buscar_por_uf_pagina("SP")
+
+        # em qualquer outra thread
+        pedido.cancelar()
+
+    - A consulta em andamento recebe um cancelamento de verdade
+      (conn.cancel()); as seguintes nem chegam a ir ao servidor.
+    - A thread que trabalha recebe QueryCanceledError (não TempoEsgotado).
+    """
+
+    def __init__(self):
+        self.cancelado = False
+        self._lock = threading.Lock()
+        self._ativos = set()
+        self._anteriores = []
+
+    def __enter__(self):
+        self._anteriores.append(getattr(_local, "cancelamento", None))
+        _local.cancelamento = self
+        return self
+
+    def __exit__(self, *exc):
+        _local.cancelamento = self._anteriores.pop()
+        return False
+
+    def cancelar(self):
+        with self._lock:
+            self.cancelado = True
+            ativos = list(self._ativos)
+        for cancelador in ativos:
+            cancelador._cancelar(por_prazo=False)
+
+    def _registrar(self, cancelador: _Cancelador) -> bool:
+        with self._lock:
+            if self.cancelado:
+                return False
+            self._ativos.add(cancelador)
+            return True
+
+    def _remover(self, cancelador: _Cancelador):
+        with self._lock:
+            self._ativos.discard(cancelador)
+
+
+def _getconn_no_prazo(pool, restante=None):
+    """
+    pool.getconn() sem esperar além do prazo da thread.
+    """
+    if restante is None:
+        restante = _tempo_restante()
+    try:
+        return pool.getconn(timeout=restante)
+    except pg_pool.PoolError as e:
+        if restante is not None and restante < pool.timeout:
+            raise TempoEsgotado("Prazo da operação esgotado esperando conexão do pool.") from e
+        raise
+
+
+def _aplicar_prazo(conn, restante):
+    """
+    Limita o tempo das consultas desta transação ao que sobrou do prazo e
+    arma o cancelamento pelo cliente (pelo prazo ou pelo Cancelamento da
+    thread). Retorna o _Cancelador (ou None).
+    """
+    pedido = getattr(_local, "cancelamento", None)
+    if pedido is not None and pedido.cancelado:
+        raise extensions.QueryCanceledError("Operação cancelada.")
+    if restante is None and pedido is None:
+        return None
+    if restante is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (max(1, int(restante * 1000)),))
+    cancelador = _Cancelador(conn, restante, pedido)
+    if pedido is not None and not pedido._registrar(cancelador):
+        # cancelado entre a verificação lá de cima e agora
+        cancelador.parar()
+        raise extensions.QueryCanceledError("Operação cancelada.")
+    return cancelador
+
+
+def _traduzir_cancelamento(erro, cancelador):
+    """
+    Cancelamento causado pelo prazo (statement_timeout ou relógio do cliente)
+    vira TempoEsgotado; Ctrl-C e outros cancelamentos seguem como estão.
+    """
+    if cancelador is None or not isinstance(erro, extensions.QueryCanceledError):
+        return None
+    if isinstance(erro, TempoEsgotado):
+        return None
+    prazo_acabou = cancelador.disparou or "statement timeout" in str(erro)
+    if prazo_acabou:
+        return TempoEsgotado(f"Prazo da operação esgotado: {str(erro).strip()}")
+    return None
+
+
+@contextmanager
+def _cursor_na_operacao(op, cursor_factory=CursorInstrumentado):
+    """
+    Cursor na conexão da operação (session()/Database) da thread.
+    Não faz commit nem devolve a conexão: isso é do dono da operação.
+    Se der erro, a operação inteira é marcada como falha (rollback no fim).
+    """
+    conn = op.conn
+    cur = conn.cursor(cursor_factory=cursor_factory)
+    cancelador = None
+    try:
+        cancelador = _aplicar_prazo(conn, _tempo_restante())
+        yield cur
+    except Exception as e:
+        op.falhou = True
+        traduzido = _traduzir_cancelamento(e, cancelador)
+        if traduzido is not None:
+            raise traduzido from e
+        raise
+    finally:
+        if cancelador is not None:
+            cancelador.parar()
+            if not op.falhou:
+                # o prazo era só desta chamada, não do resto da sessão
+                with conn.cursor() as limpeza:
+                    limpeza.execute("SET LOCAL statement_timeout TO DEFAULT")
+        cur.close()
+
+
+@contextmanager
+def get_cursor(somente_leitura: bool = False, cursor_factory=None):
     """
     Entrega um cursor de banco dentro de uma transação.
 
@@ -30,18 +943,1138 @@ def get_cursor():
             cur.execute("SELECT 1")
             print(cur.fetchone())
 
+    - Pega uma conexão do pool (não abre conexão nova a cada chamada).
     - Dá commit automaticamente quando tudo dá certo.
     - Dá rollback se der erro.
-    - Fecha cursor e conexão no final.
+    - Fecha o cursor e devolve a conexão ao pool no final.
+    - Cada comando é medido (ver `metricas` / metricas_json()); os que passam
+      de PG_SLOW_QUERY_MS vão para o log de consultas lentas.
+    - somente_leitura=True permite mandar a consulta para uma réplica
+      (PGREPLICA_HOSTS), se houver alguma com atraso aceitável. Sem isso,
+      tudo vai para o primário, e a thread passa a ler do primário por
+      PGREPLICA_FIXAR_APOS_ESCRITA segundos (para enxergar o que escreveu).
+    - Dentro de session() (ou de um Database aberto) usa a conexão e a
+      transação da sessão; o commit fica para quem abriu a sessão.
+    - cursor_factory: outra classe de cursor (subclasse de CursorInstrumentado,
+      para continuar medindo), ex.: uma que monta as linhas de outro jeito.
     """
-    conn = get_connection()
-    cur = conn.cursor()
+    if cursor_factory is None:
+        cursor_factory = CursorInstrumentado
+    op = getattr(_local, "operacao", None)
+    if op is not None:
+        with _cursor_na_operacao(op, cursor_factory) as cur:
+            yield cur
+        return
+
+    pool = _escolher_pool(somente_leitura)
+    inicio_espera = time.perf_counter()
+    conn = _getconn_no_prazo(pool)
+    descartar = False
+    cancelador = None
+    cur = conn.cursor(cursor_factory=cursor_factory)
+    cur.espera_conexao_ms = (time.perf_counter() - inicio_espera) * 1000
     try:
+        cancelador = _aplicar_prazo(conn, _tempo_restante())
         yield cur
         conn.commit()
-    except Exception:
-        conn.rollback()
+        if not somente_leitura:
+            _local.ultima_escrita = time.monotonic()
+    except Exception as e:
+        if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)) and not isinstance(
+            e, extensions.QueryCanceledError
+        ):
+            descartar = True
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            descartar = True
+        traduzido = _traduzir_cancelamento(e, cancelador)
+        if traduzido is not None:
+            raise traduzido from e
         raise
     finally:
-        cur.close()
-        conn.close()
+        if cancelador is not None:
+            cancelador.parar()
+        try:
+            cur.close()
+        except psycopg2.Error:
+            descartar = True
+        pool.putconn(conn, descartar=descartar or bool(conn.closed))
+
+
+def stream_query(sql, params=None, itersize=None, somente_leitura=True, cursor_factory=None):
+    """
+    Executa um SELECT em um cursor nomeado (server-side) e entrega as
+    linhas aos poucos, em vez de carregar tudo com fetchall().
+
+    Uso típico:
+        from src.database import stream_query
+
+        for linha in stream_query("SELECT id, nome FROM clientes WHERE uf = %s", ("SP",)):
+            print(linha)
+
+    - O PostgreSQL só envia `itersize` linhas por ida ao servidor
+      (padrão: variável PGSTREAM_ITERSIZE ou 2000), então o uso de memória
+      fica constante e a primeira linha chega logo.
+    - A conexão fica presa ao gerador até ele terminar (ou ser fechado
+      com break/close), e só então volta ao pool.
+    - Por ser leitura, pode ir para uma réplica (ver get_cursor).
+    - Dentro de session() usa a conexão e a transação da sessão.
+    - cursor_factory: classe do cursor nomeado (padrão: a do psycopg2).
+    """
+    if itersize is None:
+        itersize = _env_int("PGSTREAM_ITERSIZE", 2000)
+    # o prazo é lido agora: o gerador só roda no primeiro next(), talvez
+    # já fora do bloco `with prazo(...)`
+    limite = getattr(_local, "prazo", None)
+    op = getattr(_local, "operacao", None)
+    return _stream(sql, params, itersize, somente_leitura, limite, op, cursor_factory)
+
+
+def _stream(sql, params, itersize, somente_leitura, limite, op, cursor_factory=None):
+    restante = None
+    if limite is not None:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            raise TempoEsgotado("Prazo da operação esgotado.")
+
+    if op is not None:
+        # dentro de session(): mesma conexão e transação, sem commit aqui
+        cur = op.conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=cursor_factory)
+        cur.itersize = itersize
+        cancelador = None
+        try:
+            cancelador = _aplicar_prazo(op.conn, restante)
+            cur.execute(sql, params)
+            op.consultas += 1
+            for linha in cur:
+                yield linha
+        except Exception as e:
+            op.falhou = True
+            traduzido = _traduzir_cancelamento(e, cancelador)
+            if traduzido is not None:
+                raise traduzido from e
+            raise
+        finally:
+            if cancelador is not None:
+                cancelador.parar()
+            try:
+                cur.close()
+            except psycopg2.Error:
+                pass
+            if cancelador is not None and not op.falhou:
+                # o prazo era só deste stream, não do resto da sessão
+                with op.conn.cursor() as limpeza:
+                    limpeza.execute("SET LOCAL statement_timeout TO DEFAULT")
+        return
+
+    pool = _escolher_pool(somente_leitura)
+    conn = _getconn_no_prazo(pool, restante)
+    descartar = False
+    cancelador = None
+    cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=cursor_factory)
+    cur.itersize = itersize
+    try:
+        cancelador = _aplicar_prazo(
+            conn, None if limite is None else max(0.001, limite - time.monotonic())
+        )
+        cur.execute(sql, params)
+        for linha in cur:
+            yield linha
+        cur.close()  # antes do commit: depois dele o cursor nomeado já não existe
+        conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        # cancelamento não estraga a conexão; o resto (rede, servidor) sim
+        descartar = not isinstance(e, extensions.QueryCanceledError)
+        traduzido = _traduzir_cancelamento(e, cancelador)
+        if traduzido is not None:
+            raise traduzido from e
+        raise
+    finally:
+        if cancelador is not None:
+            cancelador.parar()
+        try:
+            cur.close()
+        except psycopg2.Error:
+            descartar = True
+        pool.putconn(conn, descartar=descartar or bool(conn.closed))
+
+
+# ----------------------------------------------------------------------
+# Cursor rolável (SCROLL WITH HOLD) para listagens navegadas aos pedaços
+# ----------------------------------------------------------------------
+class CursorFechado(psycopg2.InterfaceError):
+    """
+    O CursorRolavel já foi fechado (por fechar() ou por ficar ocioso mais
+    que o permitido; nesse caso `expirado` é True).
+    """
+
+    def __init__(self, mensagem: str, expirado: bool = False):
+        super().__init__(mensagem)
+        self.expirado = expirado
+
+
+class CursorRolavel:
+    """
+    Resultado de um SELECT guardado no servidor num cursor
+    `SCROLL WITH HOLD`, lido em qualquer posição com MOVE/FETCH.
+
+    Uso típico:
+        from src.database import CursorRolavel
+
+        with CursorRolavel("SELECT id, nome FROM clientes WHERE uf = %s ORDER BY nome, id", ("SP",)) as c:
+            print(c.total)
+            primeiras = c.ler(0, 20)
+            quinta_pagina = c.ler(80, 20)
+
+    - O SELECT roda uma vez só, na abertura: o resultado fica pronto no
+      servidor (é copiado no COMMIT que encerra o DECLARE) e toda leitura
+      depois disso vê a mesma foto, mesmo com inserções acontecendo.
+      Ir para frente, para trás ou direto para a posição X custa o mesmo e
+      não planeja nem executa a consulta de novo.
+    - Em troca, a abertura custa o SELECT inteiro (sem LIMIT), e o resultado
+      ocupa memória/disco temporário do servidor enquanto o cursor existir.
+    - Segura uma conexão do pool até ser fechado. Sem uso por `ocioso`
+      segundos (padrão PGCURSOR_OCIOSO ou 300), fecha sozinho e devolve a
+      conexão; ler() depois disso levanta CursorFechado(expirado=True).
+    - Respeita o prazo() da thread na abertura e em cada leitura. Uma
+      leitura cancelada deixa o cursor inutilizável no servidor; ele é
+      fechado na hora e declarado de novo na leitura seguinte (nova foto:
+      `total` e `aberto_em` são atualizados).
+    - Não participa de session(): usa uma conexão própria do pool.
+    - cursor_factory: classe do cursor das leituras (como em get_cursor).
+    """
+
+    def __init__(self, sql, params=None, somente_leitura: bool = True, ocioso: float = None,
+                 cursor_factory=None):
+        if ocioso is None:
+            ocioso = _env_float("PGCURSOR_OCIOSO", 300.0)
+        self.ocioso = ocioso
+        self._cursor_factory = cursor_factory or CursorInstrumentado
+        self.nome = f"rolavel_{uuid.uuid4().hex}"
+        self.total = 0
+        self.aberto_em = None
+        self.expirado = False
+        self._sql = sql
+        self._params = params
+        self._reabrir = False
+        self._lock = threading.Lock()
+        self._timer = None
+        self._geracao = 0
+
+        self._pool = _escolher_pool(somente_leitura)
+        self._conn = _getconn_no_prazo(self._pool)
+        try:
+            self._declarar()
+        except Exception:
+            self._devolver_conexao()
+            raise
+        self._armar_timer()
+
+    def _declarar(self):
+        self.aberto_em = datetime.now()
+        with self._transacao() as cur:
+            self._executar(cur, f"DECLARE {self.nome} SCROLL CURSOR WITH HOLD FOR {self._sql}", self._params)
+        # o COMMIT acima materializou o resultado; contar agora é barato
+        with self._transacao() as cur:
+            self._executar(cur, f"MOVE FORWARD ALL IN {self.nome}")
+            self.total = cur.rowcount
+        self._reabrir = False
+
+    def _executar(self, cur, comando: str, params=None):
+        # nas métricas o cursor aparece como "rolavel_?": com o nome único,
+        # cada listagem criaria entradas novas (com histogramas) para sempre
+        if hasattr(cur, "rotulo"):
+            cur.rotulo = comando.replace(self.nome, "rolavel_?")
+        cur.execute(comando, params)
+
+    @contextmanager
+    def _transacao(self):
+        conn = self._conn
+        cur = conn.cursor(cursor_factory=self._cursor_factory)
+        cancelador = None
+        try:
+            cancelador = _aplicar_prazo(conn, _tempo_restante())
+            yield cur
+            conn.commit()
+        except Exception as e:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+            traduzido = _traduzir_cancelamento(e, cancelador)
+            if traduzido is not None:
+                raise traduzido from e
+            raise
+        finally:
+            if cancelador is not None:
+                cancelador.parar()
+            cur.close()
+
+    @property
+    def fechado(self) -> bool:
+        return self._conn is None
+
+    def ler(self, inicio: int, quantidade: int) -> list:
+        """
+        Até `quantidade` linhas a partir da posição `inicio` (0 = primeira).
+        """
+        with self._lock:
+            if self._conn is None:
+                if self.expirado:
+                    raise CursorFechado(
+                        f"Cursor fechado depois de {self.ocioso:g} s sem uso.", expirado=True
+                    )
+                raise CursorFechado("Cursor já foi fechado.")
+            try:
+                if self._reabrir:
+                    self._declarar()
+                with self._transacao() as cur:
+                    # MOVE ABSOLUTE 0 = antes da primeira linha
+                    self._executar(cur, f"MOVE ABSOLUTE %s IN {self.nome}", (max(0, inicio),))
+                    self._executar(cur, f"FETCH FORWARD %s FROM {self.nome}", (quantidade,))
+                    linhas = cur.fetchall()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                if isinstance(e, extensions.QueryCanceledError):
+                    self._fechar_portal()
+                else:
+                    # conexão perdida: o cursor foi junto
+                    self._devolver_conexao(descartar=True)
+                raise
+            self._armar_timer()
+            return linhas
+
+    def _fechar_portal(self):
+        """
+        Fecha o cursor depois de um MOVE/FETCH cancelado, mantendo a conexão;
+        a próxima leitura declara de novo (ver _declarar).
+        """
+        # chamado com self._lock. O cancelamento no meio do MOVE/FETCH deixa
+        # o cursor WITH HOLD marcado como falho no servidor: qualquer leitura
+        # seguinte daria 'portal cannot be run'.
+        try:
+            with self._conn.cursor() as cur:
+                self._executar(cur, f"CLOSE {self.nome}")
+            self._conn.commit()
+        except psycopg2.Error:
+            # cancelado antes de o DECLARE confirmar: o cursor nem existe
+            try:
+                self._conn.rollback()
+            except psycopg2.Error:
+                self._devolver_conexao(descartar=True)
+                return
+        self._reabrir = True
+
+    def _armar_timer(self):
+        # chamado com self._lock (ou ainda no __init__)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._geracao += 1
+        self._timer = threading.Timer(self.ocioso, self._expirar, (self._geracao,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _expirar(self, geracao: int):
+        with self._lock:
+            # uma leitura rearmou o relógio enquanto este esperava o lock
+            if geracao != self._geracao or self._conn is None:
+                return
+            self.expirado = True
+            self._fechar()
+
+    def fechar(self):
+        """Fecha o cursor no servidor e devolve a conexão ao pool."""
+        with self._lock:
+            self._fechar()
+
+    def _fechar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._conn is None:
+            return
+        descartar = False
+        if not self._reabrir:  # senão já foi fechado por _fechar_portal()
+            try:
+                with self._conn.cursor() as cur:
+                    self._executar(cur, f"CLOSE {self.nome}")
+                self._conn.commit()
+            except psycopg2.Error:
+                descartar = True
+        self._devolver_conexao(descartar)
+
+    def _devolver_conexao(self, descartar: bool = False):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn, descartar=descartar or bool(conn.closed))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
+
+
+# ----------------------------------------------------------------------
+# Retentativa com backoff para falhas transitórias
+# ----------------------------------------------------------------------
+_CODIGOS_TRANSITORIOS = {
+    errorcodes.DEADLOCK_DETECTED: "deadlock",
+    errorcodes.SERIALIZATION_FAILURE: "serializacao",
+    errorcodes.ADMIN_SHUTDOWN: "desligamento",
+    errorcodes.CRASH_SHUTDOWN: "desligamento",
+    errorcodes.CANNOT_CONNECT_NOW: "desligamento",
+}
+
+_retry_stats = {
+    "chamadas_repetidas": 0,
+    "tentativas_extras": 0,
+    "sucessos_apos_retry": 0,
+    "desistencias": 0,
+    "backoff_ms_total": 0.0,
+    "por_tipo": {},
+}
+_retry_lock = threading.Lock()
+
+
+def classificar_erro(erro: BaseException):
+    """
+    Diz se o erro é transitório (vale tentar de novo) e de que tipo:
+    'conexao', 'deadlock', 'serializacao' ou 'desligamento'.
+    Retorna None para erros "de verdade" (SQL inválido, constraint etc.).
+    """
+    if not isinstance(erro, psycopg2.Error):
+        return None
+    if isinstance(erro, extensions.QueryCanceledError):
+        # timeout ou Ctrl-C: foi de propósito, repetir não faz sentido
+        return None
+    codigo = getattr(erro, "pgcode", None)
+    if codigo in _CODIGOS_TRANSITORIOS:
+        return _CODIGOS_TRANSITORIOS[codigo]
+    if codigo and codigo.startswith("08"):  # classe 08: connection exception
+        return "conexao"
+    if codigo is None and isinstance(erro, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        # sem código do servidor: conexão caiu / não abriu
+        return "conexao"
+    return None
+
+
+def _em_transacao_externa() -> bool:
+    """
+    True se a thread está dentro de uma operação maior (session() ou Database aberto).
+    Nesse caso não dá para repetir só um pedaço: o erro sobe para quem abriu.
+    """
+    return getattr(_local, "operacao", None) is not None
+
+
+def retry_stats() -> dict:
+    """
+    Métricas de retentativa: quantas chamadas precisaram repetir, quantas
+    tentativas extras, sucessos depois de repetir, desistências e o tempo
+    total gasto em backoff (ms), além da contagem por tipo de erro.
+    """
+    with _retry_lock:
+        dados = dict(_retry_stats)
+        dados["por_tipo"] = dict(_retry_stats["por_tipo"])
+    dados["backoff_ms_total"] = round(dados["backoff_ms_total"], 3)
+    return dados
+
+
+def executar_com_retry(funcao, *args, tentativas: int = None, **kwargs):
+    """
+    Chama funcao(*args, **kwargs) e, se der erro transitório (conexão caiu,
+    deadlock, falha de serialização, servidor reiniciando), espera um pouco
+    e tenta de novo, com backoff exponencial e jitter.
+
+    Só use com funções idempotentes (repetir não pode duplicar efeito).
+
+    Configuração (variáveis de ambiente):
+      - PGRETRY_TENTATIVAS  total de tentativas (padrão 4)
+      - PGRETRY_BASE_MS     espera base (padrão 50 ms, dobra a cada tentativa)
+      - PGRETRY_MAX_MS      teto da espera (padrão 2000 ms)
+    """
+    if tentativas is None:
+        tentativas = _env_int("PGRETRY_TENTATIVAS", 4)
+    base_ms = _env_float("PGRETRY_BASE_MS", 50.0)
+    max_ms = _env_float("PGRETRY_MAX_MS", 2000.0)
+
+    tentativa = 1
+    while True:
+        try:
+            resultado = funcao(*args, **kwargs)
+        except psycopg2.Error as e:
+            tipo = classificar_erro(e)
+            if tipo is None or _em_transacao_externa():
+                raise
+
+            # "full jitter": espera aleatória entre 0 e base * 2^(n-1)
+            espera_ms = random.uniform(0, min(max_ms, base_ms * (2 ** (tentativa - 1))))
+            limite = getattr(_local, "prazo", None)
+            sem_tempo = limite is not None and time.monotonic() + espera_ms / 1000.0 >= limite
+            desistir = tentativa >= tentativas or sem_tempo
+            with _retry_lock:
+                por_tipo = _retry_stats["por_tipo"]
+                por_tipo[tipo] = por_tipo.get(tipo, 0) + 1
+                if tentativa == 1:
+                    _retry_stats["chamadas_repetidas"] += 1
+                if desistir:
+                    _retry_stats["desistencias"] += 1
+            if desistir:
+                raise
+
+            if tipo in ("conexao", "desligamento"):
+                # as outras conexões livres provavelmente caíram junto
+                get_pool().descartar_ociosas()
+
+            with _retry_lock:
+                _retry_stats["tentativas_extras"] += 1
+                _retry_stats["backoff_ms_total"] += espera_ms
+            time.sleep(espera_ms / 1000.0)
+            tentativa += 1
+            continue
+
+        if tentativa > 1:
+            with _retry_lock:
+                _retry_stats["sucessos_apos_retry"] += 1
+        return resultado
+
+
+def idempotente(funcao):
+    """
+    Decorador: marca a função como segura para repetir e aplica
+    executar_com_retry() em toda chamada.
+
+    Uso típico:
+        @idempotente
+        def buscar_por_uf(uf, limit=None, offset=None):
+            ...
+
+    Leituras são sempre idempotentes. Escritas só devem receber o decorador
+    se repetir não duplicar nada (ex.: INSERT ... ON CONFLICT DO NOTHING).
+    """
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        return executar_com_retry(funcao, *args, **kwargs)
+
+    envoltorio.idempotente = True
+    return envoltorio
+
+
+# ----------------------------------------------------------------------
+# Cache de resultados (src/cache.py), invalidado por LISTEN/NOTIFY
+# ----------------------------------------------------------------------
+# Canal dos gatilhos da migração 0010_cache_resultados.sql; o payload é o
+# nome da tabela alterada (clientes, vendas ou produtos).
+CANAL_CACHE = "cache_invalidar"
+
+_log_cache = logging.getLogger("sistema_clientes.cache")
+
+
+def _criar_cache() -> CacheResultados:
+    """
+    Configuração (variáveis de ambiente):
+      - CACHE_RESULTADOS  0 desliga o cache (padrão 1)
+      - CACHE_MAX_ITENS   resultados guardados em memória (padrão 256)
+      - CACHE_TTL         validade máxima de um resultado, em segundos (padrão 60)
+      - CACHE_BACKEND     "postgres" = guarda também na tabela cache_resultados,
+                          compartilhada entre processos (padrão: só memória)
+      - CACHE_SEGREDO     chave que assina os valores do backend; sem ela o
+                          backend não é usado
+      - CACHE_BACKEND_TIMEOUT_MS  lock_timeout/statement_timeout das
+                          operações no backend (padrão 100)
+    """
+    backend = None
+    if os.getenv("CACHE_BACKEND", "").strip().lower() == "postgres":
+        segredo = os.getenv("CACHE_SEGREDO", "")
+        if segredo:
+            backend = BackendPostgres(
+                get_connection, segredo.encode("utf-8"),
+                timeout_ms=_env_float("CACHE_BACKEND_TIMEOUT_MS", 100.0),
+            )
+        else:
+            _log_cache.warning("cache: CACHE_BACKEND=postgres sem CACHE_SEGREDO; usando só a memória")
+    return CacheResultados(
+        max_itens=_env_int("CACHE_MAX_ITENS", 256),
+        ttl=_env_float("CACHE_TTL", 60.0),
+        backend=backend,
+    )
+
+
+cache_resultados = _criar_cache()
+
+
+class _OuvinteCache(threading.Thread):
+    """
+    Escuta CANAL_CACHE numa conexão própria e invalida o cache a cada
+    notificação: a memória deste processo e, no backend compartilhado, a
+    geração da tabela (cache_geracoes, migração 0013_cache_geracoes.sql).
+    A anotação no backend roda em autocommit, fora da transação de quem
+    escreveu; o ouvinte de cada processo a faz, e repetir só empurra o
+    instante um pouco para frente (basta que um chegue). Enquanto está desconectado, o cache não é usado (as
+    funções vão direto ao banco); ao reconectar, limpa o que estava na
+    memória, porque pode ter perdido notificações.
+    """
+
+    def __init__(self, cache: CacheResultados):
+        super().__init__(name="ouvinte-cache", daemon=True)
+        self.cache = cache
+        self.conectado = threading.Event()
+
+    def _escutar(self, conn):
+        while True:
+            if not select.select([conn], [], [], 60.0)[0]:
+                # nada em 60 s: confere se a conexão continua viva
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            conn.poll()
+            while conn.notifies:
+                aviso = conn.notifies.pop(0)
+                self.cache.invalidar(aviso.payload)
+
+    def run(self):
+        espera = 1.0
+        while True:
+            conn = None
+            try:
+                conn = get_connection()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CANAL_CACHE}")
+                self.cache.limpar(backend=False)
+                self.conectado.set()
+                espera = 1.0
+                self._escutar(conn)
+            except Exception as e:
+                _log_cache.warning("cache: ouvinte de %s desconectado: %s", CANAL_CACHE, e)
+            finally:
+                self.conectado.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            time.sleep(espera)
+            espera = min(espera * 2, 30.0)
+
+
+_ouvinte = None
+_ouvinte_lock = threading.Lock()
+
+
+def _ouvinte_cache() -> _OuvinteCache:
+    global _ouvinte
+    if _ouvinte is None:
+        with _ouvinte_lock:
+            if _ouvinte is None:
+                _ouvinte = _OuvinteCache(cache_resultados)
+                # não espera a conexão: até o ouvinte conectar, as
+                # chamadas vão direto ao banco (ver _usar_cache)
+                _ouvinte.start()
+    return _ouvinte
+
+
+def _usar_cache() -> bool:
+    if not _env_int("CACHE_RESULTADOS", 1):
+        return False
+    # session() promete uma foto só do banco para o bloco inteiro; um
+    # resultado guardado antes viria de outra foto
+    if getattr(_local, "operacao", None) is not None:
+        return False
+    return _ouvinte_cache().conectado.is_set()
+
+
+def em_cache(*tabelas: str, ttl: float = None):
+    """
+    Decorador: guarda o resultado da função em `cache_resultados`, por
+    função + argumentos (o `timeout=` de @com_prazo não entra na chave).
+    O resultado é descartado assim que alguma das `tabelas` mudar
+    (gatilho + NOTIFY) ou depois de `ttl` segundos (padrão CACHE_TTL).
+
+    Uso típico (por fora de @com_prazo, para o acerto nem pegar conexão):
+        @em_cache("clientes")
+        @com_prazo
+        @idempotente
+        def ranking_ufs(limit=None):
+            ...
+
+    - Dentro de session() o cache não é usado.
+    - Logo depois de a thread escrever no banco (PGREPLICA_FIXAR_APOS_ESCRITA
+      segundos), resultados guardados antes da escrita são ignorados, sem
+      esperar a notificação chegar.
+    - Use só em funções cujo resultado dependa apenas dos argumentos e das
+      tabelas informadas.
+    """
+    def decorador(funcao):
+        nome = f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if not _usar_cache():
+                return funcao(*args, **kwargs)
+
+            argumentos = {k: v for k, v in kwargs.items() if k != "timeout"}
+            chave = (nome, chave_argumentos(args, argumentos))
+            valido_desde = getattr(_local, "ultima_escrita", None)
+            janela = _env_float("PGREPLICA_FIXAR_APOS_ESCRITA", 5.0)
+            if valido_desde is not None and time.monotonic() - valido_desde >= janela:
+                valido_desde = None
+
+            valor = cache_resultados.obter(chave, tabelas, valido_desde=valido_desde)
+            if valor is not FALTA:
+                return valor
+            marca = cache_resultados.marca(tabelas)
+            valor = funcao(*args, **kwargs)
+            cache_resultados.guardar(chave, valor, tabelas, ttl=ttl, marca=marca)
+            return valor
+
+        envoltorio.cache_tabelas = tabelas
+        return envoltorio
+
+    return decorador
+
+
+def cache_stats() -> dict:
+    """
+    Acertos, faltas e taxa de acerto do cache de resultados (total e por
+    função), invalidações recebidas e se o ouvinte está conectado.
+    """
+    dados = cache_resultados.stats()
+    dados["ouvinte_conectado"] = _ouvinte is not None and _ouvinte.conectado.is_set()
+    dados["backend"] = type(cache_resultados.backend).__name__ if cache_resultados.backend else None
+    return dados
+
+
+# ----------------------------------------------------------------------
+# Cache de prepared statements
+# ----------------------------------------------------------------------
+_PLACEHOLDER = re.compile(r"%(%|s)")
+
+# Erros que indicam que o prepared statement ficou velho (schema mudou)
+# ou sumiu da sessão. Nesses casos descartamos e preparamos de novo.
+_ERROS_PREPARADA_INVALIDA = {
+    errorcodes.FEATURE_NOT_SUPPORTED,      # cached plan must not change result type
+    errorcodes.INVALID_SQL_STATEMENT_NAME, # prepared statement "x" does not exist
+    errorcodes.UNDEFINED_COLUMN,
+    errorcodes.UNDEFINED_TABLE,
+}
+
+_consultas_preparadas = {}  # nome -> (sql com $n, sql original)
+_custos_preparadas = {}     # nome -> (parse_ms, plan_ms) medidos na 1ª preparação
+# conn -> (geração, set(nomes preparados), set(nomes com plano velho a descartar))
+_preparadas_por_conexao = weakref.WeakKeyDictionary()
+_preparadas_lock = threading.Lock()
+_geracao_schema = 0
+_preparadas_stats = {
+    "prepares": 0,
+    "execucoes": 0,
+    "reaproveitadas": 0,
+    "invalidacoes": 0,
+    "parse_ms_economizado": 0.0,
+    "plan_ms_economizado": 0.0,
+}
+
+
+def _para_placeholders_numerados(sql: str) -> str:
+    """
+    Converte os %s do psycopg2 em $1, $2, ... (sintaxe do PREPARE).
+    '%%' vira '%'.
+    """
+    contador = 0
+
+    def trocar(m):
+        nonlocal contador
+        if m.group(1) == "%":
+            return "%"
+        contador += 1
+        return f"${contador}"
+
+    return _PLACEHOLDER.sub(trocar, sql)
+
+
+def registrar_consulta(sql: str, nome: str = None) -> str:
+    """
+    Registra uma consulta no catálogo de prepared statements e devolve
+    o nome com que ela será preparada em cada conexão do pool.
+    Sem nome explícito, o nome é derivado do texto do SQL.
+    """
+    if nome is None:
+        nome = "q_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+    with _preparadas_lock:
+        if nome not in _consultas_preparadas:
+            _consultas_preparadas[nome] = (_para_placeholders_numerados(sql), sql)
+    return nome
+
+
+def invalidar_preparadas():
+    """
+    Avisa que o schema mudou: cada conexão faz DEALLOCATE ALL e volta a
+    preparar as consultas no próximo uso.
+    """
+    global _geracao_schema
+    with _preparadas_lock:
+        _geracao_schema += 1
+        _custos_preparadas.clear()
+
+
+def preparadas_stats() -> dict:
+    """
+    Contadores do cache de prepared statements: quantos PREPAREs foram
+    feitos, quantas execuções reaproveitaram uma consulta já preparada e
+    uma estimativa do tempo de parse/planejamento economizado (ms).
+    """
+    with _preparadas_lock:
+        dados = dict(_preparadas_stats)
+        dados["consultas_registradas"] = len(_consultas_preparadas)
+    dados["parse_ms_economizado"] = round(dados["parse_ms_economizado"], 3)
+    dados["plan_ms_economizado"] = round(dados["plan_ms_economizado"], 3)
+    return dados
+
+
+def _estado_preparadas(conn):
+    """
+    (nomes já preparados nesta conexão, nomes cujo plano ficou velho e
+    precisam de DEALLOCATE antes do próximo PREPARE). Se o schema mudou
+    desde a última vez, limpa tudo (DEALLOCATE ALL) antes.
+    """
+    geracao, nomes, velhas = _preparadas_por_conexao.get(conn, (None, None, None))
+    if nomes is None or geracao != _geracao_schema:
+        if nomes:
+            with conn.cursor() as cur:
+                cur.execute("DEALLOCATE ALL")
+        nomes, velhas = set(), set()
+        _preparadas_por_conexao[conn] = (_geracao_schema, nomes, velhas)
+    return nomes, velhas
+
+
+def _medir_planejamento(cur, sql_original: str, params) -> float:
+    """
+    Tempo de planejamento (ms) que a consulta teria sem prepared statement,
+    lido do EXPLAIN (SUMMARY). Medido só uma vez por consulta.
+    """
+    cur.execute("EXPLAIN (SUMMARY ON, FORMAT JSON) " + sql_original, params)
+    plano = cur.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return float(plano[0].get("Planning Time", 0.0))
+
+
+def _preparar(cur, nome: str, nomes: set, velhas: set, params):
+    sql_numerado, sql_original = _consultas_preparadas[nome]
+    if nome in velhas:
+        # plano velho ainda existe na sessão: descarta só esta consulta
+        cur.execute(f"DEALLOCATE {nome}")
+        velhas.discard(nome)
+        nomes.discard(nome)
+    inicio = time.perf_counter()
+    cur.execute(f"PREPARE {nome} AS {sql_numerado}")
+    parse_ms = (time.perf_counter() - inicio) * 1000
+    nomes.add(nome)
+
+    with _preparadas_lock:
+        _preparadas_stats["prepares"] += 1
+        medir = nome not in _custos_preparadas
+    if not medir:
+        return
+    # o EXPLAIN é uma ida a mais ao servidor: só em diagnóstico/benchmark
+    plan_ms = 0.0
+    if _env_int("PGPREPARADAS_MEDIR", 0):
+        plan_ms = _medir_planejamento(cur, sql_original, params)
+    with _preparadas_lock:
+        _custos_preparadas[nome] = (parse_ms, plan_ms)
+
+
+def executar_preparada(cur, sql: str, params=(), nome: str = None):
+    """
+    Executa `sql` como prepared statement na conexão do cursor.
+
+    Uso típico:
+        with get_cursor() as cur:
+            executar_preparada(cur, "SELECT COUNT(*) FROM clientes WHERE uf = %s", ("SP",))
+            print(cur.fetchone())
+
+    - Na primeira vez em cada conexão do pool faz PREPARE; depois só EXECUTE,
+      e o PostgreSQL não precisa fazer parse/planejamento de novo.
+    - Se o schema mudou (invalidar_preparadas() ou erro de "cached plan"),
+      só a consulta afetada é descartada e preparada de novo. A repetição
+      automática só acontece quando o comando que falhou era o único da
+      transação; no meio de uma transação o erro sobe para quem chamou (a
+      transação dele não é desfeita aqui) e a consulta é preparada de novo
+      no próximo uso.
+    - PGPREPARADAS_MEDIR=1 mede também o tempo de planejamento de cada
+      consulta (um EXPLAIN a mais no primeiro PREPARE), para preencher
+      plan_ms_economizado em preparadas_stats().
+    """
+    nome = registrar_consulta(sql, nome)
+    params = tuple(params or ())
+    conn = cur.connection
+    execute_sql = f"EXECUTE {nome}" + (
+        "(" + ", ".join(["%s"] * len(params)) + ")" if params else ""
+    )
+
+    for tentativa in (1, 2):
+        # só dá para repetir se a transação ainda não tinha nada além disto
+        transacao_vazia = conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        nomes, velhas = _estado_preparadas(conn)
+        reaproveitada = nome in nomes and nome not in velhas
+        preparando = False
+        try:
+            if not reaproveitada:
+                preparando = True
+                _preparar(cur, nome, nomes, velhas, params)
+                preparando = False
+            if isinstance(cur, CursorInstrumentado):
+                cur.rotulo = sql
+            cur.execute(execute_sql, params)
+        except psycopg2.Error as e:
+            if e.pgcode not in _ERROS_PREPARADA_INVALIDA:
+                raise
+            # só esta consulta ficou velha; as outras da conexão continuam valendo
+            if nome in nomes and not preparando and e.pgcode != errorcodes.INVALID_SQL_STATEMENT_NAME:
+                velhas.add(nome)
+            else:
+                nomes.discard(nome)
+            with _preparadas_lock:
+                _preparadas_stats["invalidacoes"] += 1
+                _custos_preparadas.pop(nome, None)
+            if tentativa == 2 or not transacao_vazia:
+                raise
+            # a transação abortada só tinha este comando: nada de quem chamou se perde
+            if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR:
+                conn.rollback()
+            continue
+        break
+
+    with _preparadas_lock:
+        _preparadas_stats["execucoes"] += 1
+        if reaproveitada:
+            _preparadas_stats["reaproveitadas"] += 1
+            parse_ms, plan_ms = _custos_preparadas.get(nome, (0.0, 0.0))
+            _preparadas_stats["parse_ms_economizado"] += parse_ms
+            _preparadas_stats["plan_ms_economizado"] += plan_ms
+
+
+# ----------------------------------------------------------------------
+# Classe Database (API usada por src/cliente.py e src/produto.py)
+# ----------------------------------------------------------------------
+
+
+class _Operacao:
+    """
+    Estado de uma operação lógica: uma conexão do pool compartilhada por
+    todos os Database() abertos na mesma thread (inclusive chamadas aninhadas).
+    """
+
+    def __init__(self, conn, pool, somente_leitura: bool = False):
+        self.conn = conn
+        self.pool = pool
+        self.somente_leitura = somente_leitura
+        self.profundidade = 0
+        # checkouts do pool feitos pela operação: o que a abriu e qualquer
+        # outro que aconteça enquanto ela está ativa (somados em getconn)
+        self.conexoes = 1
+        self.consultas = 0
+        self.falhou = False
+        self.inicio = time.perf_counter()
+
+
+def ultima_operacao() -> dict:
+    """
+    Resumo da última operação lógica concluída nesta thread
+    (conexões usadas, consultas executadas, duração em ms).
+    """
+    return dict(getattr(_local, "ultima_operacao", {}))
+
+
+class Database:
+    """
+    Acesso simples ao banco no estilo conectar/executar/desconectar.
+
+    Uso típico:
+        db = Database()
+        try:
+            db.conectar()
+            linhas = db.buscar_todos("SELECT id, nome FROM clientes LIMIT %s", (10,))
+        finally:
+            db.desconectar()
+
+    - A conexão vem do pool global (não abre conexão nova a cada uso).
+    - Se já existe uma operação em andamento na mesma thread (ex.: deletar_cliente
+      chamando buscar_cliente), o Database interno reaproveita a MESMA conexão.
+    - Só o desconectar() mais externo faz commit (ou rollback, se algo falhou)
+      e devolve a conexão ao pool.
+    - Depois de desconectar(), `conexoes_usadas` diz quantos checkouts do
+      pool a thread fez durante a operação (o esperado é 1; mais que isso
+      indica uma função que pegou outra conexão em vez de usar a da operação).
+    """
+
+    def __init__(self):
+        self._operacao = None
+        self.conexoes_usadas = 0
+
+    def conectar(self) -> bool:
+        """
+        Entra na operação da thread atual (ou inicia uma nova).
+        Retorna True se conectou, False se não foi possível obter conexão.
+        """
+        try:
+            self._entrar()
+        except (psycopg2.Error, pg_pool.PoolError) as e:
+            print(f"❌ Erro ao conectar: {e}")
+            return False
+        return True
+
+    def _entrar(self, somente_leitura: bool = False):
+        """
+        Igual a conectar(), mas levanta a exceção em vez de imprimir.
+        somente_leitura só vale para quem inicia a operação: a transação
+        vira REPEATABLE READ READ ONLY (uma foto só do banco) e pode ir
+        para uma réplica.
+        """
+        if self._operacao is not None:
+            return
+
+        op = getattr(_local, "operacao", None)
+        if op is None:
+            pool = _escolher_pool(True) if somente_leitura else get_pool()
+            conn = _getconn_no_prazo(pool)
+            if somente_leitura:
+                try:
+                    conn.set_session(
+                        isolation_level=extensions.ISOLATION_LEVEL_REPEATABLE_READ,
+                        readonly=True,
+                    )
+                except psycopg2.Error:
+                    pool.putconn(conn, descartar=True)
+                    raise
+            op = _Operacao(conn, pool, somente_leitura)
+            _local.operacao = op
+
+        op.profundidade += 1
+        self._operacao = op
+
+    def _cursor(self):
+        if self._operacao is None:
+            raise RuntimeError("Database não conectado. Chame conectar() antes.")
+        return self._operacao.conn.cursor(cursor_factory=CursorInstrumentado)
+
+    def executar(self, query, parametros=None):
+        """
+        Executa um comando (INSERT/UPDATE/DELETE/SELECT).
+        Retorna a lista de linhas quando o comando devolve resultado
+        (ex.: INSERT ... RETURNING id), ou lista vazia caso contrário.
+        """
+        cur = self._cursor()
+        try:
+            cur.execute(query, parametros)
+            return cur.fetchall() if cur.description else []
+        except Exception:
+            self._operacao.falhou = True
+            raise
+        finally:
+            cur.close()
+
+    def buscar_um(self, query, parametros=None):
+        """
+        Executa um SELECT e retorna a primeira linha (ou None).
+        """
+        cur = self._cursor()
+        try:
+            cur.execute(query, parametros)
+            return cur.fetchone()
+        except Exception:
+            self._operacao.falhou = True
+            raise
+        finally:
+            cur.close()
+
+    def buscar_todos(self, query, parametros=None):
+        """
+        Executa um SELECT e retorna todas as linhas.
+        """
+        cur = self._cursor()
+        try:
+            cur.execute(query, parametros)
+            return cur.fetchall()
+        except Exception:
+            self._operacao.falhou = True
+            raise
+        finally:
+            cur.close()
+
+    def desconectar(self):
+        """
+        Sai da operação. O desconectar() mais externo da thread
+        faz commit/rollback e devolve a conexão ao pool.
+        """
+        op = self._operacao
+        if op is None:
+            return
+        self._operacao = None
+
+        op.profundidade -= 1
+        if op.profundidade > 0:
+            return
+
+        _local.operacao = None
+        descartar = False
+        try:
+            if op.falhou:
+                op.conn.rollback()
+            else:
+                op.conn.commit()
+                if not op.somente_leitura:
+                    _local.ultima_escrita = time.monotonic()
+            if op.somente_leitura:
+                op.conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+        except psycopg2.Error as e:
+            descartar = True
+            print(f"❌ Erro ao finalizar transação: {e}")
+        finally:
+            op.pool.putconn(op.conn, descartar=descartar or bool(op.conn.closed))
+
+        self.conexoes_usadas = op.conexoes
+        _local.ultima_operacao = {
+            "conexoes": op.conexoes,
+            "consultas": op.consultas,
+            "duracao_ms": round((time.perf_counter() - op.inicio) * 1000, 3),
+            "commit": not op.falhou and not descartar,
+        }
+
+
+@contextmanager
+def session(somente_leitura: bool = False):
+    """
+    Unidade de trabalho: prende UMA conexão e UMA transação à thread atual,
+    e todas as funções do sistema chamadas dentro do bloco usam essa mesma
+    conexão (get_cursor, stream_query, Database, src/clientes.py,
+    src/vendas.py, src/cliente.py, src/produto.py...).
+
+    Uso típico:
+        from src.database import session
+
+        with session(somente_leitura=True):
+            stats = vendas.estatisticas_vendas()
+            total = cliente.contar_clientes()
+
+    - Commit no fim do bloco; rollback se algo falhou lá dentro (inclusive
+      um erro que a função chamada capturou e só imprimiu).
+    - somente_leitura=True: a transação é REPEATABLE READ READ ONLY, então
+      todas as consultas enxergam a mesma foto do banco; pode ir para uma
+      réplica.
+    - Sessões aninhadas (ou um Database aberto antes) entram na de fora.
+    - Dentro da sessão não há retentativa automática (@idempotente): uma
+      falha de conexão no meio não pode ser repetida pela metade.
+    - Não deixe a sessão aberta esperando o usuário digitar algo: a
+      transação fica aberta (e segurando a foto) o tempo todo.
+
+    Entrega o Database da sessão, para quem quiser usar executar()/buscar_*().
+    """
+    db = Database()
+    db._entrar(somente_leitura)
+    try:
+        yield db
+    except BaseException:
+        db._operacao.falhou = True
+        raise
+    finally:
+        db.desconectar()
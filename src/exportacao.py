@@ -0,0 +1,186 @@
+"""
+Exportação em massa de clientes e vendas (extrações para BI).
+
+Os dados saem do PostgreSQL por `COPY (consulta) TO STDOUT` e vão direto
+para o arquivo, em pedaços: nada passa por linhas/tuplas do Python, então
+a memória fica em poucos MB com qualquer tamanho de tabela e a vazão é a
+do próprio COPY (centenas de milhares de linhas por segundo).
+
+- Formatos: CSV (com cabeçalho) e NDJSON (um objeto JSON por linha).
+- Compressão gzip opcional.
+- Mesmos filtros de buscar_clientes() (FiltrosClientes); em vendas, os
+  filtros valem para o cliente da venda.
+- Progresso (linhas e linhas/s) por callback.
+
+Uso:
+    python -m src.cli export clientes --saida clientes.csv.gz --gzip
+    python -m src.cli export vendas --formato ndjson --uf SP
+"""
+import gzip
+import os
+import sys
+import time
+from typing import Callable, Optional, Tuple
+
+from psycopg2 import extensions
+
+from src.clientes import _FILTROS, _SQL_SELECT_CLIENTES, _como_filtros, _forma_filtros
+from src.database import com_prazo, get_cursor
+
+TABELAS = ("clientes", "vendas")
+FORMATOS = ("csv", "ndjson")
+
+_SQL_SELECT_VENDAS = """
+    SELECT id, cliente_id, produto_id, quantidade, valor_unitario, valor_total,
+           data_venda, observacao
+    FROM vendas
+"""
+
+# Pedaço lido do servidor por vez (e escrito no arquivo)
+TAMANHO_BLOCO = 256 * 1024
+
+# gzip nível 1: bem mais rápido que o padrão (6) e comprime quase o mesmo
+# em dados repetitivos como estes
+NIVEL_GZIP = 1
+
+# NDJSON: row_to_json() já escapa aspas, barras e quebras de linha. No
+# formato texto o COPY dobraria as barras (\" viraria \\"), então usamos CSV
+# com aspas e separador que nunca aparecem num JSON (caracteres de controle
+# saem como \u0001): cada linha sai exatamente como o PostgreSQL a gerou.
+_OPCOES_COPY = {
+    "csv": "FORMAT csv, HEADER true",
+    "ndjson": "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'",
+}
+
+
+def montar_consulta(tabela: str, filtros=None) -> Tuple[str, tuple]:
+    """
+    SELECT (e parâmetros) da exportação de `tabela` com os filtros de
+    cliente. Sem ORDER BY: a ordem física é a mais rápida de ler.
+    """
+    if tabela not in TABELAS:
+        raise ValueError(f"Tabela inválida: {tabela!r} (use uma de {', '.join(TABELAS)})")
+    forma, params = _forma_filtros(_como_filtros(filtros))
+    where = " AND ".join(f"({_FILTROS[campo][0]})" for campo in forma)
+
+    if tabela == "clientes":
+        sql = _SQL_SELECT_CLIENTES
+        if where:
+            sql += " WHERE " + where
+        return sql, params
+
+    sql = _SQL_SELECT_VENDAS
+    if where:
+        sql += f" WHERE cliente_id IN (SELECT id FROM clientes WHERE {where})"
+    return sql, params
+
+
+def montar_copy(consulta: str, formato: str) -> str:
+    """
+    COPY ... TO STDOUT para a `consulta` já com os parâmetros aplicados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato!r} (use uma de {', '.join(FORMATOS)})")
+    if formato == "ndjson":
+        consulta = f"SELECT row_to_json(linha) FROM ({consulta}) linha"
+    return f"COPY ({consulta}) TO STDOUT WITH ({_OPCOES_COPY[formato]})"
+
+
+class _Escritor:
+    """
+    Recebe os pedaços do COPY, repassa ao arquivo e conta as linhas
+    (quebras de linha) para o progresso. Em CSV, um campo com quebra de
+    linha dentro conta a mais aqui; o total final vem do próprio COPY.
+    """
+
+    def __init__(self, arquivo, progresso: Optional[Callable[[int, float], None]],
+                 intervalo: float = 1.0, relogio: Callable[[], float] = time.perf_counter):
+        self.arquivo = arquivo
+        self.linhas = 0
+        self._progresso = progresso
+        self._intervalo = intervalo
+        self._relogio = relogio
+        self.inicio = relogio()
+        self._ultimo_aviso = self.inicio
+
+    def write(self, dados) -> int:
+        if isinstance(dados, str):
+            dados = dados.encode("utf-8")
+        self.arquivo.write(dados)
+        self.linhas += dados.count(b"\n")
+        if self._progresso is not None:
+            agora = self._relogio()
+            if agora - self._ultimo_aviso >= self._intervalo:
+                self._ultimo_aviso = agora
+                self._progresso(self.linhas, agora - self.inicio)
+        return len(dados)
+
+
+def _abrir_destino(destino: Optional[str], comprimir: bool):
+    """Arquivo binário de saída ("-" ou None = saída padrão)."""
+    if destino in (None, "-"):
+        bruto = sys.stdout.buffer
+        if comprimir:
+            return gzip.GzipFile(fileobj=bruto, mode="wb", compresslevel=NIVEL_GZIP), False
+        return bruto, False
+    if comprimir:
+        return gzip.open(destino, "wb", compresslevel=NIVEL_GZIP), True
+    return open(destino, "wb"), True
+
+
+@com_prazo
+def exportar(
+    tabela: str,
+    destino: Optional[str] = None,
+    formato: str = "csv",
+    comprimir: bool = False,
+    filtros=None,
+    progresso: Optional[Callable[[int, float], None]] = None,
+) -> int:
+    """
+    Exporta `tabela` ("clientes" ou "vendas") para o arquivo `destino`
+    ("-"/None = saída padrão). Devolve quantas linhas foram exportadas.
+
+    - formato: "csv" (com cabeçalho) ou "ndjson".
+    - comprimir=True grava em gzip.
+    - filtros: os mesmos de buscar_clientes() (dict ou FiltrosClientes).
+    - progresso(linhas, segundos) é chamado a cada ~1 s durante a cópia.
+
+    Vai para uma réplica de leitura, se houver (ver get_cursor). Um COPY é
+    um comando só, então o arquivo inteiro é uma foto consistente do banco.
+    Se der erro no meio, o arquivo parcial é apagado.
+
+    COPY não funciona no modo "verde" do psycopg2 (menu.py liga esse modo
+    com set_wait_callback); chame de fora dele, como faz a CLI.
+    """
+    if extensions.get_wait_callback() is not None:
+        raise RuntimeError("COPY não funciona com set_wait_callback() ativo (modo verde do psycopg2).")
+    consulta, params = montar_consulta(tabela, filtros)
+    formato = formato.lower()
+    montar_copy("", formato)  # valida o formato antes de criar o arquivo
+
+    arquivo, fechar = _abrir_destino(destino, comprimir)
+    escritor = _Escritor(arquivo, progresso)
+    ok = False
+    try:
+        with get_cursor(somente_leitura=True) as cur:
+            # COPY não aceita parâmetros: os valores entram já escapados
+            sql = montar_copy(cur.mogrify(consulta, params).decode("utf-8"), formato)
+            cur.copy_expert(sql, escritor, size=TAMANHO_BLOCO)
+            total = cur.rowcount
+        ok = True
+    finally:
+        if fechar:
+            arquivo.close()
+            if not ok:
+                try:
+                    os.remove(destino)
+                except OSError:
+                    pass
+        elif isinstance(arquivo, gzip.GzipFile):
+            arquivo.close()  # finaliza o gzip; a saída padrão continua aberta
+        else:
+            arquivo.flush()
+    if progresso is not None:
+        progresso(total, time.perf_counter() - escritor.inicio)
+    return total
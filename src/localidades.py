@@ -6,6 +6,7 @@ Esta lista não tem TODAS as cidades do Brasil, mas traz várias
 capitais, cidades grandes e cidades médias/menores por estado,
 para deixar a distribuição de clientes mais realista.
 """
+from src.utils_nomes import normalizar_texto
 
 CIDADE_UF = {
     # Acre
@@ -247,3 +248,7 @@ CIDADE_UF = {
 
 CIDADES = list(CIDADE_UF.keys())
 UFS = sorted(set(CIDADE_UF.values()))
+
+# Mesma tabela com as chaves normalizadas (minúsculas, sem acento), para
+# achar a UF de "sao paulo" ou "FLORIANOPOLIS" vindos de CSV/digitação
+CIDADE_UF_NORMALIZADA = {normalizar_texto(cidade): uf for cidade, uf in CIDADE_UF.items()}
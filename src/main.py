@@ -10,6 +10,8 @@ import produto
 import vendas
 import sys
 
+from database import session
+
 def limpar_tela():
     """Limpa a tela do terminal"""
     import os
@@ -697,21 +699,23 @@ def relatorio_geral():
     print("=" * 80)
     
     try:
-        # Estatísticas de vendas
-        stats = vendas.estatisticas_vendas()
+        # Uma conexão e uma foto só do banco para o relatório inteiro
+        with session(somente_leitura=True):
+            stats = vendas.estatisticas_vendas()
+            total_clientes = cliente.contar_clientes()
+            total_produtos = produto.contar_produtos()
         
+        # Estatísticas de vendas
         print("\n💰 VENDAS:")
         print(f"   Total de vendas: {stats.get('total_vendas', 0)}")
         print(f"   Faturamento: R$ {stats.get('total_faturado', 0):.2f}")
         print(f"   Ticket médio: R$ {stats.get('ticket_medio', 0):.2f}")
         
         # Total de clientes
-        total_clientes = cliente.contar_clientes()
         print(f"\n👥 CLIENTES:")
         print(f"   Total cadastrados: {total_clientes}")
         
         # Total de produtos
-        total_produtos = produto.contar_produtos()
         print(f"\n📦 PRODUTOS:")
         print(f"   Total cadastrados: {total_produtos}")
         
@@ -0,0 +1,217 @@
+"""
+Métricas de consultas SQL em memória.
+
+- Histograma no estilo HDR (buckets log-lineares): guarda milhões de
+  amostras em poucos KB, com erro relativo de ~3% nos percentis.
+- Registro por SQL normalizado (literais trocados por '?') e por função
+  chamadora (ex.: 'src.clientes.buscar_por_cidade').
+- Log de consultas lentas (acima de um limite em ms).
+- Tudo pode ser exportado como JSON.
+
+Este módulo não depende do banco; quem alimenta os dados é o get_cursor()
+de src/database.py.
+"""
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# 2^5 = 32 sub-buckets por potência de 2 -> erro relativo máximo ~3%
+_SUB_BITS = 5
+_SUB_BUCKETS = 1 << _SUB_BITS
+
+
+class Histograma:
+    """
+    Histograma de latências em microssegundos, com buckets log-lineares
+    (mesma ideia do HdrHistogram).
+
+    Uso típico:
+        h = Histograma()
+        h.registrar(1.7)        # ms
+        h.percentil(99)         # ms
+    """
+
+    def __init__(self):
+        self._buckets: Dict[int, int] = {}
+        self.total = 0
+        self.soma_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    @staticmethod
+    def _indice(valor_us: int) -> int:
+        if valor_us < _SUB_BUCKETS:
+            return valor_us
+        exp = valor_us.bit_length() - _SUB_BITS - 1
+        return (exp + 1) * _SUB_BUCKETS + ((valor_us >> exp) - _SUB_BUCKETS)
+
+    @staticmethod
+    def _valor(indice: int) -> int:
+        """
+        Maior valor (µs) que cai no bucket `indice`.
+        """
+        if indice < _SUB_BUCKETS:
+            return indice
+        exp = indice // _SUB_BUCKETS - 1
+        mantissa = indice % _SUB_BUCKETS + _SUB_BUCKETS
+        return ((mantissa + 1) << exp) - 1
+
+    def registrar(self, valor_ms: float):
+        valor_us = max(0, int(round(valor_ms * 1000)))
+        i = self._indice(valor_us)
+        self._buckets[i] = self._buckets.get(i, 0) + 1
+        self.total += 1
+        self.soma_us += valor_us
+        if self.min_us is None or valor_us < self.min_us:
+            self.min_us = valor_us
+        if valor_us > self.max_us:
+            self.max_us = valor_us
+
+    def percentil(self, p: float) -> float:
+        """
+        Valor (ms) abaixo do qual estão p% das amostras.
+        """
+        if not self.total:
+            return 0.0
+        alvo = max(1, math.ceil(self.total * p / 100.0))
+        acumulado = 0
+        for indice in sorted(self._buckets):
+            acumulado += self._buckets[indice]
+            if acumulado >= alvo:
+                return min(self._valor(indice), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def resumo(self) -> dict:
+        if not self.total:
+            return {"total": 0}
+        return {
+            "total": self.total,
+            "media_ms": round(self.soma_us / self.total / 1000.0, 3),
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "p50_ms": self.percentil(50),
+            "p90_ms": self.percentil(90),
+            "p99_ms": self.percentil(99),
+            "max_ms": self.max_us / 1000.0,
+        }
+
+
+_RE_COMENTARIO = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_RE_PLACEHOLDER = re.compile(r"%s|\$\d+")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql) -> str:
+    """
+    Deixa o SQL com "cara" de modelo, para agrupar consultas iguais:
+    tira comentários, troca literais e parâmetros por '?' e junta espaços.
+
+    Ex.: "SELECT * FROM clientes WHERE uf = 'SP' LIMIT 20"
+      -> "SELECT * FROM clientes WHERE uf = ? LIMIT ?"
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", errors="replace")
+    sql = str(sql)
+    sql = _RE_COMENTARIO.sub(" ", sql)
+    sql = _RE_STRING.sub("?", sql)
+    sql = _RE_PLACEHOLDER.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_LISTA.sub("(?...)", sql)
+    return _RE_ESPACOS.sub(" ", sql).strip()
+
+
+class _Estatistica:
+    def __init__(self):
+        self.duracao = Histograma()
+        self.espera = Histograma()
+        self.linhas = 0
+
+    def resumo(self) -> dict:
+        return {
+            "chamadas": self.duracao.total,
+            "linhas": self.linhas,
+            "duracao": self.duracao.resumo(),
+            "espera_conexao": self.espera.resumo(),
+        }
+
+
+class Metricas:
+    """
+    Coletor de métricas de consultas (thread-safe).
+    """
+
+    def __init__(self, limite_lenta_ms: float = 200.0, max_lentas: int = 100,
+                 logger: Optional[logging.Logger] = None):
+        self.limite_lenta_ms = limite_lenta_ms
+        self._lock = threading.Lock()
+        self._por_sql: Dict[str, _Estatistica] = {}
+        self._por_funcao: Dict[str, _Estatistica] = {}
+        self._lentas = deque(maxlen=max_lentas)
+        self._logger = logger or logging.getLogger("sistema_clientes.slow_query")
+
+    def registrar(self, sql, duracao_ms: float, linhas: int = 0,
+                  espera_ms: float = 0.0, funcao: str = "?"):
+        sql_norm = normalizar_sql(sql)
+        with self._lock:
+            for chave, mapa in ((sql_norm, self._por_sql), (funcao, self._por_funcao)):
+                est = mapa.get(chave)
+                if est is None:
+                    est = mapa[chave] = _Estatistica()
+                est.duracao.registrar(duracao_ms)
+                est.espera.registrar(espera_ms)
+                est.linhas += max(linhas, 0)
+
+            lenta = duracao_ms >= self.limite_lenta_ms
+            if lenta:
+                self._lentas.append(
+                    {
+                        "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "funcao": funcao,
+                        "sql": sql_norm,
+                        "duracao_ms": round(duracao_ms, 3),
+                        "linhas": linhas,
+                        "espera_conexao_ms": round(espera_ms, 3),
+                    }
+                )
+
+        if lenta:
+            self._logger.warning(
+                "consulta lenta: %.1f ms (espera conexão %.1f ms, %d linhas) em %s: %s",
+                duracao_ms, espera_ms, linhas, funcao, sql_norm,
+            )
+
+    def consultas_lentas(self) -> list:
+        with self._lock:
+            return list(self._lentas)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limite_lenta_ms": self.limite_lenta_ms,
+                "por_sql": {k: v.resumo() for k, v in self._por_sql.items()},
+                "por_funcao": {k: v.resumo() for k, v in self._por_funcao.items()},
+                "lentas": list(self._lentas),
+            }
+
+    def dump_json(self, caminho: Optional[str] = None) -> str:
+        """
+        Exporta as métricas como JSON (e grava em `caminho`, se informado).
+        """
+        texto = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        if caminho:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(texto)
+        return texto
+
+    def limpar(self):
+        with self._lock:
+            self._por_sql.clear()
+            self._por_funcao.clear()
+            self._lentas.clear()
@@ -0,0 +1,346 @@
+"""
+Migrações de schema versionadas.
+
+Cada arquivo de scripts/migracoes/ chamado `NNNN_descricao.sql` é uma
+versão. As versões aplicadas ficam registradas na tabela
+`schema_migracoes` (versão, nome, checksum, quando e quanto demorou), e
+`migrar()` aplica só as que faltam, em ordem.
+
+Arquivos com `CREATE/DROP INDEX CONCURRENTLY` não podem rodar dentro de
+transação: nesse caso os comandos são executados um a um, em autocommit,
+e cada comando concluído fica anotado em `schema_migracoes_progresso`.
+Se a migração falhar no meio, a próxima execução retoma do comando que
+falhou (os anteriores não rodam de novo). Um comando pode ter terminado
+sem dar tempo de anotar, então esses arquivos devem continuar usando
+IF NOT EXISTS / IF EXISTS / OR REPLACE.
+Se um índice CONCURRENTLY anterior falhou no meio, ele fica INVALID no
+catálogo e o `IF NOT EXISTS` o daria como pronto; por isso o runner
+remove o índice inválido antes de criá-lo de novo.
+
+Uso:
+    python -m src.cli migrate            # aplica as pendentes
+    python -m src.cli migrate --status   # lista aplicadas/pendentes
+    python -m src.cli migrate --ate 3    # aplica até a versão 3
+"""
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.database import get_connection, invalidar_preparadas
+
+DIRETORIO_MIGRACOES = Path(__file__).resolve().parent.parent / "scripts" / "migracoes"
+
+# Chave do pg_advisory_lock: impede duas execuções de migrar() ao mesmo tempo
+_CHAVE_LOCK = 7_310_001
+
+_PADRAO_ARQUIVO = re.compile(r"^(\d+)_(\w+)\.sql$")
+_PADRAO_CONCURRENTLY = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+_PADRAO_CRIAR_INDICE = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+    re.IGNORECASE,
+)
+
+_SQL_TABELA = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao INTEGER PRIMARY KEY,
+        nome TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        aplicada_em TIMESTAMP NOT NULL DEFAULT NOW(),
+        duracao_ms INTEGER NOT NULL
+    )
+"""
+
+# Comandos já concluídos das migrações sem transação que ainda não terminaram
+_SQL_TABELA_PROGRESSO = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes_progresso (
+        versao INTEGER NOT NULL,
+        comando INTEGER NOT NULL,
+        checksum TEXT NOT NULL,
+        concluido_em TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (versao, comando)
+    )
+"""
+
+
+@dataclass(frozen=True)
+class Migracao:
+    """
+    Um arquivo de migração já lido do disco.
+    """
+
+    versao: int
+    nome: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    @property
+    def comandos(self) -> List[str]:
+        return dividir_comandos(self.sql)
+
+    @property
+    def sem_transacao(self) -> bool:
+        """
+        True se algum comando usa CONCURRENTLY (não pode rodar em transação).
+        """
+        return any(_PADRAO_CONCURRENTLY.search(c) for c in self.comandos)
+
+
+def dividir_comandos(sql: str) -> List[str]:
+    """
+    Separa um script SQL em comandos pelo `;`, ignorando os `;` que
+    aparecem dentro de strings ('...'), identificadores ("..."), blocos
+    $tag$...$tag$ e comentários. Os comentários são removidos.
+    """
+    comandos = []
+    atual = []
+    i, n = 0, len(sql)
+
+    while i < n:
+        c = sql[i]
+
+        if sql.startswith("--", i):
+            fim = sql.find("\n", i)
+            i = n if fim == -1 else fim
+            continue
+
+        if sql.startswith("/*", i):
+            profundidade, i = 1, i + 2
+            while i < n and profundidade:
+                if sql.startswith("/*", i):
+                    profundidade, i = profundidade + 1, i + 2
+                elif sql.startswith("*/", i):
+                    profundidade, i = profundidade - 1, i + 2
+                else:
+                    i += 1
+            atual.append(" ")
+            continue
+
+        if c in ("'", '"'):
+            fim = i + 1
+            while fim < n:
+                if sql[fim] == c:
+                    if fim + 1 < n and sql[fim + 1] == c:  # '' ou "" escapado
+                        fim += 2
+                        continue
+                    break
+                fim += 1
+            atual.append(sql[i:fim + 1])
+            i = fim + 1
+            continue
+
+        if c == "$":
+            tag = re.match(r"\$(?:[A-Za-z_]\w*)?\$", sql[i:])
+            if tag:
+                fim = sql.find(tag.group(0), i + len(tag.group(0)))
+                fim = n if fim == -1 else fim + len(tag.group(0))
+                atual.append(sql[i:fim])
+                i = fim
+                continue
+
+        if c == ";":
+            comando = "".join(atual).strip()
+            if comando:
+                comandos.append(comando)
+            atual = []
+            i += 1
+            continue
+
+        atual.append(c)
+        i += 1
+
+    comando = "".join(atual).strip()
+    if comando:
+        comandos.append(comando)
+    return comandos
+
+
+def carregar_migracoes(diretorio: Path = DIRETORIO_MIGRACOES) -> List[Migracao]:
+    """
+    Lê os arquivos `NNNN_descricao.sql` do diretório, em ordem de versão.
+    Levanta ValueError se duas migrações tiverem a mesma versão.
+    """
+    migracoes = {}
+    for caminho in sorted(Path(diretorio).glob("*.sql")):
+        casou = _PADRAO_ARQUIVO.match(caminho.name)
+        if not casou:
+            continue
+        versao = int(casou.group(1))
+        if versao in migracoes:
+            raise ValueError(
+                f"Versão {versao} repetida: {migracoes[versao].nome} e {caminho.stem}"
+            )
+        migracoes[versao] = Migracao(
+            versao=versao,
+            nome=caminho.stem,
+            sql=caminho.read_text(encoding="utf-8"),
+        )
+    return [migracoes[v] for v in sorted(migracoes)]
+
+
+def _aplicadas(cur) -> dict:
+    cur.execute(_SQL_TABELA)
+    cur.execute(_SQL_TABELA_PROGRESSO)
+    cur.execute("SELECT versao, checksum, aplicada_em FROM schema_migracoes")
+    return {versao: (checksum, aplicada_em) for versao, checksum, aplicada_em in cur.fetchall()}
+
+
+def _remover_indice_invalido(cur, comando: str):
+    """
+    Se o comando é um CREATE INDEX CONCURRENTLY IF NOT EXISTS e o índice
+    ficou INVALID de uma tentativa anterior, apaga o índice para recriá-lo.
+    """
+    casou = _PADRAO_CRIAR_INDICE.match(comando)
+    if not casou:
+        return
+    cur.execute(
+        """
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+          AND pg_catalog.pg_table_is_visible(c.oid)
+          AND NOT i.indisvalid
+        """,
+        (casou.group(1),),
+    )
+    if cur.fetchone():
+        print(f"  índice {casou.group(1)} ficou inválido numa execução anterior; recriando")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {casou.group(1)}")
+
+
+def _comandos_concluidos(cur, migracao: Migracao) -> set:
+    """
+    Índices dos comandos de `migracao` já concluídos numa execução anterior
+    que falhou no meio. Se o arquivo mudou desde então, o progresso antigo
+    não vale mais e é descartado.
+    """
+    cur.execute(
+        "SELECT comando, checksum FROM schema_migracoes_progresso WHERE versao = %s",
+        (migracao.versao,),
+    )
+    linhas = cur.fetchall()
+    if any(checksum != migracao.checksum for _, checksum in linhas):
+        print(f"  ⚠️  {migracao.nome} mudou desde a execução interrompida; aplicando do início")
+        cur.execute("DELETE FROM schema_migracoes_progresso WHERE versao = %s", (migracao.versao,))
+        return set()
+    return {comando for comando, _ in linhas}
+
+
+def _aplicar(conn, migracao: Migracao) -> int:
+    """
+    Aplica uma migração e registra em schema_migracoes. Devolve a duração (ms).
+    """
+    inicio = time.perf_counter()
+
+    if migracao.sem_transacao:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                comandos = migracao.comandos
+                concluidos = _comandos_concluidos(cur, migracao)
+                if concluidos:
+                    print(f"  retomando: {len(concluidos)} de {len(comandos)} comandos já aplicados")
+                for numero, comando in enumerate(comandos):
+                    if numero in concluidos:
+                        continue
+                    _remover_indice_invalido(cur, comando)
+                    cur.execute(comando)
+                    cur.execute(
+                        """
+                        INSERT INTO schema_migracoes_progresso (versao, comando, checksum)
+                        VALUES (%s, %s, %s)
+                        """,
+                        (migracao.versao, numero, migracao.checksum),
+                    )
+        finally:
+            conn.autocommit = False
+    else:
+        # O registro em schema_migracoes entra na mesma transação do DDL
+        with conn.cursor() as cur:
+            for comando in migracao.comandos:
+                cur.execute(comando)
+
+    duracao_ms = int((time.perf_counter() - inicio) * 1000)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO schema_migracoes (versao, nome, checksum, duracao_ms)
+            VALUES (%s, %s, %s, %s)
+            """,
+            (migracao.versao, migracao.nome, migracao.checksum, duracao_ms),
+        )
+        if migracao.sem_transacao:
+            cur.execute("DELETE FROM schema_migracoes_progresso WHERE versao = %s", (migracao.versao,))
+    conn.commit()
+    return duracao_ms
+
+
+def migrar(ate: Optional[int] = None, diretorio: Path = DIRETORIO_MIGRACOES) -> List[Migracao]:
+    """
+    Aplica, em ordem, as migrações ainda não registradas em
+    schema_migracoes (até a versão `ate`, se informada).
+
+    Devolve a lista das migrações aplicadas agora.
+    """
+    migracoes = carregar_migracoes(diretorio)
+    conn = get_connection()
+    aplicadas_agora = []
+    try:
+        with conn.cursor() as cur:
+            # Criar índice em tabela grande passa fácil de um statement_timeout
+            cur.execute("SET statement_timeout = 0")
+            cur.execute("SELECT pg_advisory_lock(%s)", (_CHAVE_LOCK,))
+            aplicadas = _aplicadas(cur)
+        conn.commit()
+
+        for migracao in migracoes:
+            if ate is not None and migracao.versao > ate:
+                break
+            if migracao.versao in aplicadas:
+                checksum, _ = aplicadas[migracao.versao]
+                if checksum != migracao.checksum:
+                    print(f"⚠️  {migracao.nome} foi alterada depois de aplicada (checksum diferente)")
+                continue
+
+            modo = "sem transação" if migracao.sem_transacao else "em transação"
+            print(f"Aplicando {migracao.nome} ({modo})...")
+            duracao_ms = _aplicar(conn, migracao)
+            print(f"  ok em {duracao_ms} ms")
+            aplicadas_agora.append(migracao)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_CHAVE_LOCK,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    if aplicadas_agora:
+        # Índices novos mudam os planos: as consultas preparadas são refeitas
+        invalidar_preparadas()
+    return aplicadas_agora
+
+
+def status_migracoes(diretorio: Path = DIRETORIO_MIGRACOES) -> List[Tuple[Migracao, Optional[object]]]:
+    """
+    Lista (migração, aplicada_em) para cada arquivo; aplicada_em é None
+    nas pendentes.
+    """
+    migracoes = carregar_migracoes(diretorio)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            aplicadas = _aplicadas(cur)
+        conn.commit()
+    finally:
+        conn.close()
+    return [(m, aplicadas.get(m.versao, (None, None))[1]) for m in migracoes]
@@ -0,0 +1,274 @@
+"""
+Paginação por chave (keyset / "seek") para as listagens de clientes.
+
+Em vez de `LIMIT n OFFSET m` (que obriga o PostgreSQL a ler e jogar fora
+as m primeiras linhas), cada página guarda a chave `(nome, id)` da sua
+primeira e da sua última linha, e a próxima consulta continua dali:
+
+    ... WHERE (nome, id) > ('Ana', 123) ORDER BY nome, id LIMIT 20
+
+A chave é opaca para quem usa: vira um "token" em texto (Pagina.proximo /
+Pagina.anterior), que basta devolver na chamada seguinte.
+
+montar_pagina_por_posicao() faz o mesmo para resultados lidos por posição
+(cursor rolável do servidor). PaginasAntecipadas busca a próxima página em segundo plano enquanto a
+atual está na tela (usado pelo menu).
+
+Este módulo não depende do banco; quem monta o SQL é src/clientes.py.
+"""
+import base64
+import binascii
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEPOIS = "depois"
+ANTES = "antes"
+
+Chave = Tuple[str, int]
+
+
+@dataclass
+class Pagina:
+    """
+    Uma página de resultados.
+
+    - linhas:   as linhas da página, sempre em ordem crescente de (nome, id)
+    - proximo:  token para a página seguinte (None = esta é a última)
+    - anterior: token para a página anterior (None = esta é a primeira)
+    """
+
+    linhas: List[Any] = field(default_factory=list)
+    proximo: Optional[str] = None
+    anterior: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.linhas)
+
+    def __iter__(self):
+        return iter(self.linhas)
+
+
+def codificar_cursor(direcao: str, chave: Chave) -> str:
+    """
+    Gera o token de uma posição: direção (DEPOIS/ANTES) + chave (nome, id).
+    """
+    if direcao not in (DEPOIS, ANTES):
+        raise ValueError(f"Direção inválida: {direcao!r}")
+    nome, id_ = chave
+    bruto = json.dumps([direcao, nome, id_], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(token: str) -> Tuple[str, Chave]:
+    """
+    Lê um token gerado por codificar_cursor(). Levanta ValueError se o
+    token não for válido.
+    """
+    try:
+        preenchido = token + "=" * (-len(token) % 4)
+        direcao, nome, id_ = json.loads(base64.urlsafe_b64decode(preenchido.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Cursor de paginação inválido: {token!r}") from e
+    if direcao not in (DEPOIS, ANTES) or not isinstance(nome, str) or not isinstance(id_, int):
+        raise ValueError(f"Cursor de paginação inválido: {token!r}")
+    return direcao, (nome, id_)
+
+
+def montar_pagina(
+    linhas: List[Any],
+    por_pagina: int,
+    direcao: str,
+    veio_de_cursor: bool,
+    chave: Callable[[Any], Chave],
+) -> Pagina:
+    """
+    Monta a Pagina a partir do resultado da consulta.
+
+    A consulta deve ter buscado `por_pagina + 1` linhas (a linha extra só
+    serve para saber se existe mais alguma coisa naquela direção) e, para
+    DEPOIS, em ordem crescente; para ANTES, em ordem decrescente.
+    """
+    tem_mais = len(linhas) > por_pagina
+    linhas = list(linhas[:por_pagina])
+    if direcao == ANTES:
+        linhas.reverse()
+
+    if not linhas:
+        return Pagina()
+
+    if direcao == DEPOIS:
+        tem_proxima, tem_anterior = tem_mais, veio_de_cursor
+    else:
+        tem_proxima, tem_anterior = veio_de_cursor, tem_mais
+
+    return Pagina(
+        linhas=linhas,
+        proximo=codificar_cursor(DEPOIS, chave(linhas[-1])) if tem_proxima else None,
+        anterior=codificar_cursor(ANTES, chave(linhas[0])) if tem_anterior else None,
+    )
+
+
+def montar_pagina_por_posicao(linhas: List[Any], inicio: int, por_pagina: int, total: int) -> Pagina:
+    """
+    Monta a Pagina de um resultado lido por posição (ex.: um cursor rolável
+    do servidor, src.database.CursorRolavel): `linhas` começam na posição
+    `inicio` de um resultado com `total` linhas. Os tokens são as posições
+    das páginas vizinhas, em texto.
+    """
+    linhas = list(linhas)
+    if not linhas:
+        return Pagina()
+    fim = inicio + len(linhas)
+    return Pagina(
+        linhas=linhas,
+        proximo=str(fim) if fim < total else None,
+        anterior=str(max(0, inicio - por_pagina)) if inicio > 0 else None,
+    )
+
+
+def posicao_do_token(token: Optional[str], pular: int = 0) -> int:
+    """
+    Posição guardada num token de montar_pagina_por_posicao() (sem token:
+    `pular`). Levanta ValueError se o token não for válido.
+    """
+    if token is None:
+        return max(0, pular)
+    if not token.isdigit():
+        raise ValueError(f"Cursor de paginação inválido: {token!r}")
+    return int(token)
+
+
+# De onde veio a página devolvida por PaginasAntecipadas.obter()
+ANTECIPADA = "antecipada"   # buscada em segundo plano antes de ser pedida
+JANELA = "janela"           # já tinha sido exibida e continuava guardada
+CONSULTA = "consulta"       # consultada na hora
+
+
+class _Entrada:
+    __slots__ = ("futuro", "cancelamento", "origem")
+
+    def __init__(self, futuro: Future, cancelamento, origem: str):
+        self.futuro = futuro
+        self.cancelamento = cancelamento
+        self.origem = origem
+
+
+class PaginasAntecipadas:
+    """
+    Janela de páginas em volta da que está na tela: enquanto o usuário lê a
+    página k, a k+1 é buscada numa thread à parte.
+
+    Uso típico:
+        def buscar(cursor, pular):
+            return buscar_por_uf_pagina("SP", cursor=cursor, pular=pular)
+
+        janela = PaginasAntecipadas(buscar, raio=2, novo_cancelamento=Cancelamento)
+        try:
+            pagina, origem = janela.obter(0)
+            janela.antecipar(1, pagina.proximo)
+            ...
+        finally:
+            janela.fechar()
+
+    - As páginas são identificadas pelo número (0 = primeira). Só ficam
+      guardadas as que estão a até `raio` páginas da atual; raio=0 desliga
+      a busca antecipada.
+    - Pedir uma página que ainda está sendo antecipada espera o que falta
+      em vez de começar outra consulta.
+    - Se a busca antecipada falhou, a página é consultada de novo na hora
+      (o erro, se continuar, aparece para quem pediu).
+    - Páginas que saem da janela e fechar() cancelam as buscas em andamento.
+      `novo_cancelamento()` cria o objeto que faz isso: usado como
+      `with` na thread da busca, tem cancelar() para as outras threads
+      (ex.: src.database.Cancelamento). Sem ele a busca só é descartada.
+    """
+
+    def __init__(
+        self,
+        buscar: Callable[[Optional[str], int], Pagina],
+        raio: int = 2,
+        novo_cancelamento: Optional[Callable[[], Any]] = None,
+    ):
+        self._buscar = buscar
+        self.raio = max(0, raio)
+        self._novo_cancelamento = novo_cancelamento
+        self._paginas: Dict[int, _Entrada] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._atual = 0
+        self._fechada = False
+        self.contadores = {ANTECIPADA: 0, JANELA: 0, CONSULTA: 0, "canceladas": 0}
+
+    def obter(self, numero: int, cursor: Optional[str] = None, pular: int = 0) -> Tuple[Pagina, str]:
+        """
+        Página `numero` e de onde ela veio (ANTECIPADA, JANELA ou CONSULTA).
+        `cursor`/`pular` são usados só se for preciso consultar na hora.
+        """
+        pagina, origem = None, CONSULTA
+        entrada = self._paginas.get(numero)
+        if entrada is not None:
+            try:
+                pagina, origem = entrada.futuro.result(), entrada.origem
+                entrada.origem = JANELA
+            except Exception:
+                del self._paginas[numero]
+
+        if pagina is None:
+            pagina = self._buscar(cursor, pular)
+            futuro = Future()
+            futuro.set_result(pagina)
+            self._paginas[numero] = _Entrada(futuro, None, JANELA)
+
+        self.contadores[origem] += 1
+        self._atual = numero
+        self._descartar_fora_da_janela()
+        return pagina, origem
+
+    def antecipar(self, numero: int, cursor: Optional[str]):
+        """
+        Começa a buscar a página `numero` (a partir do token `cursor`) em
+        segundo plano. Não faz nada se não houver cursor, se a página já
+        estiver guardada ou se ela ficar fora da janela.
+        """
+        if self._fechada or cursor is None or numero in self._paginas:
+            return
+        if abs(numero - self._atual) > self.raio:
+            return
+        if self._executor is None:
+            # uma thread só: no máximo uma consulta antecipada por vez
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="paginas")
+        cancelamento = self._novo_cancelamento() if self._novo_cancelamento else None
+        futuro = self._executor.submit(self._buscar_em_segundo_plano, cursor, cancelamento)
+        self._paginas[numero] = _Entrada(futuro, cancelamento, ANTECIPADA)
+
+    def _buscar_em_segundo_plano(self, cursor: str, cancelamento) -> Pagina:
+        if cancelamento is None:
+            return self._buscar(cursor, 0)
+        with cancelamento:
+            return self._buscar(cursor, 0)
+
+    def _descartar_fora_da_janela(self):
+        for numero in [n for n in self._paginas if abs(n - self._atual) > self.raio]:
+            self._cancelar(self._paginas.pop(numero))
+
+    def _cancelar(self, entrada: _Entrada):
+        if entrada.futuro.done():
+            return
+        self.contadores["canceladas"] += 1
+        # ainda na fila: nem começa; já rodando: cancela a consulta
+        if not entrada.futuro.cancel() and entrada.cancelamento is not None:
+            entrada.cancelamento.cancelar()
+
+    def fechar(self):
+        """
+        Cancela as buscas em andamento e descarta as páginas guardadas.
+        Não espera a thread terminar.
+        """
+        self._fechada = True
+        for entrada in self._paginas.values():
+            self._cancelar(entrada)
+        self._paginas.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
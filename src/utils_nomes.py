@@ -1,6 +1,8 @@
 """
 Funções utilitárias relacionadas a nomes de pessoas.
 """
+import unicodedata
+from typing import Optional
 
 def quebrar_nome(nome_completo: str) -> tuple[str, str]:
     """
@@ -24,3 +26,22 @@ def quebrar_nome(nome_completo: str) -> tuple[str, str]:
     sobrenome = partes[-1]
     nome = " ".join(partes[:-1])
     return nome, sobrenome
+
+def normalizar_texto(texto: Optional[str]) -> Optional[str]:
+    """
+    Versão "de busca" de um nome/cidade: sem acentos, minúscula e com
+    espaços simples. É o que vai nas colunas *_norm de `clientes`.
+
+    Exemplos:
+      "São Paulo"        -> "sao paulo"
+      "  JOÃO   Conceição" -> "joao conceicao"
+      None               -> None
+
+    Deve dar o mesmo resultado que lower(f_unaccent(...)) no banco
+    (migração 0008_colunas_normalizadas.sql) para os acentos do português.
+    """
+    if texto is None:
+        return None
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acento.lower().split())
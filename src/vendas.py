@@ -5,23 +5,24 @@ Módulo de gerenciamento de vendas
 CRUD completo de vendas
 """
 
-import psycopg2
 from datetime import datetime
 
+from psycopg2.extensions import QueryCanceledError
+
+from database import com_prazo, em_cache, get_connection, get_cursor
+
 # ============================================================================
 # CONEXÃO
 # ============================================================================
 
 def conectar():
-    """Conecta ao banco de dados"""
+    """
+    Conecta ao banco de dados (mesmas variáveis PG* do .env usadas pelo resto
+    do sistema). As funções deste módulo usam get_cursor(), que pega conexões
+    do pool; conectar() fica para quem precisa de uma conexão avulsa.
+    """
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            database="sistema_clientes",
-            user="postgres",
-            password="postgres"
-        )
-        return conn
+        return get_connection()
     except Exception as e:
         print(f"\n❌ Erro ao conectar: {e}")
         return None
@@ -30,6 +31,7 @@ def conectar():
 # CRUD DE VENDAS
 # ============================================================================
 
+@com_prazo
 def adicionar_venda(cliente_id, produto_id, quantidade, observacao=""):
     """
     Adiciona uma nova venda
@@ -43,56 +45,43 @@ def adicionar_venda(cliente_id, produto_id, quantidade, observacao=""):
     Returns:
         ID da venda ou None em caso de erro
     """
-    conn = conectar()
-    if not conn:
-        return None
-    
     try:
-        cursor = conn.cursor()
-        
-        # Buscar preço do produto
-        cursor.execute("SELECT preco, estoque FROM produtos WHERE id = %s", (produto_id,))
-        resultado = cursor.fetchone()
-        
-        if not resultado:
-            print(f"\n❌ Produto ID {produto_id} não encontrado!")
-            cursor.close()
-            conn.close()
-            return None
-        
-        preco, estoque = resultado
-        
-        # Verificar estoque
-        if estoque < quantidade:
-            print(f"\n❌ Estoque insuficiente! Disponível: {estoque}, Solicitado: {quantidade}")
-            cursor.close()
-            conn.close()
-            return None
-        
-        # Calcular valor total
-        valor_unitario = float(preco)
-        valor_total = valor_unitario * quantidade
-        
-        # Inserir venda
-        query = """
-            INSERT INTO vendas (cliente_id, produto_id, quantidade, valor_unitario, valor_total, observacao)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        cursor.execute(query, (cliente_id, produto_id, quantidade, valor_unitario, valor_total, observacao))
-        venda_id = cursor.fetchone()[0]
-        
-        # Atualizar estoque
-        cursor.execute("""
-            UPDATE produtos 
-            SET estoque = estoque - %s 
-            WHERE id = %s
-        """, (quantidade, produto_id))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_cursor() as cursor:
+            # Buscar preço do produto
+            cursor.execute("SELECT preco, estoque FROM produtos WHERE id = %s", (produto_id,))
+            resultado = cursor.fetchone()
+            
+            if not resultado:
+                print(f"\n❌ Produto ID {produto_id} não encontrado!")
+                return None
+            
+            preco, estoque = resultado
+            
+            # Verificar estoque
+            if estoque < quantidade:
+                print(f"\n❌ Estoque insuficiente! Disponível: {estoque}, Solicitado: {quantidade}")
+                return None
+            
+            # Calcular valor total
+            valor_unitario = float(preco)
+            valor_total = valor_unitario * quantidade
+            
+            # Inserir venda
+            query = """
+                INSERT INTO vendas (cliente_id, produto_id, quantidade, valor_unitario, valor_total, observacao)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """
+            
+            cursor.execute(query, (cliente_id, produto_id, quantidade, valor_unitario, valor_total, observacao))
+            venda_id = cursor.fetchone()[0]
+            
+            # Atualizar estoque
+            cursor.execute("""
+                UPDATE produtos 
+                SET estoque = estoque - %s 
+                WHERE id = %s
+            """, (quantidade, produto_id))
         
         print(f"\n✅ Venda registrada com sucesso! ID: {venda_id}")
         print(f"💰 Valor total: R$ {valor_total:.2f}")
@@ -100,13 +89,13 @@ def adicionar_venda(cliente_id, produto_id, quantidade, observacao=""):
         
         return venda_id
         
+    except QueryCanceledError:
+        raise  # prazo esgotado (TempoEsgotado) ou cancelamento: quem chamou decide
     except Exception as e:
         print(f"\n❌ Erro ao adicionar venda: {e}")
-        if conn:
-            conn.rollback()
-            conn.close()
         return None
 
+@com_prazo
 def listar_vendas(limite=50):
     """
     Lista vendas com informações de cliente e produto
@@ -117,13 +106,7 @@ def listar_vendas(limite=50):
     Returns:
         Lista de tuplas com dados das vendas
     """
-    conn = conectar()
-    if not conn:
-        return []
-    
     try:
-        cursor = conn.cursor()
-        
         query = """
             SELECT 
                 v.id,
@@ -140,20 +123,19 @@ def listar_vendas(limite=50):
             LIMIT %s
         """
         
-        cursor.execute(query, (limite,))
-        vendas = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor(somente_leitura=True) as cursor:
+            cursor.execute(query, (limite,))
+            vendas = cursor.fetchall()
         
         return vendas
         
+    except QueryCanceledError:
+        raise
     except Exception as e:
         print(f"\n❌ Erro ao listar vendas: {e}")
-        if conn:
-            conn.close()
         return []
 
+@com_prazo
 def buscar_venda(venda_id):
     """
     Busca uma venda por ID
@@ -164,13 +146,7 @@ def buscar_venda(venda_id):
     Returns:
         Tupla com dados da venda ou None
     """
-    conn = conectar()
-    if not conn:
-        return None
-    
     try:
-        cursor = conn.cursor()
-        
         query = """
             SELECT 
                 v.id,
@@ -189,20 +165,19 @@ def buscar_venda(venda_id):
             WHERE v.id = %s
         """
         
-        cursor.execute(query, (venda_id,))
-        venda = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor(somente_leitura=True) as cursor:
+            cursor.execute(query, (venda_id,))
+            venda = cursor.fetchone()
         
         return venda
         
+    except QueryCanceledError:
+        raise
     except Exception as e:
         print(f"\n❌ Erro ao buscar venda: {e}")
-        if conn:
-            conn.close()
         return None
 
+@com_prazo
 def vendas_por_cliente(cliente_id):
     """
     Lista vendas de um cliente específico
@@ -213,13 +188,7 @@ def vendas_por_cliente(cliente_id):
     Returns:
         Lista de tuplas com vendas do cliente
     """
-    conn = conectar()
-    if not conn:
-        return []
-    
     try:
-        cursor = conn.cursor()
-        
         query = """
             SELECT 
                 v.id,
@@ -233,20 +202,19 @@ def vendas_por_cliente(cliente_id):
             ORDER BY v.data_venda DESC
         """
         
-        cursor.execute(query, (cliente_id,))
-        vendas = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor(somente_leitura=True) as cursor:
+            cursor.execute(query, (cliente_id,))
+            vendas = cursor.fetchall()
         
         return vendas
         
+    except QueryCanceledError:
+        raise
     except Exception as e:
         print(f"\n❌ Erro ao buscar vendas do cliente: {e}")
-        if conn:
-            conn.close()
         return []
 
+@com_prazo
 def vendas_por_produto(produto_id):
     """
     Lista vendas de um produto específico
@@ -257,13 +225,7 @@ def vendas_por_produto(produto_id):
     Returns:
         Lista de tuplas com vendas do produto
     """
-    conn = conectar()
-    if not conn:
-        return []
-    
     try:
-        cursor = conn.cursor()
-        
         query = """
             SELECT 
                 v.id,
@@ -277,20 +239,19 @@ def vendas_por_produto(produto_id):
             ORDER BY v.data_venda DESC
         """
         
-        cursor.execute(query, (produto_id,))
-        vendas = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with get_cursor(somente_leitura=True) as cursor:
+            cursor.execute(query, (produto_id,))
+            vendas = cursor.fetchall()
         
         return vendas
         
+    except QueryCanceledError:
+        raise
     except Exception as e:
         print(f"\n❌ Erro ao buscar vendas do produto: {e}")
-        if conn:
-            conn.close()
         return []
 
+@com_prazo
 def cancelar_venda(venda_id):
     """
     Cancela uma venda e devolve o estoque
@@ -301,60 +262,49 @@ def cancelar_venda(venda_id):
     Returns:
         True se cancelada com sucesso, False caso contrário
     """
-    conn = conectar()
-    if not conn:
-        return False
-    
     try:
-        cursor = conn.cursor()
-        
-        # Buscar dados da venda
-        cursor.execute("""
-            SELECT produto_id, quantidade 
-            FROM vendas 
-            WHERE id = %s
-        """, (venda_id,))
-        
-        resultado = cursor.fetchone()
-        
-        if not resultado:
-            print(f"\n❌ Venda ID {venda_id} não encontrada!")
-            cursor.close()
-            conn.close()
-            return False
-        
-        produto_id, quantidade = resultado
-        
-        # Devolver ao estoque
-        cursor.execute("""
-            UPDATE produtos 
-            SET estoque = estoque + %s 
-            WHERE id = %s
-        """, (quantidade, produto_id))
-        
-        # Deletar venda
-        cursor.execute("DELETE FROM vendas WHERE id = %s", (venda_id,))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_cursor() as cursor:
+            # Buscar dados da venda
+            cursor.execute("""
+                SELECT produto_id, quantidade 
+                FROM vendas 
+                WHERE id = %s
+            """, (venda_id,))
+            
+            resultado = cursor.fetchone()
+            
+            if not resultado:
+                print(f"\n❌ Venda ID {venda_id} não encontrada!")
+                return False
+            
+            produto_id, quantidade = resultado
+            
+            # Devolver ao estoque
+            cursor.execute("""
+                UPDATE produtos 
+                SET estoque = estoque + %s 
+                WHERE id = %s
+            """, (quantidade, produto_id))
+            
+            # Deletar venda
+            cursor.execute("DELETE FROM vendas WHERE id = %s", (venda_id,))
         
         print(f"\n✅ Venda cancelada com sucesso!")
         print(f"📦 Estoque devolvido: +{quantidade} unidades")
         
         return True
         
+    except QueryCanceledError:
+        raise
     except Exception as e:
         print(f"\n❌ Erro ao cancelar venda: {e}")
-        if conn:
-            conn.rollback()
-            conn.close()
         return False
 
 # ============================================================================
 # ESTATÍSTICAS
 # ============================================================================
 
+@com_prazo
 def estatisticas_vendas():
     """
     Retorna estatísticas gerais de vendas
@@ -362,8 +312,12 @@ def estatisticas_vendas():
     Returns:
         Dicionário com estatísticas
     """
-    conn = conectar()
-    if not conn:
+    try:
+        return _consultar_estatisticas_vendas()
+    except QueryCanceledError:
+        raise
+    except Exception as e:
+        print(f"\n❌ Erro ao buscar estatísticas: {e}")
         return {
             'total_vendas': 0,
             'total_faturado': 0.0,
@@ -371,12 +325,15 @@ def estatisticas_vendas():
             'top_produtos': [],
             'top_clientes': []
         }
-    
-    try:
-        cursor = conn.cursor()
-        
-        stats = {}
-        
+
+# Guardado em cache (src/cache.py) até vendas, produtos ou clientes mudarem:
+# os relatórios de src/main.py chamam estatisticas_vendas() um atrás do outro.
+# Fica fora do try de estatisticas_vendas() para um erro não ir para o cache.
+@em_cache("vendas", "produtos", "clientes")
+def _consultar_estatisticas_vendas():
+    stats = {}
+
+    with get_cursor(somente_leitura=True) as cursor:
         # Total de vendas e faturamento
         cursor.execute("""
             SELECT 
@@ -385,12 +342,12 @@ def estatisticas_vendas():
                 COALESCE(AVG(valor_total), 0) as ticket_medio
             FROM vendas
         """)
-        
+    
         resultado = cursor.fetchone()
         stats['total_vendas'] = resultado[0] if resultado else 0
         stats['total_faturado'] = float(resultado[1]) if resultado else 0.0
         stats['ticket_medio'] = float(resultado[2]) if resultado else 0.0
-        
+    
         # Top 5 produtos mais vendidos
         cursor.execute("""
             SELECT 
@@ -403,7 +360,7 @@ def estatisticas_vendas():
             LIMIT 5
         """)
         stats['top_produtos'] = cursor.fetchall()
-        
+    
         # Top 5 clientes que mais compraram
         cursor.execute("""
             SELECT 
@@ -416,27 +373,13 @@ def estatisticas_vendas():
             LIMIT 5
         """)
         stats['top_clientes'] = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return stats
-        
-    except Exception as e:
-        print(f"\n❌ Erro ao buscar estatísticas: {e}")
-        if conn:
-            conn.close()
-        return {
-            'total_vendas': 0,
-            'total_faturado': 0.0,
-            'ticket_medio': 0.0,
-            'top_produtos': [],
-            'top_clientes': []
-        }
+    
+    return stats
 
 # Alias para compatibilidade
 estatisticas_vendas_v2 = estatisticas_vendas
 
+@com_prazo
 def contar_vendas():
     """
     Conta o total de vendas
@@ -444,21 +387,15 @@ def contar_vendas():
     Returns:
         Número total de vendas
     """
-    conn = conectar()
-    if not conn:
-        return 0
-    
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM vendas")
-        total = cursor.fetchone()[0]
-        cursor.close()
-        conn.close()
+        with get_cursor(somente_leitura=True) as cursor:
+            cursor.execute("SELECT COUNT(*) FROM vendas")
+            total = cursor.fetchone()[0]
         return total
+    except QueryCanceledError:
+        raise
     except Exception as e:
         print(f"\n❌ Erro ao contar vendas: {e}")
-        if conn:
-            conn.close()
         return 0
 
 # ============================================================================
@@ -0,0 +1,315 @@
+import pickle
+
+import pytest
+
+from src.cache import (
+    FALTA, AssinaturaInvalida, BackendPostgres, CacheResultados, assinar, chave_argumentos, conferir,
+)
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+class BackendMemoria:
+    """Backend com a mesma invalidação por geração do BackendPostgres."""
+
+    def __init__(self):
+        self.dados = {}
+        self.invalidadas = {}
+        self.relogio = 0
+
+    def agora(self):
+        self.relogio += 1
+        return self.relogio
+
+    def ler(self, chave):
+        if chave not in self.dados:
+            return None
+        dados, tabelas, calculado_em = self.dados[chave]
+        if any(self.invalidadas.get(t, 0) >= calculado_em for t in tabelas):
+            return None
+        return dados
+
+    def gravar(self, chave, dados, tabelas, ttl, calculado_em=None):
+        self.dados[chave] = (dados, tabelas, calculado_em or self.agora())
+
+    def invalidar(self, tabela):
+        self.invalidadas[tabela] = self.agora()
+
+    def limpar(self):
+        self.dados.clear()
+
+
+def chave(funcao, *args, **kwargs):
+    return (funcao, chave_argumentos(args, kwargs))
+
+
+def test_chave_ignora_ordem_dos_argumentos_nomeados():
+    assert chave_argumentos((), {"a": 1, "b": 2}) == chave_argumentos((), {"b": 2, "a": 1})
+    assert chave_argumentos((10,), {}) != chave_argumentos((5,), {})
+
+
+def test_guardar_e_obter_devolve_copia():
+    cache = CacheResultados()
+    k = chave("ranking_ufs", 10)
+    assert cache.obter(k) is FALTA
+
+    cache.guardar(k, [("SP", 10)], ("clientes",))
+    valor = cache.obter(k)
+    assert valor == [("SP", 10)]
+
+    valor.append(("RJ", 5))
+    assert cache.obter(k) == [("SP", 10)]
+
+
+def test_none_e_um_resultado_valido():
+    cache = CacheResultados()
+    cache.guardar(("f", ""), None, ())
+    assert cache.obter(("f", "")) is None
+
+
+def test_ttl_expira():
+    relogio = Relogio()
+    cache = CacheResultados(ttl=60, relogio=relogio)
+    cache.guardar(("a", ""), 1, ())
+    cache.guardar(("b", ""), 2, (), ttl=5)
+
+    relogio.agora += 10
+    assert cache.obter(("a", "")) == 1
+    assert cache.obter(("b", "")) is FALTA
+
+    relogio.agora += 60
+    assert cache.obter(("a", "")) is FALTA
+    assert cache.stats()["itens"] == 0
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CacheResultados(max_itens=2)
+    cache.guardar(("a", ""), 1, ())
+    cache.guardar(("b", ""), 2, ())
+    cache.obter(("a", ""))
+    cache.guardar(("c", ""), 3, ())
+
+    assert cache.obter(("b", "")) is FALTA
+    assert cache.obter(("a", "")) == 1
+    assert cache.obter(("c", "")) == 3
+    assert cache.stats()["descartados_lru"] == 1
+
+
+def test_invalidar_descarta_so_quem_depende_da_tabela():
+    cache = CacheResultados()
+    cache.guardar(("clientes", ""), 1, ("clientes",))
+    cache.guardar(("vendas", ""), 2, ("vendas", "produtos", "clientes"))
+    cache.guardar(("produtos", ""), 3, ("produtos",))
+
+    assert cache.invalidar("clientes") == 2
+    assert cache.obter(("clientes", "")) is FALTA
+    assert cache.obter(("vendas", "")) is FALTA
+    assert cache.obter(("produtos", "")) == 3
+    assert cache.invalidar("clientes") == 0
+
+
+def test_marca_impede_guardar_resultado_de_antes_da_invalidacao():
+    cache = CacheResultados()
+    marca = cache.marca(("clientes",))
+    cache.invalidar("clientes")
+
+    assert cache.guardar(("f", ""), 1, ("clientes",), marca=marca) is False
+    assert cache.obter(("f", "")) is FALTA
+
+    # invalidação de outra tabela não atrapalha
+    marca = cache.marca(("clientes",))
+    cache.invalidar("vendas")
+    assert cache.guardar(("f", ""), 1, ("clientes",), marca=marca) is True
+
+
+def test_limpar_esvazia_e_muda_a_marca():
+    cache = CacheResultados()
+    cache.guardar(("f", ""), 1, ("clientes",))
+    marca = cache.marca(("clientes",))
+    cache.limpar()
+
+    assert cache.obter(("f", "")) is FALTA
+    assert cache.guardar(("f", ""), 1, ("clientes",), marca=marca) is False
+
+
+def test_valido_desde_ignora_resultado_anterior():
+    relogio = Relogio()
+    cache = CacheResultados(relogio=relogio)
+    cache.guardar(("f", ""), 1, ())
+    escrita = relogio.agora + 1
+    relogio.agora += 2
+
+    assert cache.obter(("f", ""), valido_desde=escrita) is FALTA
+    cache.guardar(("f", ""), 2, ())
+    assert cache.obter(("f", ""), valido_desde=escrita) == 2
+
+
+def test_stats_por_funcao():
+    cache = CacheResultados()
+    cache.obter(("a", ""))
+    cache.guardar(("a", ""), 1, ())
+    cache.obter(("a", ""))
+    cache.obter(("a", ""))
+    cache.obter(("b", ""))
+
+    stats = cache.stats()
+    assert (stats["acertos"], stats["faltas"], stats["taxa_acerto"]) == (2, 2, 50.0)
+    assert stats["por_funcao"]["a"]["taxa_acerto"] == 66.7
+    assert stats["por_funcao"]["b"]["taxa_acerto"] == 0.0
+
+
+def test_backend_compartilhado():
+    backend = BackendMemoria()
+    um = CacheResultados(backend=backend)
+    outro = CacheResultados(backend=backend)
+
+    um.guardar(("f", ""), [1, 2], ("clientes",))
+    assert outro.obter(("f", ""), ("clientes",)) == [1, 2]
+    assert outro.stats()["por_funcao"]["f"]["acertos_backend"] == 1
+
+    # o acerto do backend fica na memória e obedece às invalidações locais
+    outro.invalidar("clientes", backend=False)
+    assert outro.obter(("f", ""), ("clientes",)) == [1, 2]
+    outro.invalidar("clientes")
+    assert outro.obter(("f", ""), ("clientes",)) is FALTA
+    assert um.obter(("f", ""), ("clientes",)) == [1, 2]  # memória de `um`: o aviso dele ainda não chegou
+    um.invalidar("clientes", backend=False)
+    assert um.obter(("f", ""), ("clientes",)) is FALTA
+
+
+def test_backend_ignora_resultado_calculado_antes_da_invalidacao():
+    backend = BackendMemoria()
+    leitor = CacheResultados(backend=backend)
+    escritor = CacheResultados(backend=backend)
+
+    # o leitor começa a consulta, alguém escreve e o aviso do leitor atrasa
+    marca = leitor.marca(("clientes",))
+    escritor.invalidar("clientes")
+    assert leitor.guardar(("f", ""), "velho", ("clientes",), marca=marca) is True
+
+    # o valor velho não vale para nenhum outro processo
+    assert CacheResultados(backend=backend).obter(("f", ""), ("clientes",)) is FALTA
+
+    marca = leitor.marca(("clientes",))
+    leitor.guardar(("f", ""), "novo", ("clientes",), marca=marca)
+    assert CacheResultados(backend=backend).obter(("f", ""), ("clientes",)) == "novo"
+
+
+def test_sem_instante_do_backend_guarda_so_na_memoria():
+    backend = BackendMemoria()
+    backend.agora = lambda: (_ for _ in ()).throw(ConnectionError("fora do ar"))
+    cache = CacheResultados(backend=backend)
+
+    marca = cache.marca(("clientes",))
+    assert cache.guardar(("f", ""), 1, ("clientes",), marca=marca) is True
+    assert cache.obter(("f", "")) == 1
+    assert backend.dados == {}
+    assert cache.stats()["erros_backend"] == 1
+
+
+def test_backend_com_erro_nao_derruba_o_cache():
+    class BackendQuebrado:
+        def ler(self, chave):
+            raise ConnectionError("fora do ar")
+
+        gravar = invalidar = limpar = agora = ler
+
+    cache = CacheResultados(backend=BackendQuebrado())
+    assert cache.obter(("f", "")) is FALTA
+    assert cache.guardar(("f", ""), 1, ()) is True
+    assert cache.obter(("f", "")) == 1
+    cache.invalidar("clientes")
+    assert cache.stats()["erros_backend"] == 3
+
+
+def test_assinatura_confere_so_com_o_mesmo_segredo_e_chave():
+    valor = assinar(b"segredo", "f:()", b"dados")
+    assert conferir(b"segredo", "f:()", valor) == b"dados"
+
+    for segredo, k, v in [
+        (b"outro", "f:()", valor),
+        (b"segredo", "g:()", valor),
+        (b"segredo", "f:()", valor[:-1] + b"X"),
+        (b"segredo", "f:()", b"curto"),
+    ]:
+        with pytest.raises(AssinaturaInvalida):
+            conferir(segredo, k, v)
+
+
+class ConexaoTabela:
+    """Conexão falsa com a tabela cache_resultados num dict (chave -> valor)."""
+
+    closed = False
+
+    def __init__(self):
+        self.linhas = {}
+        self.description = None
+        self.comandos = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        comando = " ".join(sql.split()[:3])
+        self.comandos.append(comando)
+        self.description = None
+        if comando == "SELECT clock_timestamp()":
+            self.description = True
+            self._linha = (len(self.comandos),)
+        elif comando.startswith("SELECT"):
+            self.description = True
+            self._linha = (self.linhas[params[0]],) if params[0] in self.linhas else None
+        elif comando == "INSERT INTO cache_resultados":
+            self.linhas[params[0]] = params[1]
+
+    def close(self):
+        self.closed = True
+
+    def fetchone(self):
+        return self._linha
+
+
+def test_backend_postgres_nao_desserializa_valor_sem_assinatura():
+    conn = ConexaoTabela()
+    cache = CacheResultados(backend=BackendPostgres(lambda: conn, b"segredo"))
+    outro = CacheResultados(backend=BackendPostgres(lambda: conn, b"segredo"))
+
+    cache.guardar(("f", ""), [1, 2], ("clientes",))
+    assert outro.obter(("f", ""), ("clientes",)) == [1, 2]
+
+    # alguém grava direto na tabela um pickle qualquer
+    conn.linhas["g:"] = pickle.dumps("malicioso")
+    assert outro.obter(("g", "")) is FALTA
+    assert outro.stats()["erros_backend"] == 1
+
+
+def test_backend_postgres_limita_espera_e_reaproveita_conexao():
+    conexoes = []
+
+    def conectar():
+        conexoes.append(ConexaoTabela())
+        return conexoes[-1]
+
+    backend = BackendPostgres(conectar, b"segredo", timeout_ms=50)
+    backend.gravar("f:", b"dados", ("clientes",), 60)
+    assert backend.ler("f:") == b"dados"
+
+    assert len(conexoes) == 1
+    assert conexoes[0].comandos[:2] == ["SET lock_timeout =", "SET statement_timeout ="]
+
+
+def test_backend_postgres_exige_segredo():
+    with pytest.raises(ValueError):
+        BackendPostgres(lambda: None, b"")
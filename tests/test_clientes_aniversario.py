@@ -0,0 +1,31 @@
+from datetime import date
+
+import pytest
+
+from src.clientes import _faixa_mes, _faixas_janela
+
+
+def test_faixa_mes():
+    assert _faixa_mes(3) == (301, 331)
+    assert _faixa_mes(12) == (1201, 1231)
+
+
+def test_janela_dentro_do_ano():
+    assert _faixas_janela(date(2026, 3, 1), 10) == (301, 310, 1, 0)
+    assert _faixas_janela(date(2026, 10, 18), 1) == (1018, 1018, 1, 0)
+
+
+def test_janela_vira_o_ano():
+    assert _faixas_janela(date(2026, 12, 20), 22) == (1220, 1231, 101, 110)
+    assert _faixas_janela(date(2026, 12, 31), 2) == (1231, 1231, 101, 101)
+
+
+def test_janela_inclui_29_de_fevereiro_em_ano_nao_bissexto():
+    inicio, fim, _, _ = _faixas_janela(date(2027, 2, 27), 3)
+    assert inicio <= 229 <= fim
+
+
+def test_janela_ano_inteiro_e_dias_invalidos():
+    assert _faixas_janela(date(2026, 6, 1), 400) == (101, 1231, 1, 0)
+    with pytest.raises(ValueError):
+        _faixas_janela(date(2026, 6, 1), 0)
@@ -0,0 +1,83 @@
+import pytest
+
+from src.clientes import (
+    FiltrosClientes,
+    _compilar_busca,
+    _compilar_contagem,
+    _compilar_listagem,
+    _forma_filtros,
+    _linhas_estimadas,
+    _montar_contagem,
+)
+from src.paginacao import ANTES, DEPOIS
+
+
+def test_forma_em_ordem_fixa_e_parametros():
+    forma, params = _forma_filtros(
+        FiltrosClientes(mes_aniversario=3, vip=True, status_cliente="ativo", uf="sp")
+    )
+    assert forma == ("uf", "status_cliente", "vip", "mes_aniversario")
+    assert params == ("SP", "ativo", 301, 331)
+
+
+def test_vip_false_vira_nao_vip():
+    forma, params = _forma_filtros(FiltrosClientes(vip=False, cidade="paulo"))
+    assert forma == ("nao_vip", "cidade")
+    assert params == ("%paulo%",)
+
+
+def test_sobrenome_com_curinga_vira_like():
+    assert _forma_filtros(FiltrosClientes(sobrenome="Conceição")) == (("sobrenome",), ("conceicao",))
+    forma, params = _forma_filtros(FiltrosClientes(sobrenome="Silv%"))
+    assert forma == ("sobrenome_padrao",)
+    assert params == ("silv%",)
+    assert "sobrenome_norm LIKE %s" in _compilar_contagem(forma, "exato")
+
+
+def test_sem_filtros():
+    assert _forma_filtros(FiltrosClientes()) == ((), ())
+
+
+def test_mes_invalido():
+    with pytest.raises(ValueError):
+        _forma_filtros(FiltrosClientes(mes_aniversario=13))
+
+
+def test_mesma_forma_mesmo_sql():
+    forma_sp, _ = _forma_filtros(FiltrosClientes(uf="SP", vip=True))
+    forma_rj, _ = _forma_filtros(FiltrosClientes(uf="RJ", vip=True))
+    assert forma_sp == forma_rj
+    assert _compilar_busca(forma_sp, DEPOIS, False, False) is _compilar_busca(forma_rj, DEPOIS, False, False)
+
+
+def test_sql_compilado():
+    sql = _compilar_busca(("uf", "vip"), ANTES, True, False)
+    assert "(uf = %s) AND (vip)" in sql
+    assert "(nome, id) < (%s, %s)" in sql
+    assert sql.rstrip().endswith("ORDER BY nome DESC, id DESC LIMIT %s")
+    assert sql.count("%s") == 4
+
+
+def test_sql_contagem():
+    assert _compilar_contagem((), "exato") == "SELECT COUNT(*) FROM clientes"
+    assert _compilar_contagem(("uf", "vip"), "estimado") == (
+        "EXPLAIN (FORMAT JSON) SELECT 1 FROM clientes WHERE (uf = %s) AND (vip)"
+    )
+
+
+def test_linhas_estimadas():
+    plano = [{"Plan": {"Node Type": "Index Only Scan", "Plan Rows": 95999}}]
+    assert _linhas_estimadas(plano) == 95999
+
+
+def test_modo_de_contagem_invalido():
+    with pytest.raises(ValueError):
+        _montar_contagem("aproximado", None)
+
+
+def test_sql_listagem_rolavel():
+    sql = _compilar_listagem(("uf", "vip"))
+    assert "WHERE (uf = %s) AND (vip)" in sql
+    assert sql.rstrip().endswith("ORDER BY nome, id")
+    assert "LIMIT" not in sql
+    assert "WHERE" not in _compilar_listagem(())
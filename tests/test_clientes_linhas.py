@@ -0,0 +1,101 @@
+import pickle
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.clientes import ClienteRow, CursorClientes
+from src.clientes_async import _linha_cliente
+
+VALORES = (
+    7, "Ana", "Souza", "ana@x.com", "11999990000", "Campinas", "SP",
+    "ativo", True, "2026-03-01 12:30:45.123456", "1990-05-03",
+)
+
+
+def test_desempacota_como_a_tupla():
+    linha = ClienteRow(*VALORES)
+    (id_, nome, sobrenome, email, telefone, cidade, uf,
+     status_cliente, vip, criado_em, data_nascimento) = linha
+
+    assert (id_, nome, cidade, uf, vip) == (7, "Ana", "Campinas", "SP", True)
+    assert criado_em == datetime(2026, 3, 1, 12, 30, 45, 123456)
+    assert data_nascimento == date(1990, 5, 3)
+    assert len(linha) == 11
+    assert (linha[1], linha[0], linha[-1]) == ("Ana", 7, date(1990, 5, 3))
+    assert linha[5:7] == ("Campinas", "SP")
+
+
+def test_datas_convertidas_so_quando_lidas():
+    linha = ClienteRow(*VALORES)
+    assert linha._criado_em == "2026-03-01 12:30:45.123456"
+
+    assert linha.criado_em == datetime(2026, 3, 1, 12, 30, 45, 123456)
+    assert isinstance(linha._criado_em, datetime)
+
+    sem_data = ClienteRow(*VALORES[:9], datetime(2026, 1, 1), None)
+    assert sem_data.criado_em == datetime(2026, 1, 1)
+    assert sem_data.data_nascimento is None
+
+
+def test_datas_infinitas_e_antes_de_cristo():
+    linha = ClienteRow(*VALORES[:9], "infinity", "-infinity")
+    assert linha.criado_em == datetime.max
+    assert linha.data_nascimento == date.min
+
+    antiga = ClienteRow(*VALORES[:9], "-infinity", "0044-03-15 BC")
+    assert antiga.criado_em == datetime.min
+    assert antiga.data_nascimento == date.min
+    assert ClienteRow(*VALORES[:9], "0044-03-15 12:00:00+00 BC", "infinity").criado_em == datetime.min
+    assert ClienteRow(*VALORES[:10], "infinity").data_nascimento == date.max
+
+
+def test_campos_nao_podem_ser_alterados():
+    linha = ClienteRow(*VALORES)
+    with pytest.raises(AttributeError):
+        linha.nome = "Bia"
+    with pytest.raises(AttributeError):
+        del linha.cidade
+    assert linha.nome == "Ana"
+    assert {linha, ClienteRow(*VALORES)} == {linha}
+
+
+def test_igualdade_com_tupla_e_pickle():
+    linha = ClienteRow(*VALORES)
+    convertida = tuple(linha)
+
+    assert linha == convertida
+    assert linha == ClienteRow(*convertida)
+    assert hash(linha) == hash(ClienteRow(*convertida))
+    assert linha != convertida[:10]
+    assert pickle.loads(pickle.dumps(linha)) == linha
+
+
+def test_asdict_e_sem_dict_por_linha():
+    linha = ClienteRow(*VALORES)
+    assert linha._asdict()["status_cliente"] == "ativo"
+    assert list(linha._asdict()) == list(ClienteRow.CAMPOS)
+    assert not hasattr(linha, "__dict__")
+
+
+def test_compartilha_so_cidade_uf_e_status():
+    cursor = SimpleNamespace(_textos={})
+    cursor._repetido = lambda valor: CursorClientes._repetido(cursor, valor)
+
+    def montar(valores):
+        # textos novos a cada linha, como os que o psycopg2 cria
+        return CursorClientes._montar(cursor, tuple(
+            "".join(list(v)) if isinstance(v, str) else v for v in valores
+        ))
+
+    um, outro = montar(VALORES), montar(VALORES)
+    assert um.cidade is outro.cidade and um.uf is outro.uf
+    assert um.status_cliente is outro.status_cliente
+    assert set(cursor._textos) == {"Campinas", "SP", "ativo"}
+    assert um == outro
+
+
+def test_async_devolve_cliente_row():
+    linha = _linha_cliente(None)(VALORES)
+    assert isinstance(linha, ClienteRow)
+    assert linha == ClienteRow(*VALORES)
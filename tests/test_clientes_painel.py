@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from src.clientes import _montar_painel
+
+AGORA = datetime(2026, 3, 1, 12, 0, 0)
+
+# (nivel, uf, cidade, qtde, ativos, inativos, vips), como em _SQL_PAINEL
+LINHAS = [
+    (0, "SP", "Campinas", 3, 2, 1, 0),
+    (0, "SP", "São Paulo", 5, 4, 1, 1),
+    (0, "SP", None, 1, 1, 0, 0),
+    (0, "RJ", "Niterói", 2, 2, 0, 1),
+    (0, "RJ", "Macaé", 0, 0, 0, 0),
+    (0, None, None, 4, 3, 1, 0),
+    (1, "SP", None, 9, 7, 2, 1),
+    (1, "RJ", None, 2, 2, 0, 1),
+    (1, "MG", None, 0, 0, 0, 0),
+    (1, None, None, 4, 3, 1, 0),
+    (3, None, None, 15, 12, 3, 2),
+]
+
+
+def test_totais_e_estatisticas():
+    painel = _montar_painel(LINHAS, AGORA)
+
+    assert (painel.total, painel.ativos, painel.inativos, painel.vips) == (15, 12, 3, 2)
+    assert painel.estatisticas() == {"total": 15, "ativos": 12, "inativos": 3, "vips": 2}
+    assert painel.gerado_em == AGORA
+
+
+def test_rankings_ordenados_sem_grupos_vazios_ou_sem_nome():
+    painel = _montar_painel(LINHAS, AGORA)
+
+    assert painel.ranking_ufs() == [("SP", 9), ("RJ", 2)]
+    assert painel.ranking_ufs(1) == [("SP", 9)]
+    assert painel.ranking_cidades("sp") == [("São Paulo", 5), ("Campinas", 3)]
+    assert painel.ranking_cidades("RJ") == [("Niterói", 2)]
+    assert painel.ranking_cidades("MG") == []
+
+
+def test_sem_clientes():
+    painel = _montar_painel([(3, None, None, 0, 0, 0, 0)], AGORA)
+
+    assert painel.total == 0
+    assert painel.ranking_ufs() == []
@@ -0,0 +1,45 @@
+import pytest
+
+from src.clientes import (
+    _SQL_PESQUISA_TEXTO,
+    _SQL_PESQUISA_TEXTO_CANDIDATOS,
+    _consulta_texto,
+    _escapar_like,
+    _montar_pesquisa,
+    _params_cidade,
+    _params_pesquisa,
+)
+
+
+def test_consulta_texto_palavras_viram_prefixos():
+    assert _consulta_texto("Carl Oliv") == "carl:* & oliv:*"
+    assert _consulta_texto("Jo Silva") == "jo:* & silva:*"
+
+
+def test_consulta_texto_ignora_pontuacao_e_sublinhado():
+    assert _consulta_texto(" ana_silva@fake.com ") == "ana:* & silva:* & fake:* & com:*"
+    assert _consulta_texto("São Paulo!") == "são:* & paulo:*"
+
+
+def test_consulta_texto_vazia():
+    assert _consulta_texto("  ;:& |!() ") == ""
+
+
+def test_escapar_like_curingas_valem_literalmente():
+    assert _escapar_like("50%_off") == "50\\%\\_off"
+    assert _escapar_like("a\\b") == "a\\\\b"
+    assert _params_cidade("São_Paulo%") == ("%sao\\_paulo\\%%",)
+
+
+def test_params_pesquisa_normaliza_o_texto():
+    assert _params_pesquisa("  São PAULO ", 20) == ("sao paulo", "sao paulo", 20)
+
+
+def test_pesquisa_ordena_todas_as_linhas_por_padrao():
+    assert _montar_pesquisa("silva", 20, None) == (_SQL_PESQUISA_TEXTO, ("silva", 20))
+
+
+def test_pesquisa_com_candidatos_e_opcional_e_validada():
+    assert _montar_pesquisa("silva", 20, 500) == (_SQL_PESQUISA_TEXTO_CANDIDATOS, ("silva", 500, 20))
+    with pytest.raises(ValueError):
+        _montar_pesquisa("silva", 20, 10)
@@ -0,0 +1,155 @@
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from src import database
+from src.database import CursorRolavel
+
+
+class Servidor:
+    """Cursores WITH HOLD de uma conexão, como o PostgreSQL os trata."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.cursores = {}      # nome -> "pronto" | "falho"
+        self.declarando = None  # DECLARE ainda sem COMMIT
+        self.cancelar_proximo_fetch = False
+        self.declaracoes = 0
+        self.rotulos = []
+
+
+class CursorFalso:
+    rotulo = None  # como CursorInstrumentado
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.rowcount = -1
+        self._resultado = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def execute(self, sql, params=None):
+        srv = self.servidor
+        srv.rotulos.append(self.rotulo)
+        self.rotulo = None
+        palavras = sql.split()
+        comando, nome = palavras[0], palavras[-1]
+        if comando == "DECLARE":
+            srv.declarando = palavras[1]
+            srv.declaracoes += 1
+        elif comando == "CLOSE":
+            if nome not in srv.cursores:
+                raise psycopg2.ProgrammingError(f'cursor "{nome}" does not exist')
+            del srv.cursores[nome]
+        elif comando in ("MOVE", "FETCH"):
+            if srv.cursores.get(nome) == "falho":
+                raise psycopg2.OperationalError(f'portal "{nome}" cannot be run')
+            if comando == "FETCH" and srv.cancelar_proximo_fetch:
+                srv.cancelar_proximo_fetch = False
+                srv.cursores[nome] = "falho"
+                raise extensions.QueryCanceledError("canceling statement due to user request")
+            if palavras[1:3] == ["FORWARD", "ALL"]:
+                self.rowcount = len(srv.linhas)
+            elif comando == "MOVE":
+                self._posicao = params[0]
+            else:
+                self._resultado = srv.linhas[self._posicao:self._posicao + params[0]]
+
+    def fetchall(self):
+        return list(self._resultado)
+
+
+class ConexaoFalsa:
+    closed = False
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+
+    def cursor(self, cursor_factory=None):
+        return CursorFalso(self.servidor)
+
+    def commit(self):
+        if self.servidor.declarando:
+            self.servidor.cursores[self.servidor.declarando] = "pronto"
+            self.servidor.declarando = None
+
+    def rollback(self):
+        self.servidor.declarando = None
+
+
+class PoolFalso:
+    timeout = 30
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.devolvidas = []
+
+    def getconn(self, timeout=None):
+        return self.conn
+
+    def putconn(self, conn, descartar=False):
+        self.devolvidas.append(descartar)
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    srv = Servidor([(i,) for i in range(10)])
+    pool = PoolFalso(ConexaoFalsa(srv))
+    srv.pool = pool
+    monkeypatch.setattr(database, "_escolher_pool", lambda somente_leitura: pool)
+    return srv
+
+
+def test_fetch_cancelado_fecha_e_declara_de_novo(servidor):
+    cursor = CursorRolavel("SELECT id FROM clientes", ocioso=60)
+    try:
+        assert cursor.total == 10
+        assert cursor.ler(2, 3) == [(2,), (3,), (4,)]
+
+        servidor.cancelar_proximo_fetch = True
+        with pytest.raises(extensions.QueryCanceledError):
+            cursor.ler(0, 3)
+        # o cursor falho foi fechado e a conexão continua com ele
+        assert cursor.nome not in servidor.cursores
+        assert not cursor.fechado
+
+        assert cursor.ler(5, 2) == [(5,), (6,)]
+        assert servidor.declaracoes == 2
+        assert servidor.cursores[cursor.nome] == "pronto"
+    finally:
+        cursor.fechar()
+    assert servidor.pool.devolvidas == [False]
+
+
+def test_fechar_depois_de_cancelado_nao_descarta_a_conexao(servidor):
+    cursor = CursorRolavel("SELECT id FROM clientes", ocioso=60)
+    servidor.cancelar_proximo_fetch = True
+    with pytest.raises(extensions.QueryCanceledError):
+        cursor.ler(0, 3)
+    cursor.fechar()
+
+    assert servidor.declaracoes == 1
+    assert servidor.pool.devolvidas == [False]
+
+
+def test_metricas_usam_nome_generico_do_cursor(servidor):
+    cursor = CursorRolavel("SELECT id FROM clientes WHERE uf = %s", ("SP",), ocioso=60)
+    try:
+        cursor.ler(0, 2)
+    finally:
+        cursor.fechar()
+
+    assert servidor.rotulos == [
+        "DECLARE rolavel_? SCROLL CURSOR WITH HOLD FOR SELECT id FROM clientes WHERE uf = %s",
+        "MOVE FORWARD ALL IN rolavel_?",
+        "MOVE ABSOLUTE %s IN rolavel_?",
+        "FETCH FORWARD %s FROM rolavel_?",
+        "CLOSE rolavel_?",
+    ]
@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from src.exportacao import _Escritor, montar_consulta, montar_copy
+
+
+def test_consulta_clientes_com_filtros():
+    sql, params = montar_consulta("clientes", {"uf": "sp", "vip": True})
+    assert "FROM clientes" in sql
+    assert "WHERE (uf = %s) AND (vip)" in sql
+    assert "ORDER BY" not in sql
+    assert params == ("SP",)
+
+
+def test_consulta_vendas_filtra_pelo_cliente():
+    sql, params = montar_consulta("vendas", {"status_cliente": "ativo"})
+    assert "FROM vendas" in sql
+    assert "cliente_id IN (SELECT id FROM clientes WHERE (status_cliente = %s))" in sql
+    assert params == ("ativo",)
+
+    sem_filtro, params = montar_consulta("vendas")
+    assert "WHERE" not in sem_filtro and params == ()
+
+
+def test_tabela_e_formato_invalidos():
+    with pytest.raises(ValueError):
+        montar_consulta("produtos")
+    with pytest.raises(ValueError):
+        montar_copy("SELECT 1", "xlsx")
+
+
+def test_copy_csv_e_ndjson():
+    assert montar_copy("SELECT 1", "csv") == "COPY (SELECT 1) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+    ndjson = montar_copy("SELECT 1", "ndjson")
+    assert ndjson.startswith("COPY (SELECT row_to_json(linha) FROM (SELECT 1) linha) TO STDOUT")
+    assert "FORMAT csv" in ndjson and "HEADER" not in ndjson
+
+
+def test_escritor_conta_linhas_e_avisa_progresso():
+    agora = [0.0]
+    avisos = []
+    destino = io.BytesIO()
+    escritor = _Escritor(destino, lambda linhas, s: avisos.append((linhas, s)), relogio=lambda: agora[0])
+
+    escritor.write(b"a\nb\n")
+    agora[0] = 1.5
+    escritor.write("c\n")
+    agora[0] = 2.0
+    escritor.write(b"d\n")
+
+    assert destino.getvalue() == b"a\nb\nc\nd\n"
+    assert escritor.linhas == 4
+    assert avisos == [(3, 1.5)]
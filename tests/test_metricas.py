@@ -0,0 +1,44 @@
+import pytest
+from src.metricas import Histograma, Metricas, normalizar_sql
+
+def test_histograma_percentis_com_erro_pequeno():
+    h = Histograma()
+    for ms in range(1, 1001):  # 1..1000 ms
+        h.registrar(ms)
+    assert h.total == 1000
+    assert h.percentil(50) == pytest.approx(500, rel=0.04)
+    assert h.percentil(99) == pytest.approx(990, rel=0.04)
+    assert h.percentil(100) == 1000
+    assert h.resumo()["min_ms"] == 1
+
+def test_histograma_vazio():
+    h = Histograma()
+    assert h.percentil(99) == 0.0
+    assert h.resumo() == {"total": 0}
+
+@pytest.mark.parametrize(
+    "entrada,esperado",
+    [
+        ("SELECT * FROM clientes WHERE uf = 'SP' LIMIT 20",
+         "SELECT * FROM clientes WHERE uf = ? LIMIT ?"),
+        ("SELECT id\n  FROM clientes -- comentário\n WHERE id IN (1, 2, 3)",
+         "SELECT id FROM clientes WHERE id IN (?...)"),
+        ("SELECT nome FROM clientes WHERE sobrenome ILIKE %s",
+         "SELECT nome FROM clientes WHERE sobrenome ILIKE ?"),
+        ("EXECUTE q_1a2b($1, $2)", "EXECUTE q_1a2b(?...)"),
+    ],
+)
+def test_normalizar_sql(entrada, esperado):
+    assert normalizar_sql(entrada) == esperado
+
+def test_metricas_registra_por_sql_funcao_e_lentas():
+    m = Metricas(limite_lenta_ms=100)
+    m.registrar("SELECT 1", 5.0, linhas=1, funcao="mod.rapida")
+    m.registrar("SELECT 2", 150.0, linhas=3, espera_ms=2.0, funcao="mod.lenta")
+
+    snap = m.snapshot()
+    assert snap["por_sql"]["SELECT ?"]["chamadas"] == 2
+    assert snap["por_sql"]["SELECT ?"]["linhas"] == 4
+    assert snap["por_funcao"]["mod.lenta"]["espera_conexao"]["max_ms"] == 2.0
+    lentas = m.consultas_lentas()
+    assert len(lentas) == 1 and lentas[0]["funcao"] == "mod.lenta"
@@ -0,0 +1,167 @@
+import pytest
+
+from src import migracoes as runner
+from src.migracoes import DIRETORIO_MIGRACOES, carregar_migracoes, dividir_comandos
+
+
+class BancoFalso:
+    """
+    Conexão de mentira para o runner: executa os comandos da migração
+    (falhando nos que contêm `falhar_em`) e guarda o progresso e as
+    versões registradas como o PostgreSQL guardaria.
+    """
+
+    def __init__(self, falhar_em=None):
+        self.falhar_em = falhar_em
+        self.autocommit = False
+        self.executados = []
+        self.progresso = {}   # (versao, comando) -> checksum
+        self.registradas = []
+        self.commits = 0
+        self._resultado = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def commit(self):
+        self.commits += 1
+
+    def fetchall(self):
+        return self._resultado
+
+    def fetchone(self):
+        return None
+
+    def execute(self, sql, params=()):
+        if "schema_migracoes_progresso" in sql:
+            if sql.lstrip().startswith("SELECT"):
+                self._resultado = [(c, ck) for (v, c), ck in self.progresso.items() if v == params[0]]
+            elif sql.lstrip().startswith("INSERT"):
+                self.progresso[(params[0], params[1])] = params[2]
+            elif sql.lstrip().startswith("DELETE"):
+                self.progresso = {k: ck for k, ck in self.progresso.items() if k[0] != params[0]}
+            return
+        if "INSERT INTO schema_migracoes" in sql:
+            self.registradas.append(params[0])
+            return
+        if "pg_index" in sql:  # procura de índice inválido: nenhum
+            return
+        if self.falhar_em and self.falhar_em in sql:
+            raise RuntimeError(f"falhou: {sql}")
+        self.executados.append(sql)
+
+
+def test_dividir_comandos_basico():
+    sql = "CREATE TABLE a (id INT);\n\nCREATE INDEX i ON a (id);\n"
+    assert dividir_comandos(sql) == ["CREATE TABLE a (id INT)", "CREATE INDEX i ON a (id)"]
+
+
+def test_dividir_comandos_ignora_ponto_e_virgula_em_strings_e_comentarios():
+    sql = """
+    -- comentário; com ponto e vírgula
+    COMMENT ON TABLE a IS 'x; y ''z''';
+    /* bloco; /* aninhado; */ ainda comentário; */
+    SELECT ";" FROM a;
+    CREATE FUNCTION f() RETURNS INT AS $corpo$ BEGIN RETURN 1; END; $corpo$ LANGUAGE plpgsql;
+    SELECT $$;$$
+    """
+    assert dividir_comandos(sql) == [
+        "COMMENT ON TABLE a IS 'x; y ''z'''",
+        'SELECT ";" FROM a',
+        "CREATE FUNCTION f() RETURNS INT AS $corpo$ BEGIN RETURN 1; END; $corpo$ LANGUAGE plpgsql",
+        "SELECT $$;$$",
+    ]
+
+
+def test_dividir_comandos_vazio():
+    assert dividir_comandos("-- só comentário\n;;\n") == []
+
+
+def test_carregar_migracoes_ordena_e_ignora_outros_arquivos(tmp_path):
+    (tmp_path / "0010_b.sql").write_text("SELECT 2;", encoding="utf-8")
+    (tmp_path / "0002_a.sql").write_text("SELECT 1;", encoding="utf-8")
+    (tmp_path / "leia-me.sql").write_text("SELECT 3;", encoding="utf-8")
+
+    migracoes = carregar_migracoes(tmp_path)
+
+    assert [(m.versao, m.nome) for m in migracoes] == [(2, "0002_a"), (10, "0010_b")]
+    assert migracoes[0].checksum != migracoes[1].checksum
+
+
+def test_carregar_migracoes_versao_repetida(tmp_path):
+    (tmp_path / "0001_a.sql").write_text("SELECT 1;", encoding="utf-8")
+    (tmp_path / "001_b.sql").write_text("SELECT 1;", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        carregar_migracoes(tmp_path)
+
+
+def test_sem_transacao_so_com_concurrently_fora_de_comentario(tmp_path):
+    (tmp_path / "0001_a.sql").write_text(
+        "-- CONCURRENTLY aqui é só comentário\nCREATE INDEX i ON a (id);", encoding="utf-8"
+    )
+    (tmp_path / "0002_b.sql").write_text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS j ON a (id);", encoding="utf-8"
+    )
+
+    a, b = carregar_migracoes(tmp_path)
+
+    assert not a.sem_transacao
+    assert b.sem_transacao
+
+
+def test_migracoes_do_repositorio():
+    migracoes = carregar_migracoes(DIRETORIO_MIGRACOES)
+
+    versoes = [m.versao for m in migracoes]
+    assert versoes == sorted(versoes) and len(versoes) == len(set(versoes))
+    assert all(m.comandos for m in migracoes)
+
+
+def test_migracao_sem_transacao_retoma_do_comando_que_falhou(tmp_path):
+    (tmp_path / "0001_indices.sql").write_text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS i1 ON a (x);\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS i2 ON a (y);\n"
+        "ANALYZE a;\n",
+        encoding="utf-8",
+    )
+    (migracao,) = carregar_migracoes(tmp_path)
+    banco = BancoFalso(falhar_em="i2")
+
+    with pytest.raises(RuntimeError):
+        runner._aplicar(banco, migracao)
+    assert banco.progresso == {(1, 0): migracao.checksum}
+    assert banco.registradas == []
+    assert banco.autocommit is False
+
+    banco.falhar_em = None
+    banco.executados.clear()
+    runner._aplicar(banco, migracao)
+
+    # o primeiro índice não roda de novo; no fim o progresso é apagado
+    assert banco.executados == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS i2 ON a (y)",
+        "ANALYZE a",
+    ]
+    assert banco.registradas == [1]
+    assert banco.progresso == {}
+
+
+def test_progresso_de_arquivo_alterado_e_descartado(tmp_path):
+    (tmp_path / "0001_indices.sql").write_text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS i1 ON a (x);\nANALYZE a;\n", encoding="utf-8"
+    )
+    (migracao,) = carregar_migracoes(tmp_path)
+    banco = BancoFalso()
+    banco.progresso[(1, 0)] = "checksum-antigo"
+
+    runner._aplicar(banco, migracao)
+
+    assert banco.executados == ["CREATE INDEX CONCURRENTLY IF NOT EXISTS i1 ON a (x)", "ANALYZE a"]
+    assert banco.registradas == [1]
@@ -0,0 +1,189 @@
+import threading
+
+import pytest
+from src.paginacao import (
+    ANTECIPADA,
+    ANTES,
+    CONSULTA,
+    DEPOIS,
+    JANELA,
+    Pagina,
+    PaginasAntecipadas,
+    codificar_cursor,
+    decodificar_cursor,
+    montar_pagina,
+    montar_pagina_por_posicao,
+    posicao_do_token,
+)
+
+
+def chave(linha):
+    id_, nome = linha
+    return (nome, id_)
+
+
+@pytest.mark.parametrize("direcao", [DEPOIS, ANTES])
+def test_cursor_ida_e_volta(direcao):
+    token = codificar_cursor(direcao, ("João d'Ávila", 42))
+    assert decodificar_cursor(token) == (direcao, ("João d'Ávila", 42))
+
+
+@pytest.mark.parametrize("token", ["", "lixo", "W10", codificar_cursor(DEPOIS, ("Ana", 1))[:-3]])
+def test_cursor_invalido(token):
+    with pytest.raises(ValueError):
+        decodificar_cursor(token)
+
+
+def test_primeira_pagina_com_mais_linhas():
+    linhas = [(1, "Ana"), (2, "Bia"), (3, "Caio")]  # por_pagina=2 -> veio 1 a mais
+    pagina = montar_pagina(linhas, 2, DEPOIS, veio_de_cursor=False, chave=chave)
+    assert pagina.linhas == [(1, "Ana"), (2, "Bia")]
+    assert pagina.anterior is None
+    assert decodificar_cursor(pagina.proximo) == (DEPOIS, ("Bia", 2))
+
+
+def test_ultima_pagina_indo_para_frente():
+    pagina = montar_pagina([(3, "Caio")], 2, DEPOIS, veio_de_cursor=True, chave=chave)
+    assert pagina.proximo is None
+    assert decodificar_cursor(pagina.anterior) == (ANTES, ("Caio", 3))
+
+
+def test_pagina_anterior_volta_em_ordem_crescente():
+    # consulta para trás vem em ordem decrescente
+    linhas = [(3, "Caio"), (2, "Bia"), (1, "Ana")]
+    pagina = montar_pagina(linhas, 2, ANTES, veio_de_cursor=True, chave=chave)
+    assert pagina.linhas == [(2, "Bia"), (3, "Caio")]
+    assert decodificar_cursor(pagina.anterior) == (ANTES, ("Bia", 2))
+    assert decodificar_cursor(pagina.proximo) == (DEPOIS, ("Caio", 3))
+
+
+def test_pagina_vazia():
+    pagina = montar_pagina([], 20, DEPOIS, veio_de_cursor=True, chave=chave)
+    assert len(pagina) == 0
+    assert pagina.proximo is None and pagina.anterior is None
+
+
+def test_pagina_por_posicao():
+    meio = montar_pagina_por_posicao(["c", "d"], inicio=2, por_pagina=2, total=5)
+    assert (meio.proximo, meio.anterior) == ("4", "0")
+
+    ultima = montar_pagina_por_posicao(["e"], inicio=4, por_pagina=2, total=5)
+    assert (ultima.proximo, ultima.anterior) == (None, "2")
+
+    primeira = montar_pagina_por_posicao(["a", "b"], inicio=0, por_pagina=2, total=2)
+    assert (primeira.proximo, primeira.anterior) == (None, None)
+
+    assert montar_pagina_por_posicao([], inicio=10, por_pagina=2, total=5).linhas == []
+
+
+def test_posicao_do_token():
+    assert posicao_do_token(None) == 0
+    assert posicao_do_token(None, pular=40) == 40
+    assert posicao_do_token("120") == 120
+    with pytest.raises(ValueError):
+        posicao_do_token("-1")
+
+
+class BuscaFalsa:
+    """Páginas de uma linha só: o cursor é o número da página, em texto."""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def __call__(self, cursor, pular):
+        numero = int(cursor) if cursor is not None else pular
+        self.chamadas.append(numero)
+        return Pagina(linhas=[numero], proximo=str(numero + 1), anterior=str(numero - 1) if numero else None)
+
+
+def test_antecipa_a_proxima_pagina():
+    busca = BuscaFalsa()
+    janela = PaginasAntecipadas(busca, raio=2)
+    try:
+        pagina, origem = janela.obter(0)
+        assert (pagina.linhas, origem) == ([0], CONSULTA)
+
+        janela.antecipar(1, pagina.proximo)
+        pagina, origem = janela.obter(1, pagina.proximo)
+        assert (pagina.linhas, origem) == ([1], ANTECIPADA)
+
+        # voltar para uma página já exibida não consulta de novo
+        pagina, origem = janela.obter(0, pagina.anterior)
+        assert (pagina.linhas, origem) == ([0], JANELA)
+        assert busca.chamadas == [0, 1]
+    finally:
+        janela.fechar()
+
+
+def test_janela_limitada_e_raio_zero():
+    busca = BuscaFalsa()
+    janela = PaginasAntecipadas(busca, raio=1)
+    for numero in range(4):
+        janela.obter(numero, pular=numero)
+    assert sorted(janela._paginas) == [2, 3]
+    janela.antecipar(5, "5")
+    assert 5 not in janela._paginas
+    janela.fechar()
+
+    sem_antecipar = PaginasAntecipadas(busca, raio=0)
+    sem_antecipar.obter(0)
+    sem_antecipar.antecipar(1, "1")
+    assert sem_antecipar.obter(1, "1")[1] == CONSULTA
+    sem_antecipar.fechar()
+
+
+def test_antecipacao_com_erro_consulta_na_hora():
+    falhas = []
+
+    def busca(cursor, pular):
+        if cursor is not None and not falhas:
+            falhas.append(cursor)
+            raise RuntimeError("conexão caiu")
+        return Pagina(linhas=[cursor])
+
+    janela = PaginasAntecipadas(busca)
+    janela.obter(0)
+    janela.antecipar(1, "x")
+    pagina, origem = janela.obter(1, "x")
+    assert (pagina.linhas, origem) == (["x"], CONSULTA)
+    janela.fechar()
+
+
+class CancelamentoFalso:
+    def __init__(self):
+        self.cancelado = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cancelar(self):
+        self.cancelado.set()
+
+
+def test_fechar_cancela_busca_em_andamento():
+    comecou = threading.Event()
+    pedidos = []
+
+    def novo_cancelamento():
+        pedidos.append(CancelamentoFalso())
+        return pedidos[-1]
+
+    def busca(cursor, pular):
+        if cursor is None:
+            return Pagina(linhas=[0], proximo="1")
+        comecou.set()
+        # "consulta" que só termina quando for cancelada
+        assert pedidos[-1].cancelado.wait(5)
+        raise RuntimeError("cancelada")
+
+    janela = PaginasAntecipadas(busca, novo_cancelamento=novo_cancelamento)
+    pagina, _ = janela.obter(0)
+    janela.antecipar(1, pagina.proximo)
+    assert comecou.wait(5)
+    janela.fechar()
+
+    assert pedidos[0].cancelado.is_set()
+    assert janela.contadores["canceladas"] == 1
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+from psycopg2 import pool as pg_pool
+
+from src.database import ConnectionPool
+
+
+class CursorFalso:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.pings += 1
+        if self.conn.servidor_caiu:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class ConexaoFalsa:
+    def __init__(self, numero):
+        self.numero = numero
+        self.closed = 0
+        self.pings = 0
+        self.rollbacks = 0
+        self.servidor_caiu = False
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Fabrica:
+    def __init__(self):
+        self.criadas = []
+
+    def __call__(self):
+        conn = ConexaoFalsa(len(self.criadas))
+        self.criadas.append(conn)
+        return conn
+
+
+def criar_pool(**opcoes):
+    fabrica = Fabrica()
+    opcoes.setdefault("timeout", 1.0)
+    return ConnectionPool(fabrica=fabrica, **opcoes), fabrica
+
+
+def test_configuracao_invalida():
+    for minconn, maxconn in ((-1, 5), (0, 0), (3, 2)):
+        with pytest.raises(ValueError):
+            ConnectionPool(minconn=minconn, maxconn=maxconn, fabrica=Fabrica())
+
+
+def test_abre_o_minimo_e_reaproveita_a_ultima_devolvida():
+    pool, fabrica = criar_pool(minconn=2, maxconn=4)
+    assert len(fabrica.criadas) == 2
+
+    a = pool.getconn()
+    b = pool.getconn()
+    c = pool.getconn()  # nenhuma livre: abre outra
+    assert len(fabrica.criadas) == 3
+    pool.putconn(a)
+    pool.putconn(c)
+    assert pool.getconn() is c
+
+    dados = pool.stats()
+    assert dados["checkouts"] == 4 and dados["reaproveitadas"] == 3
+    assert dados["em_uso"] == 2 and dados["livres"] == 1 and dados["abertas"] == 3
+    pool.putconn(b)
+
+
+def test_cheio_espera_ate_o_timeout():
+    pool, _ = criar_pool(maxconn=1, timeout=0.05)
+    conn = pool.getconn()
+
+    with pytest.raises(pg_pool.PoolError):
+        pool.getconn()
+    dados = pool.stats()
+    assert dados["esperas"] == 1 and dados["tempo_espera_ms"] >= 50
+
+    # o timeout da chamada encurta a espera
+    inicio = time.perf_counter()
+    with pytest.raises(pg_pool.PoolError):
+        pool.getconn(timeout=0.01)
+    assert time.perf_counter() - inicio < 0.05
+    pool.putconn(conn)
+
+
+def test_quem_espera_recebe_a_conexao_devolvida():
+    pool, _ = criar_pool(maxconn=1, timeout=5)
+    conn = pool.getconn()
+    recebida = []
+    outra = threading.Thread(target=lambda: recebida.append(pool.getconn()))
+    outra.start()
+    time.sleep(0.05)
+
+    pool.putconn(conn)
+    outra.join(5)
+    assert recebida == [conn]
+    assert pool.stats()["esperas"] == 1
+
+
+def test_devolvida_quebrada_ou_descartada_libera_a_vaga():
+    pool, fabrica = criar_pool(maxconn=2)
+    a, b = pool.getconn(), pool.getconn()
+
+    pool.putconn(a, descartar=True)
+    b.close()
+    pool.putconn(b)
+    assert a.closed and b.closed
+    assert pool.stats()["abertas"] == 0 and pool.stats()["descartadas"] == 2
+
+    assert pool.getconn() is fabrica.criadas[-1]
+    assert len(fabrica.criadas) == 3
+
+
+def test_devolvida_no_meio_da_transacao_leva_rollback():
+    pool, _ = criar_pool(maxconn=1)
+    conn = pool.getconn()
+    conn.status = extensions.TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(conn)
+    assert conn.rollbacks == 1
+    assert pool.getconn() is conn
+
+
+def test_health_check_so_depois_de_ping_apos():
+    pool, fabrica = criar_pool(maxconn=2, ping_apos=60)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.pings == 0  # ficou livre há pouco: sem SELECT 1
+
+    pool.ping_apos = 0
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert conn.pings == 1
+
+    # servidor caiu: a conexão é fechada e o pool abre outra
+    conn.servidor_caiu = True
+    pool.putconn(conn)
+    nova = pool.getconn()
+    assert nova is not conn and conn.closed
+    assert nova is fabrica.criadas[-1]
+    assert pool.stats()["descartadas"] == 1
+
+
+def test_fecha_ociosas_sem_baixar_do_minimo():
+    pool, fabrica = criar_pool(minconn=1, maxconn=3, idle_timeout=0.05)
+    conexoes = [pool.getconn() for _ in range(3)]
+    for conn in conexoes:
+        pool.putconn(conn)
+    time.sleep(0.06)
+
+    conn = pool.getconn()
+    dados = pool.stats()
+    assert dados["ociosas_fechadas"] == 2 and dados["abertas"] == 1
+    assert sum(1 for c in fabrica.criadas if c.closed) == 2
+    assert not conn.closed
+    pool.putconn(conn)
+
+
+def test_descartar_ociosas_e_closeall():
+    pool, _ = criar_pool(minconn=2, maxconn=3)
+    em_uso = pool.getconn()
+
+    assert pool.descartar_ociosas() == 1
+    assert pool.stats()["abertas"] == 1
+
+    pool.closeall()
+    with pytest.raises(pg_pool.PoolError):
+        pool.getconn()
+    # a que estava em uso é fechada quando volta
+    pool.putconn(em_uso)
+    assert em_uso.closed
+    assert pool.stats()["abertas"] == 0
@@ -0,0 +1,56 @@
+import threading
+
+from src import database
+from src.database import _Replica
+
+
+class ReplicaLenta(_Replica):
+    """Réplica cuja medição de atraso fica parada até `liberar` ser setado."""
+
+    def __init__(self, atraso=0.5):
+        super().__init__("replica", "5434")
+        self.medindo = threading.Event()
+        self.liberar = threading.Event()
+        self.medicoes = 0
+        self._valor = atraso
+
+    def _medir_atraso(self, timeout):
+        self.medicoes += 1
+        self.medindo.set()
+        self.liberar.wait(5)
+        return self._valor
+
+    def get_pool(self):
+        return "pool-replica"
+
+
+def test_uma_medicao_por_vez_e_sem_atraso_enquanto_mede():
+    replica = ReplicaLenta()
+    resultado = {}
+    medidor = threading.Thread(target=lambda: resultado.setdefault("medidor", replica.atraso()))
+    medidor.start()
+    assert replica.medindo.wait(5)
+
+    # a medição ainda não terminou: quem chega agora não espera nem mede de novo
+    assert replica.atraso() is None
+    assert replica.verificada_em is None
+
+    replica.liberar.set()
+    medidor.join(5)
+    assert resultado["medidor"] == 0.5
+    assert replica.verificada_em is not None
+    assert replica.atraso() == 0.5
+    assert replica.medicoes == 1
+
+
+def test_escolher_pool_trata_atraso_desconhecido_como_indisponivel(monkeypatch):
+    replica = ReplicaLenta()
+    replica.atraso = lambda: None
+    monkeypatch.setattr(database, "_lista_replicas", [replica])
+    monkeypatch.setattr(database, "get_pool", lambda: "pool-primario")
+    monkeypatch.setattr(database._local, "ultima_escrita", None, raising=False)
+
+    assert database._escolher_pool(True) == "pool-primario"
+
+    replica.atraso = lambda: 0.5
+    assert database._escolher_pool(True) == "pool-replica"
@@ -0,0 +1,167 @@
+import time
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from src import database
+from src.database import classificar_erro, executar_com_retry, retry_stats, session
+
+
+def erro(classe, codigo=None):
+    """Erro do psycopg2 com o pgcode que o servidor mandaria (pgcode é só leitura)."""
+    return type(classe.__name__, (classe,), {"pgcode": codigo})("erro de teste")
+
+
+class ConexaoFalsa:
+    closed = False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class PoolFalso:
+    timeout = 30
+
+    def __init__(self):
+        self.ociosas_descartadas = 0
+
+    def getconn(self, timeout=None):
+        return ConexaoFalsa()
+
+    def putconn(self, conn, descartar=False):
+        pass
+
+    def descartar_ociosas(self):
+        self.ociosas_descartadas += 1
+        return 0
+
+
+class Falhas:
+    """Função que levanta os erros da lista (um por chamada) e depois devolve 'ok'."""
+
+    def __init__(self, *erros):
+        self.erros = list(erros)
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sem_espera(monkeypatch):
+    esperas = []
+    pool = PoolFalso()
+    monkeypatch.setattr(database.time, "sleep", esperas.append)
+    monkeypatch.setattr(database.random, "uniform", lambda a, b: b)
+    monkeypatch.setattr(database, "get_pool", lambda: pool)
+    monkeypatch.setattr(database._local, "operacao", None, raising=False)
+    monkeypatch.setattr(database._local, "prazo", None, raising=False)
+    monkeypatch.setenv("PGRETRY_BASE_MS", "10")
+    monkeypatch.setenv("PGRETRY_MAX_MS", "2000")
+    return SimpleNamespace(esperas=esperas, pool=pool)
+
+
+def diferenca(antes):
+    depois = retry_stats()
+    return {
+        chave: depois[chave] - antes[chave]
+        for chave in ("chamadas_repetidas", "tentativas_extras", "sucessos_apos_retry", "desistencias")
+    }
+
+
+@pytest.mark.parametrize("codigo, tipo", [
+    ("40001", "serializacao"),
+    ("40P01", "deadlock"),
+    ("57P01", "desligamento"),
+    ("08006", "conexao"),
+    ("08001", "conexao"),
+])
+def test_classifica_pelo_codigo(codigo, tipo):
+    assert classificar_erro(erro(psycopg2.OperationalError, codigo)) == tipo
+
+
+def test_classifica_erro_sem_codigo():
+    assert classificar_erro(erro(psycopg2.OperationalError)) == "conexao"
+    assert classificar_erro(erro(psycopg2.InterfaceError)) == "conexao"
+    # erros de verdade: não vale repetir
+    assert classificar_erro(erro(psycopg2.ProgrammingError, "42601")) is None
+    assert classificar_erro(erro(psycopg2.IntegrityError, "23505")) is None
+    assert classificar_erro(erro(psycopg2.DataError)) is None
+    assert classificar_erro(ValueError("não é do banco")) is None
+
+
+def test_cancelamento_nao_e_transitorio():
+    assert classificar_erro(erro(extensions.QueryCanceledError, "57014")) is None
+
+
+def test_repete_erro_transitorio_com_backoff(sem_espera):
+    antes = retry_stats()
+    funcao = Falhas(erro(psycopg2.OperationalError, "40001"), erro(psycopg2.OperationalError, "40P01"))
+
+    assert executar_com_retry(funcao) == "ok"
+    assert funcao.chamadas == 3
+    assert sem_espera.esperas == [0.01, 0.02]  # base, depois o dobro
+    assert sem_espera.pool.ociosas_descartadas == 0
+    assert diferenca(antes) == {
+        "chamadas_repetidas": 1, "tentativas_extras": 2, "sucessos_apos_retry": 1, "desistencias": 0,
+    }
+
+
+def test_queda_de_conexao_descarta_as_ociosas(sem_espera):
+    funcao = Falhas(erro(psycopg2.OperationalError))
+    assert executar_com_retry(funcao) == "ok"
+    assert sem_espera.pool.ociosas_descartadas == 1
+
+
+def test_desiste_depois_das_tentativas(sem_espera):
+    antes = retry_stats()
+    funcao = Falhas(*[erro(psycopg2.OperationalError, "40001") for _ in range(5)])
+
+    with pytest.raises(psycopg2.OperationalError):
+        executar_com_retry(funcao, tentativas=3)
+    assert funcao.chamadas == 3
+    assert diferenca(antes) == {
+        "chamadas_repetidas": 1, "tentativas_extras": 2, "sucessos_apos_retry": 0, "desistencias": 1,
+    }
+
+
+def test_nao_repete_cancelamento_nem_erro_de_verdade(sem_espera):
+    antes = retry_stats()
+    for falha in (erro(extensions.QueryCanceledError, "57014"), erro(psycopg2.ProgrammingError, "42601")):
+        funcao = Falhas(falha)
+        with pytest.raises(type(falha)):
+            executar_com_retry(funcao)
+        assert funcao.chamadas == 1
+    assert sem_espera.esperas == []
+    assert diferenca(antes)["chamadas_repetidas"] == 0
+
+
+def test_para_antes_se_a_espera_passaria_do_prazo(sem_espera, monkeypatch):
+    antes = retry_stats()
+    monkeypatch.setenv("PGRETRY_BASE_MS", "1000")
+    monkeypatch.setattr(database._local, "prazo", time.monotonic() + 0.5)
+    funcao = Falhas(erro(psycopg2.OperationalError, "40001"))
+
+    with pytest.raises(psycopg2.OperationalError):
+        executar_com_retry(funcao)
+    assert funcao.chamadas == 1
+    assert sem_espera.esperas == []
+    assert diferenca(antes)["desistencias"] == 1
+
+
+def test_nao_repete_dentro_da_sessao(sem_espera):
+    funcao = Falhas(erro(psycopg2.OperationalError, "40001"))
+
+    with pytest.raises(psycopg2.OperationalError):
+        with session():
+            executar_com_retry(funcao)
+    assert funcao.chamadas == 1
+    assert sem_espera.esperas == []
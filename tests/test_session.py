@@ -0,0 +1,143 @@
+import psycopg2
+import pytest
+
+from src import database
+from src.database import Database, get_cursor, session, ultima_operacao
+
+
+class CursorFalso:
+    description = None
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if "erro" in sql:
+            raise psycopg2.ProgrammingError("syntax error")
+        self.conn.comandos.append(sql)
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class ConexaoFalsa:
+    closed = 0
+
+    def __init__(self):
+        self.comandos = []
+        self.fim = []       # "commit" / "rollback", na ordem
+        self.sessoes = []   # argumentos de set_session
+
+    def cursor(self, cursor_factory=None):
+        return CursorFalso(self)
+
+    def commit(self):
+        self.fim.append("commit")
+
+    def rollback(self):
+        self.fim.append("rollback")
+
+    def set_session(self, **opcoes):
+        self.sessoes.append(opcoes)
+
+
+class PoolFalso:
+    timeout = 30
+
+    def __init__(self):
+        self.entregues = []
+        self.devolvidas = []
+
+    def getconn(self, timeout=None):
+        conn = ConexaoFalsa()
+        self.entregues.append(conn)
+        return conn
+
+    def putconn(self, conn, descartar=False):
+        self.devolvidas.append((conn, descartar))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    primario, replica = PoolFalso(), PoolFalso()
+    monkeypatch.setattr(database, "get_pool", lambda: primario)
+    monkeypatch.setattr(database, "_escolher_pool", lambda somente_leitura: replica if somente_leitura else primario)
+    monkeypatch.setattr(database._local, "operacao", None, raising=False)
+    monkeypatch.setattr(database._local, "prazo", None, raising=False)
+    primario.replica = replica
+    return primario
+
+
+def test_sessoes_aninhadas_usam_uma_conexao_e_um_commit(pool):
+    with session() as externa:
+        with get_cursor() as cur:
+            cur.execute("SELECT 1")
+        with session() as interna:
+            assert interna._operacao is externa._operacao
+            interna.executar("SELECT 2")
+            db = Database()
+            assert db.conectar()
+            db.buscar_todos("SELECT 3")
+            db.desconectar()
+        assert externa._operacao.profundidade == 1
+        conn = pool.entregues[0]
+        assert conn.fim == []  # nada de commit antes do fim da sessão de fora
+
+    assert len(pool.entregues) == 1
+    assert conn.comandos == ["SELECT 1", "SELECT 2", "SELECT 3"]
+    assert conn.fim == ["commit"]
+    assert pool.devolvidas == [(conn, False)]
+    assert database._local.operacao is None
+    assert ultima_operacao()["conexoes"] == 1 and ultima_operacao()["commit"]
+
+
+def test_erro_la_dentro_desfaz_a_sessao_inteira(pool):
+    with pytest.raises(psycopg2.ProgrammingError):
+        with session():
+            with session() as interna:
+                interna.executar("SELECT 1")
+                interna.executar("SELECT erro")
+
+    conn = pool.entregues[0]
+    assert conn.fim == ["rollback"]
+    assert pool.devolvidas == [(conn, False)]
+    assert not ultima_operacao()["commit"]
+
+
+def test_erro_capturado_por_quem_chamou_tambem_desfaz(pool):
+    with session():
+        try:
+            with get_cursor() as cur:
+                cur.execute("SELECT erro")
+        except psycopg2.ProgrammingError:
+            pass  # a função só imprimiu o erro
+
+    assert pool.entregues[0].fim == ["rollback"]
+
+
+def test_database_aberto_antes_vira_a_operacao(pool):
+    db = Database()
+    db.conectar()
+    with session() as s:
+        assert s._operacao is db._operacao
+    assert pool.entregues[0].fim == []
+
+    db.desconectar()
+    assert pool.entregues[0].fim == ["commit"]
+    assert db.conexoes_usadas == 1
+
+
+def test_somente_leitura_vai_para_a_replica_e_restaura_a_conexao(pool):
+    with session(somente_leitura=True):
+        with get_cursor(somente_leitura=True) as cur:
+            cur.execute("SELECT 1")
+
+    assert pool.entregues == []
+    conn = pool.replica.entregues[0]
+    assert conn.sessoes[0]["readonly"] is True
+    assert conn.sessoes[-1] == {"isolation_level": "DEFAULT", "readonly": "DEFAULT"}
+    assert conn.fim == ["commit"]
+    assert pool.replica.devolvidas == [(conn, False)]
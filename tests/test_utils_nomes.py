@@ -1,5 +1,5 @@
 import pytest
-from src.utils_nomes import quebrar_nome
+from src.utils_nomes import normalizar_texto, quebrar_nome
 
 @pytest.mark.parametrize(
     "entrada,esperado_nome,esperado_sobrenome",
@@ -16,3 +16,19 @@ def test_quebrar_nome_casos_basicos(entrada, esperado_nome, esperado_sobrenome):
     nome, sobrenome = quebrar_nome(entrada)
     assert nome == esperado_nome
     assert sobrenome == esperado_sobrenome
+
+
+@pytest.mark.parametrize(
+    "entrada,esperado",
+    [
+        (None, None),
+        ("", ""),
+        ("São Paulo", "sao paulo"),
+        ("  JOÃO   Conceição ", "joao conceicao"),
+        ("Florianópolis", "florianopolis"),
+        ("Vitória da Conquista", "vitoria da conquista"),
+        ("Patrícia Araújo Müller", "patricia araujo muller"),
+    ],
+)
+def test_normalizar_texto(entrada, esperado):
+    assert normalizar_texto(entrada) == esperado